@@ -1,6 +1,6 @@
 from django.contrib import admin
 from import_export.admin import ImportExportModelAdmin
-from c2c_modules.models import Client,Contract, FileModel, Estimation, SkillPayRate, Pricing, PurchaseOrder, Allocation, SowContract, MainMilestone, UtilizedAmount, Invoices
+from c2c_modules.models import Client,Contract, FileModel, Estimation, SkillPayRate, Pricing, PurchaseOrder, Allocation, SowContract, MainMilestone, UtilizedAmount, Invoices, SchedulerJobRun, DashboardSnapshot, CalendarHoliday
 
 
 admin.site.register(Contract)
@@ -17,5 +17,6 @@ admin.site.register(Client)
 admin.site.register(MainMilestone)
 admin.site.register(UtilizedAmount)
 admin.site.register(Invoices)
-
-
+admin.site.register(SchedulerJobRun)
+admin.site.register(DashboardSnapshot)
+admin.site.register(CalendarHoliday)
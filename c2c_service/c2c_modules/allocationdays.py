@@ -0,0 +1,97 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import ExtractWeek
+from c2c_modules.models import AllocationDay
+
+
+def detect_daily_date_format(daily_data):
+    """Same rule as the invoice scheduler: month-first only when a middle part exceeds 12."""
+    for entry in daily_data:
+        parts = str(entry.get("date", "")).split('/')
+        if len(parts) == 3 and parts[1].isdigit() and int(parts[1]) > 12:
+            return "%m/%d/%Y"
+    return "%d/%m/%Y"
+
+def parse_daily_hours(daily_data):
+    """Parse an `Estimation_Data.daily` list into (date, hours) pairs, skipping unparseable entries."""
+    date_format = detect_daily_date_format(daily_data)
+    days = []
+    for entry in daily_data:
+        try:
+            entry_date = datetime.strptime(entry["date"], date_format).date()
+            hours = float(entry.get("hours") or 0)
+        except (KeyError, TypeError, ValueError):
+            continue
+        days.append((entry_date, hours))
+    return days
+
+def build_allocation_days(timesheet):
+    resource_estimation_data = timesheet.resource_estimation_data or {}
+    daily_data = resource_estimation_data.get("Estimation_Data", {}).get("daily", [])
+    hours_by_date = defaultdict(float)
+    for entry_date, hours in parse_daily_hours(daily_data):
+        hours_by_date[entry_date] += hours
+    return [
+        AllocationDay(
+            timesheet_id=timesheet.id,
+            employee_id=timesheet.resource_id,
+            contract_sow_id=timesheet.contract_sow_id,
+            date=entry_date,
+            hours=hours
+        )
+        for entry_date, hours in hours_by_date.items()
+    ]
+
+def sync_allocation_days(timesheet):
+    """Replace the normalized daily rows of a timesheet with its current estimation data."""
+    with transaction.atomic():
+        AllocationDay.objects.filter(timesheet_id=timesheet.id).delete()
+        AllocationDay.objects.bulk_create(build_allocation_days(timesheet))
+
+def planned_hours_by_timesheet(timesheet_ids, start_date, end_date, weekdays_only=False):
+    """Planned hours per timesheet id between two dates (inclusive), as one grouped SUM."""
+    days = AllocationDay.objects.filter(timesheet_id__in=timesheet_ids, date__range=(start_date, end_date))
+    if weekdays_only:
+        days = days.filter(date__iso_week_day__lte=5)
+    rows = days.values('timesheet_id').annotate(total_hours=Sum('hours'))
+    return {row['timesheet_id']: row['total_hours'] or 0 for row in rows}
+
+def planned_hours_by_employee(timesheets, start_date, end_date, weekdays_only=False):
+    """Planned hours per employee id between two dates for the given timesheet queryset."""
+    days = AllocationDay.objects.filter(timesheet__in=timesheets, date__range=(start_date, end_date))
+    if weekdays_only:
+        days = days.filter(date__iso_week_day__lte=5)
+    rows = days.values('employee_id').annotate(total_hours=Sum('hours'))
+    return {row['employee_id']: row['total_hours'] or 0 for row in rows}
+
+def planned_hours_by_window(timesheet_ids, windows):
+    """
+    Planned hours per (timesheet id, window key) for a dict of {key: (start_date, end_date)} windows.
+    Loads only the rows on the window dates, in a single query.
+    """
+    totals = defaultdict(float)
+    if not windows or not timesheet_ids:
+        return totals
+    keys_by_date = defaultdict(list)
+    for key, (start, end) in windows.items():
+        day = start
+        while day <= end:
+            keys_by_date[day].append(key)
+            day += timedelta(days=1)
+    days = AllocationDay.objects.filter(
+        timesheet_id__in=timesheet_ids,
+        date__in=list(keys_by_date)
+    ).values_list('timesheet_id', 'date', 'hours')
+    for timesheet_id, day, hours in days:
+        for key in keys_by_date[day]:
+            totals[(timesheet_id, key)] += hours
+    return totals
+
+def planned_hours_by_week_number(timesheet_ids):
+    """Planned hours per (timesheet id, ISO week number), across all years."""
+    rows = AllocationDay.objects.filter(timesheet_id__in=timesheet_ids).annotate(
+        week=ExtractWeek('date')
+    ).values('timesheet_id', 'week').annotate(total_hours=Sum('hours'))
+    return {(row['timesheet_id'], row['week']): row['total_hours'] or 0 for row in rows}
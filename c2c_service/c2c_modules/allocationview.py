@@ -8,6 +8,9 @@ from rest_framework.pagination import PageNumberPagination
 from c2c_modules.serializer import AllocationSerializer, EstimationResourceSerializer, SowContractSerializer
 from c2c_modules.models import Allocation, Client,SowContract, Estimation, Employee, Timesheet, EmployeeUnplannedNonbillableHours
 from c2c_modules.utils import has_permission, get_date_from_utc_time
+from c2c_modules.allocationdays import planned_hours_by_employee
+from c2c_modules.estimationengine import estimation_resources, resource_slot_indexes
+from c2c_modules.workcalendar import week_bounds, format_date_range, working_hours_between
 from django.db.models import F
 from datetime import datetime, timedelta
 from rest_framework.generics import ListAPIView
@@ -25,11 +28,8 @@ class Pagination(PageNumberPagination):
 
 def get_week_date_range(year, week_number):
     """Returns the formatted week date range and start & end date."""
-    week_start_date = datetime.fromisocalendar(year, week_number, 1)  # Monday
-    week_end_date = week_start_date + timedelta(days=6)  # Sunday
-    formatted_start_date = week_start_date.strftime('%d/%m/%Y')
-    formatted_end_date = week_end_date.strftime('%d/%m/%Y')
-    return f"{formatted_start_date} - {formatted_end_date}", week_start_date.date(), week_end_date.date()
+    week_start_date, week_end_date = week_bounds(year, week_number)
+    return format_date_range(week_start_date, week_end_date), week_start_date, week_end_date
 
 def check_and_validate_timesheet_submission(current_estimation_data, employee_id):
     unique_weeks = set()
@@ -57,12 +57,10 @@ def check_and_validate_timesheet_submission(current_estimation_data, employee_id
         conflicting_weeks = []
     return conflicting_weeks
 
-def get_current_estimation_data(estimation_list):
-    new_estimation__indexes = []
-    for resource in estimation_list:
-        for resource_count in range(0,resource['num_of_resources']):
-            new_estimation__indexes.append(resource)
-    return new_estimation__indexes
+def get_current_estimation_data(estimation):
+    """Estimation resource behind every allocation slot, each resource repeated `num_of_resources` times."""
+    resources = estimation_resources(estimation)
+    return [resources[index] for index in resource_slot_indexes(resources)]
 
 class AllocationAPIView(ListModelMixin, CreateModelMixin, GenericAPIView):
     queryset = Allocation.objects.all().order_by('-uuid')
@@ -134,9 +132,7 @@ class AllocationAPIView(ListModelMixin, CreateModelMixin, GenericAPIView):
                 status=status.HTTP_409_CONFLICT
             )
         estimation = get_object_or_404(Estimation, uuid=request.data['estimation'])
-        estimation_data = estimation.resource
-        estimation_list = estimation_data if isinstance(estimation_data, list) else [estimation_data]
-        new_estimation_data = get_current_estimation_data(estimation_list)
+        new_estimation_data = get_current_estimation_data(estimation)
         if not new_estimation_data:
             warning("No Estimation data found for the given estimation.")
             return Response(
@@ -307,9 +303,7 @@ class AllocationDetailView(generics.RetrieveUpdateDestroyAPIView):
         client = allocation.client
         contract_sow = allocation.contract_sow
         estimation = allocation.estimation
-        estimation_data = estimation.resource
-        estimation_list = estimation_data if isinstance(estimation_data, list) else [estimation_data]
-        new_estimation_data = get_current_estimation_data(estimation_list)
+        new_estimation_data = get_current_estimation_data(estimation)
         if not new_estimation_data:
             warning("No Estimation data found for the given estimation.")
             return Response(
@@ -532,15 +526,7 @@ class AllocationDetailView(generics.RetrieveUpdateDestroyAPIView):
 class EstimationDetailByContractView(APIView):
     DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
     def calculate_weekday_hours(self, start_date, end_date):
-        total_hours = 0
-        start_date = get_date_from_utc_time(str(start_date))
-        end_date = get_date_from_utc_time(str(end_date))
-        current_date = start_date
-        while current_date <= end_date:
-            if current_date.weekday() < 5:
-                total_hours += 8
-            current_date += timedelta(days=1)
-        return total_hours
+        return working_hours_between(get_date_from_utc_time(str(start_date)), get_date_from_utc_time(str(end_date)))
 
     def parse_date(self, date_str):
         for fmt in ('%d/%m/%Y', '%m/%d/%Y'):
@@ -557,27 +543,11 @@ class EstimationDetailByContractView(APIView):
     def get_estimation_data(self, resource_estimation_data):
         return resource_estimation_data.get('Estimation_Data', {}).get('daily', [])
     
-    def check_timesheet_availability(self, timesheets, start_date, end_date, available_hours):
-        total_free_hours = 0
+    def get_planned_hours(self, timesheets, start_date, end_date):
+        """Planned weekday hours per employee over the range, from the normalized allocation days."""
         start_date = get_date_from_utc_time(str(start_date))
         end_date = get_date_from_utc_time(str(end_date))
-        for timesheet in timesheets:
-            planned_hours_per_day = 0
-            estimation_data = timesheet.resource_estimation_data.get('Estimation_Data' , {}).get('daily', [])
-            for data in estimation_data:
-                est_date = datetime.strptime(data['date'], "%d/%m/%Y")
-                est_date = est_date.date()
-                if est_date.weekday() in [5, 6]:
-                    continue
-                if start_date <= est_date <= end_date:
-                    if data.get('hours'):
-                        worked_hours = data.get('hours', 0)
-                    else:
-                        worked_hours = 0
-                    planned_hours_per_day +=worked_hours
-            total_free_hours = available_hours - planned_hours_per_day
-            available_hours = total_free_hours
-        return available_hours if available_hours > 0 else 0
+        return planned_hours_by_employee(timesheets, start_date, end_date, weekdays_only=True)
 
     def build_employee_response(self, employee, available_hours, status, pre_planned_hours):
         return {
@@ -593,24 +563,30 @@ class EstimationDetailByContractView(APIView):
             employee_assigned_role=role,
             employee_status__in=['Active']
         )
+        timesheets = Timesheet.objects.filter(
+            resource__in=filtered_employees,
+            contract_sow__start_date__lte=end_date,
+            contract_sow__end_date__gte=start_date
+        )
+        allocated_employee_ids = set(timesheets.values_list('resource_id', flat=True))
+        planned_hours = self.get_planned_hours(timesheets, start_date, end_date)
+        weekday_hours = self.calculate_weekday_hours(start_date, end_date)
         employee_data = []
         for employee in filtered_employees:
-            timesheets = Timesheet.objects.filter(
-                resource=employee,
-                contract_sow__start_date__lte=end_date,
-                contract_sow__end_date__gte=start_date
+            available_hours, status, pre_planned_hours = self.get_employee_availability(
+                weekday_hours,
+                employee.employee_source_id in allocated_employee_ids,
+                planned_hours.get(employee.employee_source_id, 0)
             )
-            available_hours, status, pre_planned_hours = self.get_employee_availability(timesheets, start_date, end_date)
             employee_data.append(self.build_employee_response(employee, available_hours, status, pre_planned_hours))
         return employee_data
 
-    def get_employee_availability(self, timesheets, start_date, end_date):
-        available_hours = self.calculate_weekday_hours(start_date, end_date)
-        if not timesheets.exists():
+    def get_employee_availability(self, available_hours, has_timesheets, planned_hours):
+        if not has_timesheets:
             pre_planned_hours = 0
             status = "Available" if available_hours else "Not Available"
         else:
-            free_hours = self.check_timesheet_availability(timesheets, start_date, end_date, available_hours)
+            free_hours = max(available_hours - planned_hours, 0)
             status = "Available" if free_hours else "Not Available"
             pre_planned_hours = available_hours - free_hours
             available_hours = free_hours
@@ -0,0 +1,140 @@
+from django.db.models.fields.json import KeyTextTransform
+from config import PROFILE
+from c2c_modules.models import EmployeeEntryTimesheet, EmployeeUnplannedNonbillableHours
+from c2c_modules.allocationdays import planned_hours_by_window
+from c2c_modules.utils import format_hours
+from c2c_modules.workcalendar import work_week_bounds, format_date_range
+
+UNKNOWN_CLIENT = "Unknown Client"
+UNKNOWN_CONTRACT = "Unknown Contract"
+BILLABLE = "Billable"
+
+
+def week_windows(rows):
+    """{(year, week number): (Monday, Friday)} of the weeks the rows belong to."""
+    return {(row.year, row.week_number): work_week_bounds(row.year, row.week_number) for row in rows}
+
+def unplanned_by_week(employee_ids, weeks):
+    """
+    {(employee id, year, week number): EmployeeUnplannedNonbillableHours} for those employees and
+    weeks, in one query. There is at most one row per key (see `unique_unplanned_employee_week`).
+    """
+    if not employee_ids or not weeks:
+        return {}
+    rows = EmployeeUnplannedNonbillableHours.objects.filter(
+        employee_id__in=employee_ids,
+        year__in={year for year, _ in weeks},
+        week_number__in={week_number for _, week_number in weeks},
+    )
+    return {(row.employee_id_id, row.year, row.week_number): row for row in rows}
+
+def contract_row(entry, allocated, detailed):
+    contract = {
+        "timesheet_id": entry.id,
+        "client_name": entry.client.name if entry.client else UNKNOWN_CLIENT,
+        "contract_sow_name": entry.contract_sow.contractsow_name if entry.contract_sow else UNKNOWN_CONTRACT,
+        "allocated_hours": allocated[(entry.timesheet_id_id, (entry.year, entry.week_number))],
+        "timesheet_hours": format_hours(entry.billable_hours),
+    }
+    if detailed:
+        contract["timesheet_status"] = entry.ts_approval_status
+    return contract
+
+def pending_week(year, week_number, contracts, unplanned, detailed):
+    week = {
+        "week": week_number,
+        "week_number": format_date_range(*work_week_bounds(year, week_number)),
+        "contracts": contracts,
+        "unplanned_hours": format_hours(unplanned.unplanned_hours if unplanned else 0),
+        "timeoff_hours": format_hours(unplanned.non_billable_hours if unplanned else 0),
+    }
+    if detailed:
+        week.update({
+            "unplanned_hours_comments": unplanned.unplanned_hours_comments if unplanned else "",
+            "timeoff_hours_comments": unplanned.non_billable_hours_comments if unplanned else "",
+            "unplanned_timesheet_id": unplanned.id if unplanned else None,
+            "unplanned_timesheet_status": unplanned.ts_approval_status if unplanned else "",
+        })
+    return week
+
+def build_approval_queue(entries, approver_id, detailed=False):
+    """
+    The entries of an approval queue grouped per employee and week, in three queries: the entries
+    (with employee, client, contract and the allocation's billability), their unplanned/time-off
+    rows and their planned hours. The manager queue (`detailed=False`) leaves out entries without
+    an allocation and flags each employee with `isBillable`; the admin queue adds statuses and comments.
+    """
+    entries = list(entries.select_related('employee_id', 'client', 'contract_sow').annotate(
+        billability=KeyTextTransform('billability', 'timesheet_id__resource_estimation_data')
+    ))
+    windows = week_windows(entries)
+    unplanned = unplanned_by_week({entry.employee_id_id for entry in entries}, windows)
+    allocated = planned_hours_by_window({entry.timesheet_id_id for entry in entries if entry.timesheet_id_id}, windows)
+    grouped = {}
+    weeks = {}
+    for entry in entries:
+        employee_id = entry.employee_id_id
+        if employee_id == approver_id and PROFILE == "PROD":
+            continue
+        group = grouped.get(employee_id)
+        if group is None:
+            group = grouped[employee_id] = {"pending_timesheets": []}
+            if not detailed:
+                group["isBillable"] = False
+            group["employee_name"] = entry.employee_id.employee_full_name
+            group["employee_id"] = employee_id
+        if not detailed:
+            if not entry.timesheet_id_id:
+                continue
+            group["isBillable"] = entry.billability == BILLABLE
+        contracts = [contract_row(entry, allocated, detailed)] if entry.timesheet_id_id else []
+        key = (employee_id, entry.year, entry.week_number)
+        week = weeks.get(key)
+        if week:
+            week["contracts"].extend(contracts)
+            continue
+        week = weeks[key] = pending_week(
+            entry.year, entry.week_number, contracts, unplanned.get(key), detailed
+        )
+        group["pending_timesheets"].append(week)
+    return list(grouped.values())
+
+def build_unplanned_queue(unplanned_entries):
+    """
+    Unplanned/time-off rows grouped per employee, each week listing the employee's entries for it,
+    in three queries: the rows, the entries of those weeks and their planned hours.
+    """
+    unplanned_entries = list(unplanned_entries.select_related('employee_id'))
+    windows = week_windows(unplanned_entries)
+    contracts = {}
+    if unplanned_entries:
+        entries = list(EmployeeEntryTimesheet.objects.filter(
+            employee_id__in={row.employee_id_id for row in unplanned_entries},
+            year__in={year for year, _ in windows},
+            week_number__in={week_number for _, week_number in windows},
+        ).select_related('client', 'contract_sow'))
+        allocated = planned_hours_by_window({entry.timesheet_id_id for entry in entries if entry.timesheet_id_id}, windows)
+        for entry in entries:
+            contracts.setdefault((entry.employee_id_id, entry.year, entry.week_number), []).append(
+                contract_row(entry, allocated, detailed=True)
+            )
+    grouped = {}
+    for row in unplanned_entries:
+        employee_id = row.employee_id_id
+        group = grouped.setdefault(employee_id, {"pending_timesheets": []})
+        group["employee_id"] = employee_id
+        group["employee_name"] = row.employee_id.employee_full_name
+        group["pending_timesheets"].append({
+            "week_number": format_date_range(*windows[(row.year, row.week_number)]),
+            "week": row.week_number,
+            "year": row.year,
+            # Weeks without any entry have always been sent with null contracts.
+            "contracts": contracts.get((employee_id, row.year, row.week_number)),
+            "unplanned_hours": format_hours(row.unplanned_hours),
+            "timeoff_hours": format_hours(row.non_billable_hours),
+            "unplanned_comments": row.unplanned_hours_comments,
+            "timeoff_comments": row.non_billable_hours_comments,
+            "unplanned_timesheet_id": row.id,
+            "unplanned_timesheet_status": row.ts_approval_status,
+        })
+    return list(grouped.values())
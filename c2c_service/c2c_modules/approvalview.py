@@ -2,19 +2,27 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from c2c_modules.utils import has_permission, check_role
 from c2c_modules.models import GuestUser, Employee, EmployeeEntryTimesheet, Timesheet, EmployeeUnplannedNonbillableHours
-from c2c_modules.serializer import UnplannedHoursSerializer, GuestUserSerializer, EmployeeSerializer, AdminApprovalPendingSerializer,ApprovalPendingSerializer, EmployeeUnplannedNonbillableHoursSerializer
+from c2c_modules.serializer import GuestUserSerializer, EmployeeSerializer, EmployeeUnplannedNonbillableHoursSerializer
 from rest_framework import status
-from django.db.models import Q
+from django.db.models import Q, Exists, OuterRef
 from collections import defaultdict
 from config import PROFILE
 import datetime
 from django.utils.timezone import now
-from c2c_modules.employeeview import get_estimation_data_for_week, format_hours
+from c2c_modules.employeeview import format_hours
 from rest_framework.pagination import PageNumberPagination
 from datetime import datetime, timedelta, date
 from django.db import transaction
-from django.core.exceptions import ObjectDoesNotExist
-import math
+from c2c_modules.missingweeks import get_missing_timesheets
+from c2c_modules.approvalqueue import build_approval_queue, build_unplanned_queue
+from c2c_modules.approvers import parse_client_ids, guest_user_client_uuids, guest_users_for_clients
+from c2c_modules.pendingcounts import load_counters, pending_count, stream_pending_count
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
+from c2c_modules.bulkapproval import bulk_approve_entries, bulk_approve_unplanned, approve_empty_unplanned_weeks, normalize_id, UPDATED, NOT_FOUND
 class Pagination(PageNumberPagination):
     page_size = 100
     page_size_query_param = 'page_size'
@@ -33,7 +41,10 @@ def get_approver_by_email(approver_email=None):
 class TimesheetApproverSearchView(APIView):
     def get_guest_by_client_id(self, client_id):
         try:
-            guest_user_instances = GuestUser.objects.filter(client_ids__contains=[client_id])
+            client_uuids = parse_client_ids([client_id])
+            if not client_uuids:
+                return None
+            guest_user_instances = guest_users_for_clients(client_uuids)
             if not guest_user_instances.exists():
                 return None
             serializer = GuestUserSerializer(guest_user_instances, many=True)
@@ -62,62 +73,9 @@ class TimesheetApproverSearchView(APIView):
         return Response(response_data, status=200)
 
     
-class ApprovalPendingListView(APIView):
-
-    def get_billability_status(self, timesheet_record) -> bool:
-        if (timesheet_record and 
-            getattr(timesheet_record, 'resource_estimation_data', None) and 
-            isinstance(timesheet_record.resource_estimation_data, dict) and 
-            "billability" in timesheet_record.resource_estimation_data):
-            return timesheet_record.resource_estimation_data["billability"] == "Billable"
-        return False
-    
-    def transform_data(self, serialized_data, approver_id) -> list:
-        grouped_data = defaultdict(lambda: {"pending_timesheets": [], "isBillable": False})
-
-        for record in serialized_data:
-            employee_id = record["employee_id"]
-            employee_name = record["employee_name"]
-            if employee_id == approver_id and PROFILE == "PROD":
-                continue
-            
-            # Set employee details if not already set
-            if "employee_name" not in grouped_data[employee_id]:
-                grouped_data[employee_id]["employee_name"] = employee_name
-                grouped_data[employee_id]["employee_id"] = employee_id
-            
-            week = record["pending_timesheets"]["week"]
-            week_number = record["pending_timesheets"]["week_number"]
-            contracts = record["pending_timesheets"].get("contracts", [])
-            unplanned_hours = record["pending_timesheets"]["unplanned_hours"]
-            timeoff_hours = record["pending_timesheets"]["timeoff_hours"]
-            timesheet_id = record.get("timesheet_id")
-            if not timesheet_id:
-                continue
+PENDING_COUNT_ROLES = ["c2c_timesheet_manager", "c2c_super_admin", "c2c_guest_employee", "c2c_hr_manager", "c2c_timesheet_admin"]
 
-            timesheet_record = Timesheet.objects.filter(
-                id=timesheet_id,
-            ).first()
-            grouped_data[employee_id]["isBillable"] = self.get_billability_status(timesheet_record)
-
-            week_data = next(
-                (week for week in grouped_data[employee_id]["pending_timesheets"] if week["week_number"] == week_number),
-                None
-            )
-            
-            if week_data:
-                week_data["contracts"].extend(contracts)
-            else:
-                grouped_data[employee_id]["pending_timesheets"].append({
-                    "week": week,
-                    "week_number": week_number,
-                    "contracts": contracts,
-                    "unplanned_hours": unplanned_hours,
-                    "timeoff_hours": timeoff_hours,
-                })
-        
-        return list(grouped_data.values())
-    
+class ApprovalPendingListView(APIView):
 
     def check_permissions(self, request):
         required_roles = ["c2c_timesheet_manager", "c2c_super_admin", "c2c_guest_employee", "c2c_timesheet_admin"]
@@ -138,53 +96,20 @@ class ApprovalPendingListView(APIView):
         if check_role("c2c_timesheet_admin") in approver_user_roles:
             timesheets = EmployeeEntryTimesheet.objects.filter(ts_approval_status="submitted")
         elif check_role("c2c_guest_employee") in approver_user_roles:
-            guest_user = GuestUser.objects.filter(guest_user_id=approver_id).first()
-            client_ids = guest_user.client_ids
+            client_uuids = guest_user_client_uuids(approver_id)
             timesheets = EmployeeEntryTimesheet.objects.filter(
-                client__in=client_ids, ts_approval_status="submitted")
+                client__in=client_uuids, ts_approval_status="submitted")
         else:
             timesheets = EmployeeEntryTimesheet.objects.filter(
-                approver__contains=[{"approver_id": approver_id}], ts_approval_status="submitted"
+                approver_assignments__approver_id=approver_id, ts_approval_status="submitted"
             )
-        serializer = ApprovalPendingSerializer(timesheets, many=True)
-        serialized_data = serializer.data
-        transformed_data = self.transform_data(serialized_data, approver_id)
+        transformed_data = build_approval_queue(timesheets, approver_id)
         return Response(transformed_data, status=status.HTTP_200_OK)
         
 class ManagerApprovalPendingCountsView(APIView):
 
     def check_permissions(self, request):
-        required_roles = ["c2c_timesheet_manager", "c2c_super_admin", "c2c_guest_employee", "c2c_hr_manager", "c2c_timesheet_admin"]
-        return has_permission(request, required_roles)
-
-    def get_unique_timesheet_count(self,timesheets):
-        unique_weeks = set()
-        for timesheet in timesheets:
-            week_number = timesheet.week_number
-            year = timesheet.year
-            employee_id = timesheet.employee_id
-            unique_weeks.add((employee_id, week_number, year))
-        return list(unique_weeks)
-
-    def get_planned_timesheets(self,approver_id=None):
-        if approver_id:
-            return EmployeeEntryTimesheet.objects.filter(approver__contains=[{"approver_id": approver_id}], ts_approval_status="submitted")
-        return EmployeeEntryTimesheet.objects.filter(ts_approval_status="submitted")
-    
-    def get_unplanned_timesheets(self, approver_id=None):
-        return EmployeeUnplannedNonbillableHours.objects.filter(Q(ts_approval_status="submitted") &(Q(unplanned_hours__gt=0) | Q(non_billable_hours__gt=0)))
-    
-    def get_unique_combined_timesheet_count(self, timesheets, unplanned_timesheets):
-        unique_weeks = set()
-        unique_weeks.update(
-            (timesheet.employee_id, timesheet.week_number, timesheet.year) 
-            for timesheet in timesheets
-        )
-        unique_weeks.update(
-            (unplanned_timesheet.employee_id, unplanned_timesheet.week_number, unplanned_timesheet.year) 
-            for unplanned_timesheet in unplanned_timesheets
-        )
-        return len(unique_weeks)
+        return has_permission(request, PENDING_COUNT_ROLES)
 
     def post(self, request):
         permission_result = self.check_permissions(request)
@@ -196,42 +121,37 @@ class ManagerApprovalPendingCountsView(APIView):
                 {"error": "approver_email is required."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        timesheet_unique_weeks = []
-        unplanned_timesheet_weeks = []
-        actual_count = 0
         approver_id = get_approver_by_email(approver_email=approver_email)
-        timesheets = self.get_planned_timesheets(approver_id)
-        timesheet_unique_weeks = self.get_unique_timesheet_count(timesheets)
-        unplanned_timesheets = self.get_unplanned_timesheets()
-        unplanned_timesheet_weeks = self.get_unique_timesheet_count(unplanned_timesheets)
-        if check_role('c2c_timesheet_admin') in permission_result['user_roles'] and check_role('c2c_timesheet_manager') in permission_result['user_roles']:
-            timesheets_admin = self.get_planned_timesheets()
-            timesheet_admin_unique_weeks = self.get_unique_timesheet_count(timesheets_admin)
-            admin_week_list = timesheet_admin_unique_weeks + unplanned_timesheet_weeks
-            actual_count = len(set(admin_week_list)) + len(timesheet_unique_weeks)
-        elif check_role('c2c_timesheet_admin') in permission_result['user_roles'] and check_role('c2c_hr_manager') in permission_result['user_roles']:
-            timesheets_admin = self.get_planned_timesheets()
-            timesheet_admin_unique_weeks = self.get_unique_timesheet_count(timesheets_admin)
-            actual_count = timesheet_admin_unique_weeks + unplanned_timesheet_weeks
-            actual_count = len(set(actual_count))
-        elif check_role('c2c_timesheet_admin') in permission_result['user_roles']:
-            timesheets_admin = self.get_planned_timesheets()
-            timesheet_admin_unique_weeks = self.get_unique_timesheet_count(timesheets_admin)
-            actual_count = timesheet_admin_unique_weeks + unplanned_timesheet_weeks
-            actual_count = len(set(actual_count))
-        elif check_role('c2c_hr_manager') in permission_result['user_roles'] and check_role('c2c_timesheet_manager') in permission_result['user_roles']:
-            actual_count = len(timesheet_unique_weeks) + len(unplanned_timesheet_weeks)
-        elif check_role('c2c_hr_manager') in permission_result['user_roles']:
-            actual_count = len(unplanned_timesheet_weeks)
-        elif check_role('c2c_timesheet_manager') in permission_result['user_roles']:
-            actual_count = len(timesheet_unique_weeks)
-        elif check_role('c2c_guest_employee') in permission_result['user_roles']:
-            actual_count = len(timesheet_unique_weeks)
+        # Read from the counters kept by `pendingcounts` instead of scanning the submitted rows.
+        actual_count = pending_count(load_counters(approver_id), approver_id, permission_result['user_roles'])
         response_data = {
                     "timesheet_pending_approval_count": actual_count
                 }
         return Response(response_data, status=200)
-    
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ManagerApprovalPendingCountStreamView(View):
+    """
+    Push the pending approval count as server-sent events, so open pages need not poll
+    `ts-manager-notification-count/`. Takes the same bearer token; `approver_email` defaults to the caller's.
+    """
+    async def get(self, request):
+        permission_result = await sync_to_async(has_permission)(request, PENDING_COUNT_ROLES)
+        if permission_result["status"] != 200:
+            return JsonResponse(permission_result, status=status.HTTP_403_FORBIDDEN)
+        approver_email = request.GET.get("approver_email") or permission_result.get("user_email")
+        if not approver_email:
+            return JsonResponse({"error": "approver_email is required."}, status=status.HTTP_400_BAD_REQUEST)
+        approver_id = await sync_to_async(get_approver_by_email)(approver_email=approver_email)
+        response = StreamingHttpResponse(
+            stream_pending_count(approver_id, permission_result["user_roles"]), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Stop reverse proxies from buffering the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
 class UpdateTimesheetsByManagerView(APIView):
 
     def convert_to_float(self,hours_str):
@@ -255,62 +175,61 @@ class UpdateTimesheetsByManagerView(APIView):
         if not isinstance(data, list):
             return Response({"error": "Request data must be a list"}, status=status.HTTP_400_BAD_REQUEST)
         errors = []
+        changes_by_id, employee_ids, items_by_id = {}, {}, {}
         for item in data:
-            timesheet_id = item.get("timesheet_id")
-            employee_id = item.get("employee_id")
-            billable_hours = item.get("billable_hours")
-            non_billable_hours = item.get("non_billable_hours")
-            approver_comments = item.get("approver_comments")
-            ts_approval_status = item.get("ts_approval_status", "approved")
-            try:
-                timesheet = EmployeeEntryTimesheet.objects.get(
-                    id=timesheet_id,
-                    employee_id=employee_id
-                )
-                if ts_approval_status == "approved":
-                    week_number = timesheet.week_number
-                    year = timesheet.year
-                    employee_id = timesheet.employee_id
-                    try:
-                        record = EmployeeUnplannedNonbillableHours.objects.get(
-                            week_number=week_number, year=year, employee_id=employee_id
-                        )
-                        unplanned_hours = float(record.unplanned_hours or 0.0)
-                        non_billable_hours = float(record.non_billable_hours or 0.0)
-                        if math.isclose(unplanned_hours, 0.0, abs_tol=1e-9) and math.isclose(non_billable_hours, 0.0, abs_tol=1e-9):
-                            record.ts_approval_status = "approved"
-                            record.approved_by = user_email
-                            record.save()
-                    except EmployeeUnplannedNonbillableHours.DoesNotExist:
-                        pass
-            except EmployeeEntryTimesheet.DoesNotExist:
-                errors.append({"data":item, "error": "Timesheet not found"})
+            timesheet_id = normalize_id(item.get("timesheet_id"))
+            if timesheet_id is None:
+                errors.append({"data": item, "error": "Timesheet not found"})
                 continue
-            if billable_hours is not None:
-                    if isinstance(billable_hours, str) and ":" in billable_hours:
-                        billable_hours = self.convert_to_float(billable_hours)
-                    timesheet.billable_hours = float(billable_hours)
-            if non_billable_hours is not None:
-                if isinstance(non_billable_hours, str) and ":" in non_billable_hours:
-                    non_billable_hours = self.convert_to_float(non_billable_hours)
-                timesheet.non_billable_hours = float(non_billable_hours)
-            if approver_comments is not None:
-                timesheet.approver_comments = approver_comments
-            if ts_approval_status in ["approved", "recall"]:
-                timesheet.ts_approval_status = ts_approval_status
             try:
-                timesheet.approved_by = user_email
-                timesheet.save()
-            except Exception as e:
+                changes_by_id[timesheet_id] = self.build_changes(item)
+            except ValueError as e:
                 errors.append({"data": item, "error": str(e)})
-            
+                continue
+            employee_ids[timesheet_id] = str(item.get("employee_id"))
+            items_by_id[timesheet_id] = item
+
+        with transaction.atomic():
+            outcomes, rows = bulk_approve_entries(changes_by_id, user_email, employee_ids)
+            approved_entries = [
+                rows[timesheet_id] for timesheet_id, outcome in outcomes.items()
+                if outcome["status"] == UPDATED and items_by_id[timesheet_id].get("ts_approval_status", "approved") == "approved"
+            ]
+            approve_empty_unplanned_weeks(approved_entries, user_email)
+
+        updated_timesheets = []
+        for timesheet_id, outcome in outcomes.items():
+            if outcome["status"] == UPDATED:
+                updated_timesheets.append(timesheet_id)
+            elif outcome["status"] == NOT_FOUND:
+                errors.append({"data": items_by_id[timesheet_id], "error": "Timesheet not found"})
+            else:
+                errors.append({"data": items_by_id[timesheet_id], "error": outcome["error"]})
 
         response_data = {
-            "updated_timesheets": [],
-            "errors": errors
+            "updated_timesheets": updated_timesheets,
+            "errors": errors,
+            "outcomes": outcomes
         }
         return Response(response_data, status=status.HTTP_200_OK if not errors else status.HTTP_400_BAD_REQUEST)
-    
+
+    def build_changes(self, item):
+        """Field changes requested for one entry; hours may be floats or 'HH:MM' strings."""
+        changes = {}
+        for field in ("billable_hours", "non_billable_hours"):
+            hours = item.get(field)
+            if hours is not None:
+                if isinstance(hours, str) and ":" in hours:
+                    hours = self.convert_to_float(hours)
+                changes[field] = float(hours)
+        approver_comments = item.get("approver_comments")
+        if approver_comments is not None:
+            changes["approver_comments"] = approver_comments
+        ts_approval_status = item.get("ts_approval_status", "approved")
+        if ts_approval_status in ["approved", "recall"]:
+            changes["ts_approval_status"] = ts_approval_status
+        return changes
+
 class PendingTimesheetsView(APIView):
     def check_permissions(self, request):
         required_roles = ["c2c_hr_manager", "c2c_super_admin"]
@@ -414,250 +333,20 @@ class EmployeeMissingTimesheetAPIView(APIView):
         except Employee.DoesNotExist:
             return Response({'error': 'Employee not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        current_date = now().date()
-        four_weeks_ago = current_date - timedelta(weeks=4)
-
-        timesheets = Timesheet.objects.filter(resource=employee)
-        missing_weeks = []
-        existing_timesheet_entries = EmployeeEntryTimesheet.objects.filter(employee_id=employee).values_list(
-            'timesheet_id', 'week_number', 'year'
-        )
-        existing_entries_set = set(existing_timesheet_entries)
-        for timesheet in timesheets:
-            estimation_data = timesheet.resource_estimation_data
-            start_date = datetime.fromisoformat(estimation_data['start_date'].replace("Z", "")).date()
-            end_date = datetime.fromisoformat(estimation_data['end_date'].replace("Z", "")).date()
-            date_range = current_date
-            if end_date > four_weeks_ago:
-                date_range = current_date if end_date > current_date else end_date
-            week_numbers = get_week_numbers_in_range(start_date, date_range)
-            for week_number, year in week_numbers:
-                if (timesheet.id, week_number, year) in existing_entries_set:
-                    continue
-                start_date_str, end_date_str = get_week_start_end_dates(year, week_number)
-                start_date_str = datetime.fromisoformat(start_date_str).date() if isinstance(start_date_str, str) else start_date_str
-                end_date_str = datetime.fromisoformat(end_date_str).date() if isinstance(end_date_str, str) else end_date_str
-                allocated_hours = get_estimation_data_for_week(estimation_data, start_date_str, end_date_str)
-                timesheet_data = {
-                    "week_start_date": start_date_str,
-                    "week_end_date": end_date_str,
-                    "week_number": week_number,
-                    "year": year,
-                    "timeoff_hours": format_hours(0),
-                    "total_hours": format_hours(0),
-                    "unplanned_hours": format_hours(0),
-                    "timeoff_hours_comments": "",
-                    "unplanned_hours_comments": "",
-                    "approver_comments": "",
-                    "timesheet_status": "not_submitted",
-                    "timesheets": [
-                        {
-                            "client_name": timesheet.client.name,
-                            "contract_sow_name": timesheet.contract_sow.contractsow_name,
-                            "allocated_hours": format_hours(allocated_hours),
-                            "billable_hours": format_hours(0),
-                            "non_billable_hours": format_hours(0),
-                            "timesheet_status": "not_submitted",
-                            "manager_comments": ""
-                        }
-                    ]
-                }
-
-                # Check if the same week already exists in missing_weeks
-                existing_entry = next(
-                    (entry for entry in missing_weeks 
-                    if (entry["week_number"] == week_number and entry["year"] == year) or 
-                    # (entry["week_start_date"] == start_date_str)),
-                    (entry["week_start_date"] <= end_date_str and entry["week_end_date"] >= start_date_str)),
-                    None
-                )
-
-                if existing_entry:
-                    existing_entry["timesheets"].append(timesheet_data["timesheets"][0])  # Append to existing week's timesheets
-                else:
-                    missing_weeks.append(timesheet_data)
-
-        recalled_timesheets = get_recalled_timesheets(employee)
-        week_start_date_lookup = {}
-        for recalled_entry in recalled_timesheets:
-            recalled_week_start_date = datetime.strptime(recalled_entry['week_start_date'], '%Y-%m-%d').date()
-            recalled_entry['week_start_date'] = recalled_week_start_date
-            week_start_date_lookup[recalled_week_start_date] = recalled_entry
-        for missing_week in missing_weeks:
-            if missing_week['week_start_date'] not in week_start_date_lookup:
-                week_start_date_lookup[missing_week['week_start_date']] = missing_week
-
-        complete_data = list(week_start_date_lookup.values())
-        complete_data = sorted(complete_data, key=lambda x: (-x["year"], -x["week_number"]))
-
+        complete_data, recalled_count = get_missing_timesheets(employee, now().date())
         paginator = self.pagination_class()
         result_page = paginator.paginate_queryset(complete_data, request)
         response_data = paginator.get_paginated_response(result_page).data
-        response_data["is_recalled_timesheets"] = bool(recalled_timesheets)
-        response_data["total_recalled_count"] = len(recalled_timesheets)
+        response_data["is_recalled_timesheets"] = bool(recalled_count)
+        response_data["total_recalled_count"] = recalled_count
         return Response(response_data, status=status.HTTP_200_OK)
         # return paginator.get_paginated_response(result_page)
 
-def get_week_numbers_in_range(start_date, end_date):
-    week_numbers = []
-    if start_date.weekday() in [5, 6]:
-        days_to_add = (7 - start_date.weekday()) % 7
-        start_date += timedelta(days=days_to_add)
-    while start_date <= end_date:
-        year, week_number, _ = start_date.isocalendar()
-        if (week_number, year) not in week_numbers:
-            week_numbers.append((week_number, year))
-        start_date += timedelta(days=1)
-    return week_numbers
-
-def get_week_start_end_dates(year, week_number):
-    monday = date.fromisocalendar(year, week_number, 1)
-    friday = monday + timedelta(days=4)
-    return monday.strftime('%Y-%m-%d'), friday.strftime('%Y-%m-%d')
-
-
-def get_recalled_timesheets(employee):
-    recalled_timesheets = EmployeeEntryTimesheet.objects.filter(employee_id=employee, ts_approval_status="recall")
-    recalled_unplanned_hours = EmployeeUnplannedNonbillableHours.objects.filter(employee_id=employee, ts_approval_status="recall")
-    grouped_recalled_data = defaultdict(lambda: {"timesheets": [], "unplanned_hours": None})
-    total_hours = 0
-    unplanned_dummy = {
-            "timeoff_hours": format_hours(0),
-            "unplanned_hours": format_hours(0),
-            "timeoff_hours_comments": "",
-            "unplanned_hours_comments": "",
-            "approver_comments": "",
-            "timesheet_status": "recall",
-        }
-    for timesheet in recalled_timesheets:
-        key = (timesheet.year, timesheet.week_number)
-        estimation_data = timesheet.timesheet_id.resource_estimation_data
-        start_date_str, end_date_str = get_week_start_end_dates(timesheet.year, timesheet.week_number)
-        start_date_str = datetime.fromisoformat(start_date_str).date() if isinstance(start_date_str, str) else start_date_str
-        end_date_str = datetime.fromisoformat(end_date_str).date() if isinstance(end_date_str, str) else end_date_str
-        allocated_hours = get_estimation_data_for_week(
-                    estimation_data, start_date_str, end_date_str
-                )
-        total_hours += timesheet.non_billable_hours + timesheet.billable_hours
-        grouped_recalled_data[key]["timesheets"].append({
-            "client_name": timesheet.client.name if timesheet.client else "N/A",
-            "contract_sow_name": timesheet.contract_sow.contractsow_name if timesheet.contract_sow else "N/A",
-            "allocated_hours": format_hours(allocated_hours),
-            "billable_hours": format_hours(timesheet.billable_hours),
-            "non_billable_hours": format_hours(timesheet.non_billable_hours),
-            "total_hours": format_hours(timesheet.total_hours),
-            "approver_comments": timesheet.approver_comments,
-            "timesheet_status": timesheet.ts_approval_status
-        })
-    for unplanned in recalled_unplanned_hours:
-        if unplanned.non_billable_hours:
-            hours_non_billable = unplanned.non_billable_hours
-        else:
-            hours_non_billable = 0
-        if unplanned.unplanned_hours:
-            hours_unplanned = unplanned.unplanned_hours
-        else:
-            hours_unplanned = 0
-        total_hours += hours_non_billable + hours_unplanned
-        key = (unplanned.year, unplanned.week_number)
-        grouped_recalled_data[key]["unplanned_hours"] = {
-            "timeoff_hours": format_hours(unplanned.non_billable_hours),
-            "unplanned_hours": format_hours(unplanned.unplanned_hours),
-            "timeoff_hours_comments": unplanned.non_billable_hours_comments,
-            "unplanned_hours_comments": unplanned.unplanned_hours_comments,
-            "approver_comments": unplanned.approver_comments,
-            "timesheet_status": unplanned.ts_approval_status
-        }
-    final_result = [
-        {   
-            "employee_id": employee.employee_source_id,
-            "employee_name": employee.employee_full_name,
-            "week_start_date": get_week_start_end_dates(year, week)[0],
-            "week_end_date": get_week_start_end_dates(year, week)[1],
-            "year": year,
-            "week_number": week,
-            "total_hours": format_hours(total_hours),
-            "timesheets": data["timesheets"],
-            **(data["unplanned_hours"] if data["unplanned_hours"] else unplanned_dummy)
-        }
-        for (year, week), data in sorted(grouped_recalled_data.items())
-    ]
-    return final_result
-
 class SubmittedTimesheetsAPIView(APIView):
-    # def get_billability_status(self, timesheet_record) -> bool:
-    #     if (timesheet_record and 
-    #         getattr(timesheet_record, 'resource_estimation_data', None) and 
-    #         isinstance(timesheet_record.resource_estimation_data, dict) and 
-    #         "billability" in timesheet_record.resource_estimation_data):
-    #         return timesheet_record.resource_estimation_data["billability"] == "Billable"
-    #     return False
-    def transform_data(self, serialized_data, approver_id) -> list:
-        grouped_data = defaultdict(lambda: {"pending_timesheets": []}) #"isBillable": False})
-
-        for record in serialized_data:
-            employee_id = record["employee_id"]
-            employee_name = record["employee_name"]
-            if employee_id == approver_id and PROFILE == "PROD":
-                continue
-            if "employee_name" not in grouped_data[employee_id]:
-                grouped_data[employee_id]["employee_name"] = employee_name
-                grouped_data[employee_id]["employee_id"] = employee_id
-            
-            week = record["pending_timesheets"]["week"]
-            week_number = record["pending_timesheets"]["week_number"]
-            contracts = record["pending_timesheets"].get("contracts", [])
-            unplanned_hours = record["pending_timesheets"]["unplanned_hours"]
-            timeoff_hours = record["pending_timesheets"]["timeoff_hours"]
-            timeoff_hours_comments = record["pending_timesheets"]["timeoff_hours_comments"]
-            unplanned_hours_comments = record["pending_timesheets"]["unplanned_hours_comments"]
-            unplanned_timesheet_id = record["pending_timesheets"]["unplanned_timesheet_id"]
-            unplanned_timesheet_status = record["pending_timesheets"]["unplanned_timesheet_status"]
-            timesheet_id = record.get("timesheet_id")
-            # if not timesheet_id:
-            #     continue
-
-            # timesheet_record = Timesheet.objects.filter(
-            #     id=timesheet_id,
-            # ).first()
-            # grouped_data[employee_id]["isBillable"] = self.get_billability_status(timesheet_record)
-            week_data = next(
-                (week for week in grouped_data[employee_id]["pending_timesheets"] if week["week_number"] == week_number),
-                None
-            )
-            
-            if week_data:
-                week_data["contracts"].extend(contracts)
-            else:
-                grouped_data[employee_id]["pending_timesheets"].append({
-                    "week": week,
-                    "week_number": week_number,
-                    "contracts": contracts,
-                    "unplanned_hours": unplanned_hours,
-                    "timeoff_hours": timeoff_hours,
-                    "unplanned_hours_comments": unplanned_hours_comments,
-                    "timeoff_hours_comments": timeoff_hours_comments,
-                    "unplanned_timesheet_id": unplanned_timesheet_id,
-                    "unplanned_timesheet_status": unplanned_timesheet_status
-                })
-        
-        return list(grouped_data.values())
-    
-
     def check_permissions(self, request):
         required_roles = ["c2c_super_admin", "c2c_timesheet_admin"]
         return has_permission(request, required_roles)
 
-    def group_unplanned_entries(self, unplanned_entries):
-        grouped_data = defaultdict(lambda: {"pending_timesheets": []})
-        for entry in unplanned_entries:
-            employee_id = entry["employee_id"]
-            pending_timesheet = entry["pending_timesheets"]
-            grouped_data[employee_id]["employee_id"] = employee_id
-            grouped_data[employee_id]["employee_name"] = entry["employee_name"]
-            grouped_data[employee_id]["pending_timesheets"].append(pending_timesheet)
-        return list(grouped_data.values())
-
     def post(self, request):
         permission_result = self.check_permissions(request)
         if permission_result["status"] != 200:
@@ -670,28 +359,32 @@ class SubmittedTimesheetsAPIView(APIView):
             )
         approver_id = get_approver_by_email(approver_email=approver_email)
         timesheets = EmployeeEntryTimesheet.objects.filter(ts_approval_status="submitted")
-        serializer = AdminApprovalPendingSerializer(timesheets, many=True)
-        serialized_data = serializer.data
-        transformed_data = self.transform_data(serialized_data, approver_id)
-        excluded_weeks = EmployeeEntryTimesheet.objects.filter(ts_approval_status="submitted").values_list(
-            "employee_id", "week_number", "year", flat=False)
-        unplanned_entries = EmployeeUnplannedNonbillableHours.objects.exclude(
-                            employee_id__in=[x[0] for x in excluded_weeks],
-                            week_number__in=[x[1] for x in excluded_weeks],
-                            year__in=[x[2] for x in excluded_weeks]
+        transformed_data = build_approval_queue(timesheets, approver_id, detailed=True)
+        # Weeks with a submitted entry already list their unplanned hours with the entries.
+        submitted_week = EmployeeEntryTimesheet.objects.filter(
+            employee_id=OuterRef("employee_id"),
+            year=OuterRef("year"),
+            week_number=OuterRef("week_number"),
+            ts_approval_status="submitted",
+        )
+        unplanned_entries = EmployeeUnplannedNonbillableHours.objects.filter(
+                            ts_approval_status="submitted"
+                        ).exclude(
+                            Exists(submitted_week)
                         ).exclude(
                             unplanned_hours=0,
                             non_billable_hours=0
-                        ).filter(ts_approval_status="submitted")
-        
-        unplanned_serializer = UnplannedHoursSerializer(unplanned_entries, many=True)
-        grouped_unplanned_entries = self.group_unplanned_entries(unplanned_serializer.data)
+                        )
+        grouped_unplanned_entries = build_unplanned_queue(unplanned_entries)
+        transformed_by_employee = {item["employee_id"]: item for item in transformed_data}
+        unplanned_only = []
         for item in grouped_unplanned_entries:
-            for tranformed_item in transformed_data:
-                if item["employee_id"] == tranformed_item["employee_id"]:
-                    tranformed_item["pending_timesheets"].extend(item["pending_timesheets"])
-                    grouped_unplanned_entries.remove(item)
-        response_data = transformed_data + grouped_unplanned_entries
+            transformed_item = transformed_by_employee.get(item["employee_id"])
+            if transformed_item:
+                transformed_item["pending_timesheets"].extend(item["pending_timesheets"])
+            else:
+                unplanned_only.append(item)
+        response_data = transformed_data + unplanned_only
         return Response(response_data, status=status.HTTP_200_OK)
 
 class BulkApproveTimesheetsAPIView(APIView):
@@ -710,6 +403,7 @@ class BulkApproveTimesheetsAPIView(APIView):
             return Response({"error": "Invalid input format. Expected a list of employee timesheets."}, status=status.HTTP_400_BAD_REQUEST)
         
         errors = []
+        unplanned_changes, entry_changes = {}, {}
 
         for employee_entry in data:
             employee_id = employee_entry.get("employee_id")
@@ -720,16 +414,16 @@ class BulkApproveTimesheetsAPIView(APIView):
             
             approver_comments = employee_entry.get("approver_comments", "")
             if unplanned_timesheet_id:
-                try:
-                    unplanned_entry = EmployeeUnplannedNonbillableHours.objects.get(id=unplanned_timesheet_id)
-                    unplanned_entry.ts_approval_status = unplanned_status
-                    unplanned_entry.unplanned_hours = (unplanned_hours if  unplanned_hours else unplanned_entry.unplanned_hours)
-                    unplanned_entry.non_billable_hours = (timeoff_hours if timeoff_hours else unplanned_entry.non_billable_hours)
-                    unplanned_entry.approver_comments = approver_comments
-                    unplanned_entry.approved_by = user_email
-                    unplanned_entry.save()
-                except ObjectDoesNotExist:
+                changes = {"ts_approval_status": unplanned_status, "approver_comments": approver_comments}
+                if unplanned_hours:
+                    changes["unplanned_hours"] = unplanned_hours
+                if timeoff_hours:
+                    changes["non_billable_hours"] = timeoff_hours
+                row_id = normalize_id(unplanned_timesheet_id)
+                if row_id is None:
                     errors.append(f"Unplanned timesheet with ID {unplanned_timesheet_id} not found.")
+                else:
+                    unplanned_changes[row_id] = changes
 
             # Process planned timesheets
             timesheets = employee_entry.get("timesheets", [])
@@ -740,17 +434,25 @@ class BulkApproveTimesheetsAPIView(APIView):
                 if not entry_timesheet_id:
                     errors.append(f"Missing timesheet_id for employee {employee_id}.")
                     continue
-
-                try:
-                    timesheet_entry = EmployeeEntryTimesheet.objects.get(id=entry_timesheet_id)
-                    timesheet_entry.ts_approval_status = timesheet_status
-                    timesheet_entry.approver_comments = employee_entry.get("approver_comments", "")
-                    timesheet_entry.approved_by = user_email
-                    timesheet_entry.save()
-                except ObjectDoesNotExist:
+                row_id = normalize_id(entry_timesheet_id)
+                if row_id is None:
                     errors.append(f"Timesheet entry with ID {entry_timesheet_id} not found.")
+                    continue
+                entry_changes[row_id] = {"ts_approval_status": timesheet_status, "approver_comments": approver_comments}
+
+        with transaction.atomic():
+            unplanned_outcomes, _ = bulk_approve_unplanned(unplanned_changes, user_email)
+            entry_outcomes, _ = bulk_approve_entries(entry_changes, user_email)
+
+        for label, outcomes in (("Unplanned timesheet", unplanned_outcomes), ("Timesheet entry", entry_outcomes)):
+            for row_id, outcome in outcomes.items():
+                if outcome["status"] == NOT_FOUND:
+                    errors.append(f"{label} with ID {row_id} not found.")
+                elif outcome["status"] != UPDATED:
+                    errors.append(f"{label} with ID {row_id}: {outcome['error']}")
 
+        outcomes = {"timesheets": entry_outcomes, "unplanned_timesheets": unplanned_outcomes}
         if errors:
-            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"errors": errors, "outcomes": outcomes}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({"message": "Timesheets approved successfully."}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({"message": "Timesheets approved successfully.", "outcomes": outcomes}, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -0,0 +1,126 @@
+import uuid
+from django.db import transaction
+from django.db.models import Q
+from c2c_modules.models import Client, GuestUser, ApproverAssignment, GuestUserClient
+from c2c_modules.custom_logger import info
+
+# ApproverAssignment column holding each model whose `approver` list it mirrors.
+ASSIGNMENT_FIELDS = {
+    'Allocation': 'allocation',
+    'Timesheet': 'timesheet',
+    'EmployeeEntryTimesheet': 'entry',
+}
+
+
+def approver_ids(approvers):
+    """Approver ids of an `approver` JSON list ([{"approver_id": ..., "approver_name": ...}])."""
+    ids = set()
+    for approver in approvers or []:
+        if isinstance(approver, dict) and approver.get("approver_id"):
+            ids.add(str(approver["approver_id"]))
+    return ids
+
+def sync_approver_assignments(instances):
+    """
+    Make the ApproverAssignment rows of these allocations, timesheets or entries (all of one model)
+    match their `approver` lists: one read, one delete, one insert.
+    """
+    instances = [instance for instance in instances if instance.pk is not None]
+    if not instances:
+        return
+    field = ASSIGNMENT_FIELDS[type(instances[0]).__name__]
+    wanted = {(approver_id, instance.pk) for instance in instances for approver_id in approver_ids(instance.approver)}
+    existing = list(ApproverAssignment.objects.filter(
+        **{f'{field}__in': [instance.pk for instance in instances]}
+    ).values_list('id', 'approver_id', f'{field}_id'))
+    stale_ids = [row_id for row_id, approver_id, target_id in existing if (approver_id, target_id) not in wanted]
+    missing = wanted - {(approver_id, target_id) for _, approver_id, target_id in existing}
+    with transaction.atomic():
+        ApproverAssignment.objects.filter(id__in=stale_ids).delete()
+        ApproverAssignment.objects.bulk_create(
+            [ApproverAssignment(approver_id=approver_id, **{f'{field}_id': target_id}) for approver_id, target_id in missing],
+            ignore_conflicts=True,
+        )
+
+def parse_client_ids(client_ids):
+    """UUIDs of a `GuestUser.client_ids` list, skipping malformed values."""
+    parsed = set()
+    for client_id in client_ids or []:
+        try:
+            parsed.add(uuid.UUID(str(client_id)))
+        except ValueError:
+            continue
+    return parsed
+
+def sync_guest_user_links(wanted, existing):
+    """Apply the difference between wanted and stored {(guest user id, client uuid)} links."""
+    with transaction.atomic():
+        GuestUserClient.objects.filter(id__in=[row_id for link, row_id in existing.items() if link not in wanted]).delete()
+        GuestUserClient.objects.bulk_create(
+            [GuestUserClient(guest_user_id=guest_user_id, client_id=client_id) for guest_user_id, client_id in wanted - existing.keys()],
+            ignore_conflicts=True,
+        )
+
+def sync_guest_user_clients(guest_user):
+    """Make the GuestUserClient rows of a guest user match `client_ids`, ignoring clients that do not exist."""
+    wanted = {
+        (guest_user.pk, client_id)
+        for client_id in Client.objects.filter(uuid__in=parse_client_ids(guest_user.client_ids)).values_list('uuid', flat=True)
+    }
+    existing = {
+        (guest_user_id, client_id): row_id
+        for row_id, guest_user_id, client_id in GuestUserClient.objects.filter(guest_user=guest_user).values_list('id', 'guest_user_id', 'client_id')
+    }
+    sync_guest_user_links(wanted, existing)
+
+def link_guest_users_to_client(client):
+    """Link a newly created client to the guest users already listing it; saving them skipped it as unknown."""
+    guest_user_ids = [
+        guest_user_id for guest_user_id, client_ids in GuestUser.objects.values_list('guest_user_id', 'client_ids')
+        if client.pk in parse_client_ids(client_ids)
+    ]
+    GuestUserClient.objects.bulk_create(
+        [GuestUserClient(guest_user_id=guest_user_id, client_id=client.pk) for guest_user_id in guest_user_ids],
+        ignore_conflicts=True,
+    )
+
+def guest_user_client_uuids(guest_user_id):
+    """
+    Client UUIDs a guest user approves for. A guest user written outside the application has no
+    links until it is reconciled, so its `client_ids` are read directly until then.
+    """
+    linked = set(GuestUserClient.objects.filter(guest_user_id=guest_user_id).values_list('client_id', flat=True))
+    if linked:
+        return linked
+    client_ids = GuestUser.objects.filter(guest_user_id=guest_user_id).values_list('client_ids', flat=True).first()
+    return parse_client_ids(client_ids)
+
+def guest_users_for_clients(client_uuids):
+    """Guest users approving for any of these clients, including those whose links are not synced yet."""
+    linked = GuestUser.objects.filter(client_links__client_id__in=client_uuids).values_list('guest_user_id', flat=True)
+    unlinked = [
+        guest_user_id
+        for guest_user_id, client_ids in GuestUser.objects.filter(client_links__isnull=True).values_list('guest_user_id', 'client_ids')
+        if parse_client_ids(client_ids) & client_uuids
+    ]
+    return GuestUser.objects.filter(Q(guest_user_id__in=linked) | Q(guest_user_id__in=unlinked))
+
+def reconcile_guest_user_clients():
+    """
+    Rebuild every GuestUserClient link in three queries. Guest users written outside the
+    application never reach the save signal; until this runs their links are read from
+    `client_ids` directly when they have none, and this catches edits to existing ones.
+    """
+    client_uuids = set(Client.objects.values_list('uuid', flat=True))
+    wanted = {
+        (guest_user_id, client_id)
+        for guest_user_id, client_ids in GuestUser.objects.values_list('guest_user_id', 'client_ids')
+        for client_id in parse_client_ids(client_ids) & client_uuids
+    }
+    existing = {
+        (guest_user_id, client_id): row_id
+        for row_id, guest_user_id, client_id in GuestUserClient.objects.values_list('id', 'guest_user_id', 'client_id')
+    }
+    sync_guest_user_links(wanted, existing)
+    info(f"Guest user client links reconciled: {len(wanted)} links")
+    return {'status': 'success', 'links': len(wanted)}
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class C2CModulesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "c2c_modules"
+
+    def ready(self):
+        import c2c_modules.signals
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import time
+import uuid
+import weakref
+import httpx
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
+from config import PROFILE, OUTBOUND_CONNECT_TIMEOUT, OPENAI_READ_TIMEOUT, ASYNC_PROXY_MAX_CONNECTIONS
+from c2c_modules.models import FileModel
+from c2c_modules.httpclient import (openai_api, document_parser_api, UpstreamUnavailable,
+                                    DEFAULT_CONNECT_TIMEOUT)
+from c2c_modules.textextraction import extract_document_type
+from c2c_modules.blobcache import blob_cache
+
+STREAM_CHUNK_SIZE = 64 * 1024
+DEFAULT_ASYNC_MAX_CONNECTIONS = 200
+DEFAULT_PROXY_READ_TIMEOUT = 120
+
+# One client per event loop: the pool cannot be shared across loops, and each uvicorn worker runs one.
+_http_clients = weakref.WeakKeyDictionary()
+
+
+def get_http_client():
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        connect_timeout = float(OUTBOUND_CONNECT_TIMEOUT or DEFAULT_CONNECT_TIMEOUT)
+        max_connections = int(ASYNC_PROXY_MAX_CONNECTIONS or DEFAULT_ASYNC_MAX_CONNECTIONS)
+        client = _http_clients[loop] = httpx.AsyncClient(
+            timeout=httpx.Timeout(float(OPENAI_READ_TIMEOUT or DEFAULT_PROXY_READ_TIMEOUT),
+                                  connect=connect_timeout, pool=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+    return client
+
+async def proxy_post(upstream, path, content, headers, params=None):
+    """
+    POST a streamed body to one of the upstreams in `httpclient`, sharing its circuit breaker
+    and metrics. Streamed bodies cannot be replayed, so there are no retries.
+    """
+    upstream.admit()
+    url = upstream.url(path)
+    started = time.perf_counter()
+    try:
+        response = await get_http_client().post(url, content=content, headers=headers, params=params)
+    except BaseException as e:
+        # Cancellation (client gone) and body errors too: a HALF_OPEN trial left unsettled would
+        # keep the circuit rejecting every call.
+        upstream.record_result("POST", url, started, exc=e)
+        raise
+    upstream.record_result("POST", url, started, status_code=response.status_code)
+    return response
+
+def multipart_parts(fields, file_field, file_name, content_type):
+    """(boundary, prefix, suffix) wrapping a single streamed file part after the plain fields."""
+    boundary = uuid.uuid4().hex
+    prefix = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    )
+    quoted_name = file_name.replace('"', '%22')
+    prefix += (f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{quoted_name}"\r\n'
+               f'Content-Type: {content_type}\r\n\r\n').encode()
+    suffix = f"\r\n--{boundary}--\r\n".encode()
+    return boundary, prefix, suffix
+
+async def multipart_stream(prefix, chunks, suffix):
+    yield prefix
+    async for chunk in chunks:
+        yield chunk
+    yield suffix
+
+def multipart_request(fields, file_field, file_name, size, chunks, content_type="application/octet-stream"):
+    """Body and headers for a multipart upload whose file part is streamed from `chunks` (`size` bytes)."""
+    boundary, prefix, suffix = multipart_parts(fields, file_field, file_name, content_type)
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(prefix) + size + len(suffix)),
+    }
+    return multipart_stream(prefix, chunks, suffix), headers
+
+async def iter_request_body(request):
+    # The ASGI handler has already spooled the body; read it back in chunks without parsing it.
+    while chunk := request.read(STREAM_CHUNK_SIZE):
+        yield chunk
+
+async def iter_file(file_path):
+    with open(file_path, "rb") as file_:
+        while chunk := await sync_to_async(file_.read, thread_sensitive=False)(STREAM_CHUNK_SIZE):
+            yield chunk
+
+def upstream_json_response(response, status=None):
+    """The upstream's JSON reply, or a 502 if it did not send JSON."""
+    try:
+        data = response.json()
+    except ValueError:
+        return JsonResponse({'error': f"Upstream returned a non-JSON response (status {response.status_code})"}, status=502)
+    return JsonResponse(data, status=status or response.status_code)
+
+def save_upload(request):
+    """Save the uploaded 'file' under uploaded_files/ and return its path, or None if there is none."""
+    if 'file' not in request.FILES:
+        return None
+    file_ = request.FILES['file']
+    upload_dir = os.path.join('uploaded_files')
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, file_.name)
+    with open(file_path, 'wb+') as destination:
+        for chunk in file_.chunks():
+            destination.write(chunk)
+    return file_path
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class RedirectOpenAIView(View):
+    """Forward a document upload for extraction without loading it into memory."""
+    async def post(self, request):
+        try:
+            if PROFILE == "PROD":
+                if request.content_type != "multipart/form-data":
+                    return JsonResponse({'error': 'No file part in the request'}, status=400)
+                # The multipart body is passed through as sent, boundary included.
+                headers = {"Content-Type": request.META["CONTENT_TYPE"]}
+                if request.META.get("CONTENT_LENGTH"):
+                    headers["Content-Length"] = request.META["CONTENT_LENGTH"]
+                response = await proxy_post(openai_api, "upload", iter_request_body(request), headers)
+            else:
+                file_path = await sync_to_async(save_upload, thread_sensitive=False)(request)
+                if file_path is None:
+                    return JsonResponse({'error': 'No file part in the request'}, status=400)
+                document_type = await sync_to_async(extract_document_type, thread_sensitive=False)(file_path)
+                content, headers = multipart_request(
+                    {}, 'file', os.path.basename(file_path), os.path.getsize(file_path), iter_file(file_path)
+                )
+                response = await proxy_post(
+                    document_parser_api, "extract-information/", content, headers,
+                    params={"document_type": document_type}
+                )
+            return upstream_json_response(response, status=200)
+        except (httpx.HTTPError, UpstreamUnavailable) as e:
+            return JsonResponse({'error': str(e)}, status=200)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class RedirectChatbotOpenAIView(View):
+    """Ask the chatbot about a stored document, streaming it from the blob cache to the upstream."""
+    async def post(self, request, file_uuid):
+        try:
+            query = request.POST.get('query', '')
+            file_model = await FileModel.objects.aget(uuid=file_uuid)
+            file_name = file_model.download_name
+            # Repeat questions about the same document are answered from the local copy.
+            cached = await sync_to_async(blob_cache.get, thread_sensitive=False)(file_model.blob_name)
+            content, headers = multipart_request(
+                {'query': query}, 'file', file_name, cached.size, iter_file(cached.path)
+            )
+            try:
+                response = await proxy_post(openai_api, "query_document", content, headers)
+                return upstream_json_response(response)
+            except (httpx.HTTPError, UpstreamUnavailable) as e:
+                return JsonResponse({'error': str(e)}, status=500)
+
+        except Exception as e:
+            return JsonResponse({'error': f"An error occurred: {str(e)}"}, status=500)
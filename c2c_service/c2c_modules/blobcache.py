@@ -0,0 +1,274 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from azure.core import MatchConditions
+from azure.storage.blob import BlobServiceClient
+from django.http import HttpResponse, StreamingHttpResponse
+from config import (AZURE_CONNECTION_STRING, AZURE_CONTAINER_NAME, BLOB_CACHE_DIR, BLOB_CACHE_MAX_MB,
+                    BLOB_CACHE_ETAG_TTL_SECONDS)
+from c2c_modules.custom_logger import info, warning
+from c2c_modules.rolecache import SingleFlight
+from c2c_modules.exports import async_stream
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "c2c_blob_cache")
+DEFAULT_MAX_MB = 512
+DEFAULT_ETAG_TTL_SECONDS = 60
+STREAM_CHUNK_SIZE = 64 * 1024
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_blob_service = None
+_blob_service_lock = threading.Lock()
+
+
+def get_blob_service():
+    """Process-wide BlobServiceClient; it is thread-safe and keeps its connection pool between calls."""
+    global _blob_service
+    if _blob_service is None:
+        with _blob_service_lock:
+            if _blob_service is None:
+                _blob_service = BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
+    return _blob_service
+
+
+class AzureContainer:
+    """The two storage calls the cache needs. Anything with the same methods can stand in for it."""
+    def __init__(self, container_name=AZURE_CONTAINER_NAME):
+        self.container_name = container_name
+
+    def _blob(self, blob_name):
+        return get_blob_service().get_blob_client(container=self.container_name, blob=blob_name)
+
+    def get_etag(self, blob_name):
+        return self._blob(blob_name).get_blob_properties().etag
+
+    def download_to(self, blob_name, etag, output):
+        # Fails rather than mixing versions if the blob was overwritten since get_etag.
+        self._blob(blob_name).download_blob(etag=etag, match_condition=MatchConditions.IfNotModified).readinto(output)
+
+
+def http_etag(etag):
+    return '"%s"' % etag.strip('"')
+
+
+class CachedBlob:
+    def __init__(self, blob_name, etag, path, size):
+        self.blob_name = blob_name
+        self.etag = etag
+        self.path = path
+        self.size = size
+
+
+class BlobCache:
+    """
+    Disk-backed LRU cache of blob contents, keyed by blob name and ETag, so an overwritten blob
+    is fetched again and its old copy ages out. The blob's current ETag is remembered for
+    `etag_ttl` seconds, so repeat reads within that window make no storage call at all.
+    """
+    def __init__(self, container, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024,
+                 etag_ttl=DEFAULT_ETAG_TTL_SECONDS):
+        self.container = container
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.etag_ttl = etag_ttl
+        self._entries = OrderedDict()  # cache key -> size, least recently used first
+        self._etags = {}  # blob name -> (etag, checked at)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._downloads = SingleFlight()
+        os.makedirs(directory, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        """Pick up the files left by a previous process (or another worker), oldest use first."""
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".part"):
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._size += size
+        self._evict()
+        if self._entries:
+            info(f"Blob cache loaded {len(self._entries)} file(s), {self._size} bytes from {self.directory}")
+
+    @staticmethod
+    def cache_key(blob_name, etag):
+        return hashlib.sha256(f"{blob_name}\0{etag}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def current_etag(self, blob_name):
+        with self._lock:
+            known = self._etags.get(blob_name)
+        if known is not None and time.monotonic() - known[1] < self.etag_ttl:
+            return known[0]
+        etag = self.container.get_etag(blob_name)
+        with self._lock:
+            self._etags[blob_name] = (etag, time.monotonic())
+        return etag
+
+    def forget(self, blob_name):
+        """Drop the remembered ETag, e.g. after the blob has been overwritten by an upload."""
+        with self._lock:
+            self._etags.pop(blob_name, None)
+
+    def get(self, blob_name):
+        """Return a CachedBlob for the current version of the blob, downloading it on a miss."""
+        etag = self.current_etag(blob_name)
+        key = self.cache_key(blob_name, etag)
+        cached = self._lookup(blob_name, etag, key)
+        if cached is not None:
+            return cached
+        return self._downloads.do(key, lambda: self._lookup(blob_name, etag, key) or self._download(blob_name, etag, key))
+
+    def _lookup(self, blob_name, etag, key):
+        path = self._path(key)
+        with self._lock:
+            size = self._entries.get(key)
+            if size is None:
+                return None
+            self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker sharing the directory.
+            with self._lock:
+                if self._entries.pop(key, None) is not None:
+                    self._size -= size
+            return None
+        return CachedBlob(blob_name, etag, path, size)
+
+    def _download(self, blob_name, etag, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            # Already fetched by another worker sharing the directory.
+            size = os.path.getsize(path)
+            self._add(key, size)
+            return CachedBlob(blob_name, etag, path, size)
+        fd, part_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as output:
+                self.container.download_to(blob_name, etag, output)
+            size = os.path.getsize(part_path)
+            os.replace(part_path, path)
+        except Exception:
+            os.unlink(part_path)
+            self.forget(blob_name)
+            raise
+        self._add(key, size)
+        return CachedBlob(blob_name, etag, path, size)
+
+    def _add(self, key, size):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous
+            self._entries[key] = size
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        # Keeps the most recent entry even if it alone is over the cap; it is being served.
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                warning(f"Blob cache could not remove {key}: {e}")
+
+
+def requested_range(range_header, size):
+    """(start, end) inclusive for a single 'bytes=' range, None to send it all, or False if unsatisfiable."""
+    match = RANGE_HEADER.match((range_header or "").strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+def iter_file_range(file_, start, length):
+    file_.seek(start)
+    try:
+        while length > 0:
+            chunk = file_.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file_.close()
+
+def cached_blob_response(request, blob_name, file_name, cache=None):
+    """
+    Download response for a blob, served from the local cache: ETag and conditional GET
+    (If-None-Match -> 304 without touching the cache) and single byte ranges (Range,
+    honouring If-Range -> 206).
+    """
+    cache = cache or blob_cache
+    etag = http_etag(cache.current_etag(blob_name))
+    if_none_match = request.headers.get("If-None-Match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+    cached = cache.get(blob_name)
+    etag = http_etag(cached.etag)
+    # Opened before responding, so a concurrent eviction cannot pull the file from under the response.
+    file_ = open(cached.path, "rb")
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if "Range" in request.headers and (if_range is None or if_range.strip() == etag):
+        byte_range = requested_range(request.headers["Range"], cached.size)
+    if byte_range is False:
+        file_.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{cached.size}"
+        return response
+    start, end = byte_range or (0, cached.size - 1)
+    # File reads do not touch the database, so they stay off the thread that runs the sync views.
+    response = StreamingHttpResponse(
+        async_stream(iter_file_range(file_, start, end - start + 1), thread_sensitive=False),
+        status=200 if byte_range is None else 206, content_type='application/octet-stream'
+    )
+    if byte_range is not None:
+        response["Content-Range"] = f"bytes {start}-{end}/{cached.size}"
+    response["Content-Length"] = end - start + 1
+    response["ETag"] = etag
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, no-cache"
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    return response
+
+
+def build_blob_cache(container=None):
+    return BlobCache(
+        container or AzureContainer(),
+        directory=BLOB_CACHE_DIR or DEFAULT_CACHE_DIR,
+        max_bytes=int(float(BLOB_CACHE_MAX_MB or DEFAULT_MAX_MB) * 1024 * 1024),
+        etag_ttl=float(BLOB_CACHE_ETAG_TTL_SECONDS or DEFAULT_ETAG_TTL_SECONDS),
+    )
+
+
+blob_cache = build_blob_cache()
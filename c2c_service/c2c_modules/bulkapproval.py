@@ -0,0 +1,144 @@
+from collections import defaultdict
+from functools import reduce
+import operator
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from c2c_modules.models import EmployeeEntryTimesheet, EmployeeUnplannedNonbillableHours
+from c2c_modules.missingweeks import invalidate_missing_weeks
+from c2c_modules.pendingcounts import queue_pending_refresh
+
+# Upper bound on ids per statement, so thousands of ids never build one giant IN list.
+BULK_CHUNK_SIZE = 500
+HOUR_FIELDS = {'billable_hours', 'non_billable_hours', 'unplanned_hours'}
+
+UPDATED = "updated"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+
+
+def chunked(items, size=BULK_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def normalize_id(row_id):
+    try:
+        return int(row_id)
+    except (TypeError, ValueError):
+        return None
+
+def load_rows(model, ids, employee_ids=None):
+    """
+    Fetch the rows for the given ids, one query per chunk. When `employee_ids` ({id: employee id})
+    is given, rows owned by another employee are treated as missing.
+    """
+    rows = {}
+    for chunk in chunked(ids):
+        rows.update(model.objects.in_bulk(chunk))
+    if employee_ids:
+        rows = {
+            row_id: row for row_id, row in rows.items()
+            if employee_ids.get(row_id) in (None, str(row.employee_id_id))
+        }
+    return rows
+
+def group_changes(changes_by_id):
+    """Group ids that receive exactly the same field values, so each group is one UPDATE."""
+    groups = defaultdict(list)
+    for row_id, changes in changes_by_id.items():
+        groups[tuple(sorted(changes.items()))].append(row_id)
+    return groups
+
+def apply_changes(model, changes_by_id, rows, user_email):
+    """
+    Write the changes of every found row. Status/comment-only changes are applied with one
+    `UPDATE ... WHERE id IN (...)` per distinct change set and chunk; rows whose hours change go
+    through the model's hour normalisation and `bulk_update` in chunks.
+    Returns {id: error message} for rows whose hours could not be parsed; those are left untouched.
+    """
+    errors = {}
+    stamp = {'approved_by': user_email, 'date_updated': timezone.now()}
+    hour_rows = []
+    hour_fields = set()
+    for change_items, row_ids in group_changes(changes_by_id).items():
+        changes = dict(change_items)
+        if HOUR_FIELDS & changes.keys():
+            for row_id in row_ids:
+                row = rows[row_id]
+                for field, value in changes.items():
+                    setattr(row, field, value)
+                row.approved_by = user_email
+                try:
+                    row.set_hours_as_float()
+                    if hasattr(row, 'calculate_total_hours'):
+                        row.calculate_total_hours()
+                except (TypeError, ValueError) as e:
+                    errors[row_id] = str(e)
+                    continue
+                hour_rows.append(row)
+            hour_fields.update(changes)
+            continue
+        for chunk in chunked(row_ids):
+            model.objects.filter(id__in=chunk).update(**changes, **stamp)
+    if hour_rows:
+        fields = hour_fields | {'approved_by', 'date_updated'}
+        if hasattr(model, 'calculate_total_hours'):
+            fields.add('total_hours')
+        for row in hour_rows:
+            row.date_updated = stamp['date_updated']
+        model.objects.bulk_update(hour_rows, sorted(fields), batch_size=BULK_CHUNK_SIZE)
+    return errors
+
+def bulk_apply(model, changes_by_id, user_email, employee_ids=None):
+    """
+    Validate the ids in one pass and apply the changes inside a transaction.
+    Returns ({id: {"status": ..., "error"?: ...}}, {id: row}) for the requested ids.
+    """
+    rows = load_rows(model, changes_by_id, employee_ids)
+    found_changes = {row_id: changes for row_id, changes in changes_by_id.items() if row_id in rows}
+    with transaction.atomic():
+        errors = apply_changes(model, found_changes, rows, user_email)
+        invalidate_missing_weeks(rows[row_id].employee_id_id for row_id in found_changes)
+        queue_pending_refresh(
+            (rows[row_id].employee_id_id, rows[row_id].year, rows[row_id].week_number) for row_id in found_changes
+        )
+    outcomes = {}
+    for row_id in changes_by_id:
+        if row_id not in rows:
+            outcomes[row_id] = {"status": NOT_FOUND}
+        elif row_id in errors:
+            outcomes[row_id] = {"status": INVALID, "error": errors[row_id]}
+        else:
+            outcomes[row_id] = {"status": UPDATED}
+    return outcomes, rows
+
+def approve_empty_unplanned_weeks(entries, user_email):
+    """
+    Approve the unplanned/time-off record of each (employee, year, week) of the given entries
+    when it carries no hours, as approving a planned timesheet implies.
+    """
+    keys = {(entry.employee_id_id, entry.year, entry.week_number) for entry in entries}
+    if not keys:
+        return 0
+    updated = 0
+    for chunk in chunked(keys):
+        week_filter = reduce(operator.or_, (
+            Q(employee_id=employee_id, year=year, week_number=week_number)
+            for employee_id, year, week_number in chunk
+        ))
+        empty_weeks = EmployeeUnplannedNonbillableHours.objects.filter(week_filter).filter(
+            Q(unplanned_hours__isnull=True) | Q(unplanned_hours=0),
+            Q(non_billable_hours__isnull=True) | Q(non_billable_hours=0)
+        )
+        updated += empty_weeks.update(ts_approval_status="approved", approved_by=user_email, date_updated=timezone.now())
+    invalidate_missing_weeks(employee_id for employee_id, _, _ in keys)
+    return updated
+
+def bulk_approve_entries(changes_by_id, user_email, employee_ids=None):
+    """Apply approval changes to EmployeeEntryTimesheet rows; see `bulk_apply`."""
+    return bulk_apply(EmployeeEntryTimesheet, changes_by_id, user_email, employee_ids)
+
+def bulk_approve_unplanned(changes_by_id, user_email):
+    """Apply approval changes to EmployeeUnplannedNonbillableHours rows; see `bulk_apply`."""
+    return bulk_apply(EmployeeUnplannedNonbillableHours, changes_by_id, user_email)
@@ -135,7 +135,7 @@ class SearchAPIView(APIView):
         query = Q(name__icontains=search_query)
         if client_id:
             query &= Q(client_id=client_id)
-        records = Client.objects.filter(query)
+        records = Client.objects.filter(query).prefetch_related('client_contracts')
         serializer = ClientSerializer(records, many=True)
         return serializer.data
 
@@ -143,7 +143,7 @@ class SearchAPIView(APIView):
         query = Q(name__icontains=search_query)
         if client_id:
             query &= Q(client__uuid=client_id)
-        records = Estimation.objects.filter(query)
+        records = EstimationSerializer.setup_eager_loading(Estimation.objects.filter(query))
         serializer = EstimationSerializer(records, many=True)
         return serializer.data
 
@@ -151,7 +151,7 @@ class SearchAPIView(APIView):
         query = Q(name__icontains=search_query)
         if client_id:
             query &= Q(client__uuid=client_id)
-        records = Contract.objects.filter(query)
+        records = ContractSerializer.setup_eager_loading(Contract.objects.filter(query))
         serializer = ContractSerializer(records, many=True)
         return serializer.data
 
@@ -159,7 +159,7 @@ class SearchAPIView(APIView):
         query = Q(name__icontains=search_query)
         if client_id:
             query &= Q(client__uuid=client_id)
-        records = Pricing.objects.filter(query)
+        records = PricingSerializer.setup_eager_loading(Pricing.objects.filter(query))
         serializer = PricingSerializer(records, many=True)
         return serializer.data
 
@@ -167,7 +167,7 @@ class SearchAPIView(APIView):
         query = Q(contractsow_name__icontains=search_query)
         if client_id:
             query &= Q(client__uuid=client_id)
-        records = SowContract.objects.filter(query)
+        records = ContractSowSerializer.setup_eager_loading(SowContract.objects.filter(query))
         serializer = ContractSowSerializer(records, many=True)
         return serializer.data
 
@@ -176,7 +176,7 @@ class SearchAPIView(APIView):
         if client_id:
             query &= Q(client__uuid=client_id)
 
-        queryset = PurchaseOrder.objects.prefetch_related('utilized_amounts').all().order_by('id')
+        queryset = PurchaseOrderWithUtilizationSerializer.setup_eager_loading(PurchaseOrder.objects.all()).order_by('id')
         records = queryset.filter(query)
         serializer = PurchaseOrderWithUtilizationSerializer(records, many=True)
         return serializer.data
@@ -224,7 +224,7 @@ class SearchAPIView(APIView):
         if not timesheets.exists():
             return self.build_empty_timesheet_response(resource)
         total_planned_hours = timesheets.aggregate(Sum('billable_hours'))['billable_hours__sum'] or 0
-        ongoing_projects, completed_projects, future_projects, incomplete_projects = classify_projects(timesheets, current_date)
+        ongoing_projects, completed_projects, future_projects, incomplete_projects = classify_projects(TimesheetSerializer.setup_eager_loading(timesheets), current_date)
 
         return self.build_timesheet_response(resource, total_planned_hours, timesheets, ongoing_projects, future_projects, completed_projects, incomplete_projects)
 
@@ -26,7 +26,7 @@ class ContractSowGetAPIView(ListModelMixin, GenericAPIView):
         required_roles = ["c2c_po_admin","c2c_sow_admin","c2c_sow_viewer","c2c_viewer","c2c_super_admin","c2c_milestone_admin"]
         result = has_permission(request,required_roles)
         if result["status"] == 200:
-            queryset = self.get_queryset().filter(client=client_uuid)
+            queryset = ContractSowSerializer.setup_eager_loading(self.get_queryset().filter(client=client_uuid))
             queryset = queryset.order_by('-contractsow_creation_date')
             page = self.paginate_queryset(queryset)
             if page is not None:
@@ -1,4 +1,3 @@
-from config import AZURE_CONNECTION_STRING, AZURE_CONTAINER_NAME
 from drf_yasg.utils import swagger_auto_schema
 from django.utils.dateparse import parse_date
 from rest_framework.generics import GenericAPIView
@@ -7,10 +6,10 @@ from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
 from rest_framework import status
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse
 from c2c_modules.models import Contract, FileModel
 from c2c_modules.serializer import ContractSerializer, ContractCreateSerializer, ContractUpdateSerializer, FileSerializer
-from azure.storage.blob import BlobServiceClient
+from c2c_modules.blobcache import cached_blob_response
 from rest_framework.generics import RetrieveUpdateDestroyAPIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from c2c_modules.utils import has_permission, upload_file_to_blob
@@ -42,7 +41,7 @@ class ContractGetAPIView(ListModelMixin, CreateModelMixin, GenericAPIView):
 
             if client_id:
                 queryset = queryset.filter(client=client_id)
-            queryset = queryset.order_by('-contract_creation_date')
+            queryset = ContractSerializer.setup_eager_loading(queryset.order_by('-contract_creation_date'))
             page = self.paginate_queryset(queryset)
             if page is not None:
                 serializer = self.get_serializer(page, many=True)
@@ -230,20 +229,8 @@ class AzurBlobFileDownload(APIView):
         result = has_permission(request,required_roles)
         if result["status"] == 200:
             try:
-                blob_service_client = BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
-                query_set = FileModel.objects.get(uuid=file_uuid)
-                serializer = FileSerializer(query_set)
-                data = serializer.data
-                file_name = data["blob_name"]
-                blob_client = blob_service_client.get_blob_client(container=AZURE_CONTAINER_NAME, blob=data["blob_name"])
-                download_stream = blob_client.download_blob()
-                file_data = download_stream.readall()
-                response = HttpResponse(content_type='application/octet-stream')
-                response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-                response.write(file_data)
-                response = HttpResponse(file_data, content_type='application/octet-stream')
-                response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-                return response
+                file_model = FileModel.objects.get(uuid=file_uuid)
+                return cached_blob_response(request, file_model.blob_name, file_model.download_name)
             except Exception as e:
                 print(str(e))
                 return Response(data={'status': str(e),"result":result}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -260,7 +247,7 @@ class AzurBlobFileDeleter(APIView):
                 serializer = FileSerializer(query_set)
                 data = serializer.data
                 if data["blob_name"]:
-                    file_name = data["blob_name"]
+                    file_name = query_set.download_name
                     query_set.status = 'inactive'
                     query_set.save(update_fields=['status'])
                     updated_file_info = {
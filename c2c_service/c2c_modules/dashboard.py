@@ -0,0 +1,197 @@
+import threading
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum, Q, F, Count
+from django.utils import timezone
+from c2c_modules.models import SowContract, PurchaseOrder, MainMilestone, Invoices, DashboardSnapshot
+from c2c_modules.custom_logger import info, error
+
+
+def get_active_sows():
+    now = timezone.now().date()
+    total_sows = SowContract.objects.all()
+    total_sow_count = total_sows.count()
+    active_sows = SowContract.objects.filter(
+        Q(end_date__gte=now) | Q(end_date__isnull=True)
+    )
+    total_active_sow_amount = active_sows.aggregate(total_amount=Sum('total_contract_amount'))['total_amount'] or 0.0
+    active_sow_count = active_sows.count()
+    return {
+        "active_sow_count": active_sow_count,
+        "total_active_sow_amount": total_active_sow_amount,
+        "total_sow_count" : total_sow_count
+    }
+
+def get_unutilized_purchase_orders():
+    unutilized_pos = PurchaseOrder.objects.annotate(
+        total_utilized_amount=Sum('utilized_amounts__utilized_amount')
+    )
+    unutilized_pos = unutilized_pos.filter(
+        Q(total_utilized_amount__lt=F('po_amount')) | Q(total_utilized_amount__isnull=True)
+    )
+    unutilized_po_count = unutilized_pos.count()
+    total_unutilized_po_amount = unutilized_pos.annotate(
+        remaining_amount=F('po_amount') - F('total_utilized_amount')
+    ).aggregate(total_amount=Sum('remaining_amount'))['total_amount'] or 0.0
+    total_po_count = PurchaseOrder.objects.count()
+    return {
+        "unutilized_po_count": unutilized_po_count,
+        "total_unutilized_po_amount": total_unutilized_po_amount,
+        "total_po_count": total_po_count
+    }
+
+def get_active_invoices():
+    active_invoices = Invoices.objects.filter(c2c_invoice_status='Active')
+    active_invoice_count = active_invoices.count()
+    total_active_invoice_amount = active_invoices.aggregate(total_amount=Sum('c2c_invoice_amount'))['total_amount'] or 0.0
+    total_invoices_count = Invoices.objects.count()
+    return {
+        "active_invoice_count": active_invoice_count,
+        "total_active_invoice_amount": total_active_invoice_amount,
+        "total_invoices_count": total_invoices_count
+    }
+
+def get_sow_contracts_with_utilized_amount_but_no_allocation():
+    sow_contracts_with_utilized_amount = SowContract.objects.filter(
+        utilized_amounts__isnull=False
+    ).annotate(
+        allocation_count=Count('contractsow_allocation')
+    ).filter(allocation_count=0)
+    pending_allocation_count = sow_contracts_with_utilized_amount.count()
+    total_allocation_count = SowContract.objects.annotate(
+        allocation_count=Count('contractsow_allocation')
+        ).aggregate(total_allocations=Sum('allocation_count'))['total_allocations'] or 0
+    return {
+        "pending_allocation_count": pending_allocation_count,
+        "total_allocation_count": total_allocation_count
+    }
+
+def get_sow_vs_milestones_comparison():
+    now = timezone.now().date()
+    active_sow_contracts = SowContract.objects.filter(Q(end_date__gte=now) | Q(end_date__isnull=True))
+    total_active_sow_amount = active_sow_contracts.aggregate(
+        total_amount=Sum('total_contract_amount')
+    )['total_amount'] or 0.0
+    active_sow_ids = active_sow_contracts.values_list('uuid', flat=True)
+    total_milestone_amount = MainMilestone.objects.filter(
+        contract_sow_uuid__in=active_sow_ids
+    ).aggregate(total_amount=Sum('milestone_total_amount'))['total_amount'] or 0.0
+    return {
+        "total_active_sow_amount": total_active_sow_amount,
+        "total_milestone_amount": total_milestone_amount
+    }
+
+def get_sow_po_status():
+    total_sow_count = SowContract.objects.count()
+    sows_with_utilized_amount = SowContract.objects.annotate(
+        utilized_count=Count('utilized_amounts')
+    ).filter(utilized_count__gt=0).count()
+    return {
+        "total_sow_count": total_sow_count,
+        "sows_with_po_attached": sows_with_utilized_amount,
+        "sows_with_po_pending": total_sow_count - sows_with_utilized_amount
+    }
+
+
+SECTIONS = {
+    "active_sows": get_active_sows,
+    "unutilized_purchase_orders": get_unutilized_purchase_orders,
+    "active_invoices": get_active_invoices,
+    "pending_allocations": get_sow_contracts_with_utilized_amount_but_no_allocation,
+    "sow_vs_milestones_comparison": get_sow_vs_milestones_comparison,
+    "sow_po_status": get_sow_po_status,
+}
+
+# Which sections read each model, so a change only recomputes what it can affect.
+SECTIONS_BY_MODEL = {
+    "SowContract": {"active_sows", "pending_allocations", "sow_vs_milestones_comparison", "sow_po_status"},
+    "PurchaseOrder": {"unutilized_purchase_orders"},
+    "UtilizedAmount": {"unutilized_purchase_orders", "pending_allocations", "sow_po_status"},
+    "Invoices": {"active_invoices"},
+    "MainMilestone": {"sow_vs_milestones_comparison"},
+    "Allocation": {"pending_allocations"},
+}
+
+
+def to_json(value):
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def compute_sections(sections=None):
+    """Compute the given sections (all by default): ({section: figures}, {section: error message})."""
+    results = {}
+    errors = {}
+    for section in sections or SECTIONS:
+        try:
+            results[section] = to_json(SECTIONS[section]())
+        except Exception as e:
+            error(f"Error computing dashboard section {section}: {e}")
+            errors[section] = str(e)
+    return results, errors
+
+def refresh_sections(sections=None):
+    """
+    Recompute the given sections (all by default) and store them in the snapshot. A section that
+    fails keeps its previous figures; its error is returned, not stored.
+    """
+    results, errors = compute_sections(sections)
+    computed_at = timezone.now()
+    DashboardSnapshot.objects.bulk_create(
+        [DashboardSnapshot(section=section, data=data, computed_at=computed_at) for section, data in results.items()],
+        update_conflicts=True,
+        unique_fields=['section'],
+        update_fields=['data', 'computed_at']
+    )
+    return results, errors, computed_at
+
+def reconcile_dashboard():
+    """Periodic full rebuild; also rolls `active` figures over as end dates pass."""
+    results, errors, computed_at = refresh_sections()
+    if errors:
+        return {'status': 'failed', 'sections': list(results), 'failed_sections': errors}
+    info(f"Dashboard snapshot reconciled at {computed_at}")
+    return {'status': 'success', 'sections': list(results)}
+
+def get_snapshot():
+    """The stored dashboard and the time of its oldest section, building any missing section first."""
+    snapshots = {snapshot.section: snapshot for snapshot in DashboardSnapshot.objects.all()}
+    missing = [section for section in SECTIONS if section not in snapshots]
+    results = {section: snapshot.data for section, snapshot in snapshots.items() if section in SECTIONS}
+    computed_times = [snapshot.computed_at for section, snapshot in snapshots.items() if section in SECTIONS]
+    if missing:
+        refreshed, errors, computed_at = refresh_sections(missing)
+        # Sections that could not be built yet show their error, as the live view does.
+        results.update(refreshed)
+        results.update(errors)
+        computed_times.append(computed_at)
+    return results, min(computed_times)
+
+
+_pending = threading.local()
+
+def mark_dirty(model_name):
+    """
+    Queue the sections that read `model_name` for a refresh once the current transaction commits.
+    Changes made in one transaction are refreshed together by the first callback; the rest find nothing to do.
+    """
+    sections = SECTIONS_BY_MODEL.get(model_name)
+    if not sections:
+        return
+    pending = getattr(_pending, 'sections', None)
+    if pending is None:
+        pending = _pending.sections = set()
+    pending.update(sections)
+    transaction.on_commit(flush_dirty)
+
+def flush_dirty():
+    sections = getattr(_pending, 'sections', None) or set()
+    _pending.sections = set()
+    if not sections:
+        return
+    try:
+        refresh_sections(sections)
+    except Exception as e:
+        error(f"Error refreshing dashboard sections {sorted(sections)}: {e}")
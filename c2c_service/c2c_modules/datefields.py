@@ -0,0 +1,81 @@
+import re
+from datetime import date, datetime, time
+import pytz
+from django.core.exceptions import ValidationError
+from django.db import models
+
+ISO_DATE_PREFIX = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})")
+ISO_DATETIME = re.compile(r"^\d{4}-\d{1,2}-\d{1,2}[T ]\d")
+# Day-first before month-first, as for the estimation daily data.
+SLASH_DATE_FORMATS = ("%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d")
+# The UI sends a date as midnight IST in UTC, e.g. '2025-01-05T18:30:00.000Z' for 6 January,
+# and `utils.get_date_from_utc_time` reads it back in IST.
+LEGACY_TIMEZONE = pytz.timezone('Asia/Kolkata')
+LEGACY_WIRE_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+
+def parse_legacy_date(value):
+    """
+    Canonical parse of the date strings stored before the DATE columns: 'YYYY-MM-DD', ISO
+    datetimes from the UI (UTC unless they carry an offset, taken as the IST date like
+    `get_date_from_utc_time`) and 'dd/mm/YYYY'. Returns None for blank or unparseable values.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.astimezone(LEGACY_TIMEZONE).date() if value.tzinfo else value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    if ISO_DATETIME.match(text):
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = pytz.UTC.localize(parsed)
+        return parsed.astimezone(LEGACY_TIMEZONE).date()
+    match = ISO_DATE_PREFIX.match(text)
+    if match:
+        try:
+            return date(*(int(part) for part in match.groups()))
+        except ValueError:
+            return None
+    for date_format in SLASH_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+def format_legacy_date(value):
+    """Render a date in the UI's wire format, the inverse of `parse_legacy_date` for ISO datetimes."""
+    if value is None:
+        return None
+    midnight = LEGACY_TIMEZONE.localize(datetime.combine(value, time.min))
+    return midnight.astimezone(pytz.UTC).strftime(LEGACY_WIRE_FORMAT)
+
+
+class LegacyDateField(models.DateField):
+    """
+    DateField that also accepts the legacy string formats, both when assigned and in lookups,
+    so callers passing request strings keep working. Blank strings are stored as NULL.
+    """
+    def to_python(self, value):
+        if isinstance(value, str):
+            if not value.strip():
+                return None
+            parsed = parse_legacy_date(value)
+            if parsed is None:
+                raise ValidationError(
+                    self.error_messages["invalid"], code="invalid", params={"value": value}
+                )
+            return parsed
+        return super().to_python(value)
+
+    def pre_save(self, model_instance, add):
+        value = self.to_python(super().pre_save(model_instance, add))
+        setattr(model_instance, self.attname, value)
+        return value
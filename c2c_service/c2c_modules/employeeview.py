@@ -1,3 +1,4 @@
+from django.db import transaction
 from .models import Employee, SowContract, Timesheet, EmployeeEntryTimesheet, Client, EmployeeUnplannedNonbillableHours
 from .serializer import TimesheetSerializer, EmployeeEntryTimesheetSerializer
 from rest_framework.generics import GenericAPIView
@@ -8,16 +9,20 @@ from rest_framework.views import APIView
 from datetime import datetime, timedelta, date, timezone
 from django.db.models import Sum, F, Q
 from collections import Counter
-from c2c_modules.utils import has_permission, get_date_from_utc_time, time_to_hours
+from c2c_modules.utils import has_permission, get_date_from_utc_time, time_to_hours, format_hours
+from c2c_modules.allocationdays import planned_hours_by_employee, planned_hours_by_window, planned_hours_by_timesheet
+from c2c_modules.workcalendar import week_bounds, working_hours_between
+from c2c_modules.missingweeks import invalidate_missing_weeks
+from c2c_modules.pendingcounts import queue_pending_refresh
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from django.db.models.functions import Trim, Lower
 from django.utils import timezone
-import pandas as pd
 from django.utils.dateparse import parse_date
-from django.http import JsonResponse, HttpResponse
-from openpyxl import Workbook
-from io import BytesIO
+from django.http import JsonResponse
+from c2c_modules.exports import ExportSheet, export_response, requested_export_format
+from c2c_modules.timesheetsubmission import (resolve_clients, resolve_contracts, resolve_timesheets, upsert_week_entries,
+                                             HOUR_FIELDS)
 from itertools import chain
 from collections import defaultdict
 import random
@@ -175,37 +180,13 @@ class EmployeeSearchAPIView(APIView):
     DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
 
     def calculate_weekday_hours(self, start_date, end_date):
-        total_hours = 0
-        start_date = get_date_from_utc_time(str(start_date))
-        end_date = get_date_from_utc_time(str(end_date))
-        current_date = start_date
-        while current_date <= end_date:
-            if current_date.weekday() < 5:
-                total_hours += 8
-            current_date += timedelta(days=1)
-        return total_hours
+        return working_hours_between(get_date_from_utc_time(str(start_date)), get_date_from_utc_time(str(end_date)))
         
-    def check_timesheet_availability(self, timesheets, start_date, end_date, available_hours):
-        total_free_hours = 0
+    def get_planned_hours(self, timesheets, start_date, end_date):
+        """Planned weekday hours per employee over the range, from the normalized allocation days."""
         start_date = get_date_from_utc_time(str(start_date))
         end_date = get_date_from_utc_time(str(end_date))
-        for timesheet in timesheets:
-            planned_hours_per_day = 0
-            estimation_data = timesheet.resource_estimation_data.get('Estimation_Data' , {}).get('daily', [])
-            for data in estimation_data:
-                est_date = datetime.strptime(data['date'], "%d/%m/%Y")
-                est_date = est_date.date()
-                if est_date.weekday() in [5, 6]:
-                    continue
-                if start_date <= est_date <= end_date:
-                    if data.get('hours'):
-                        worked_hours = data.get('hours', 0)
-                    else:
-                        worked_hours = 0
-                    planned_hours_per_day +=worked_hours
-            total_free_hours = available_hours - planned_hours_per_day
-            available_hours = total_free_hours
-        return available_hours if available_hours > 0 else 0
+        return planned_hours_by_employee(timesheets, start_date, end_date, weekdays_only=True)
 
     def post(self, request, *args, **kwargs):
         employee_name = request.data.get('name')
@@ -234,18 +215,20 @@ class EmployeeSearchAPIView(APIView):
         if employee_name:
             employees = employees.filter(employee_full_name__icontains=employee_name)
 
+        timesheets = Timesheet.objects.filter(
+            resource__in=employees,
+            contract_sow__start_date__lte=end_date,
+            contract_sow__end_date__gte=start_date
+        )
+        allocated_employee_ids = set(timesheets.values_list('resource_id', flat=True))
+        planned_hours = self.get_planned_hours(timesheets, start_date, end_date)
+        available_hours = self.calculate_weekday_hours(start_date, end_date)
         filtered_employees = []
         for employee in employees:
-            timesheets = Timesheet.objects.filter(
-                resource=employee,
-                contract_sow__start_date__lte=end_date,
-                contract_sow__end_date__gte=start_date
-            )
-            available_hours = self.calculate_weekday_hours(start_date, end_date)
-            if not timesheets.exists():
+            if employee.employee_source_id not in allocated_employee_ids:
                 filtered_employees.append(self.build_employee_response(employee, available_hours, "Available", 0))
             else:
-                free_hours = self.check_timesheet_availability(timesheets, start_date, end_date, available_hours)
+                free_hours = max(available_hours - planned_hours.get(employee.employee_source_id, 0), 0)
                 pre_planned_hours = available_hours - free_hours
                 status_label = "Available" if free_hours >= required_hours else "Not Available"
                 filtered_employees.append(self.build_employee_response(employee, free_hours, status_label, pre_planned_hours))
@@ -330,7 +313,9 @@ class EmployeeTimesheetView(APIView):
         timesheets = Timesheet.objects.filter(resource=employee)
         current_date = date.today()
         
-        ongoing_timesheets, completed_timesheets = self.classify_timesheets(timesheets, current_date)
+        ongoing_timesheets, completed_timesheets = self.classify_timesheets(
+            TimesheetSerializer.setup_eager_loading(timesheets, employee=employee), current_date
+        )
         total_unplanned_hours, total_non_billable_hours = self.calculate_total_hours(employee)
 
         ongoing_serializer = TimesheetSerializer(ongoing_timesheets, many=True, context={'employee': employee})
@@ -351,6 +336,9 @@ class EmployeeTimesheetView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
 
 
+ENTRY_UPDATE_FIELDS = HOUR_FIELDS + ['non_billable_hours_comments', 'unplanned_hours_comments', 'timesheet_id', 'approver',
+                                     'username_updated', 'ts_approval_status']
+
 class AddTimesheetView(APIView):
     
     def get_employee(self, employee_id):
@@ -359,84 +347,85 @@ class AddTimesheetView(APIView):
         except Employee.DoesNotExist:
             raise ValueError(f"Employee with ID {employee_id} does not exist.")
 
-    def get_client(self, client_name):
-        if client_name:
-            try:
-                return Client.objects.get(name=client_name)
-            except Client.DoesNotExist:
-                raise ValueError(f"Client with name '{client_name}' does not exist.")
-        return None
-
-    def get_contract_sow(self, contract_sow_name, client):
-        if contract_sow_name and client:
-            try:
-                return SowContract.objects.get(contractsow_name=contract_sow_name, client=client)
-            except SowContract.DoesNotExist:
-                raise ValueError(f"Contract SOW with name '{contract_sow_name}' does not exist for client '{client.name}'.")
-        return None
+    def validate_entries(self, timesheets_data):
+        """
+        Check the entries in memory, resolving all client and contract names in one query each.
+        Returns ([(entry, client, contract_sow), ...], errors).
+        """
+        clients = resolve_clients(entry.get('client_name') for entry in timesheets_data)
+        contracts = resolve_contracts(entry.get('contract_sow_name') for entry in timesheets_data)
+        resolved = []
+        errors = []
+        for entry in timesheets_data:
+            client_name = entry.get('client_name')
+            contract_sow_name = entry.get('contract_sow_name')
+            client = clients.get(client_name) if client_name else None
+            if client_name and client is None:
+                errors.append({"entry": entry, "error": f"Client with name '{client_name}' does not exist."})
+                continue
+            contract_sow = None
+            if contract_sow_name and client:
+                contract_sow = next(
+                    (contract for contract in contracts.get(contract_sow_name, []) if contract.client_id == client.pk), None
+                )
+                if contract_sow is None:
+                    errors.append({"entry": entry, "error": f"Contract SOW with name '{contract_sow_name}' does not exist for client '{client.name}'."})
+                    continue
+            if client and not contract_sow:
+                errors.append({"entry": entry, "error": "Contract SOW is required when client is provided."})
+                continue
+            resolved.append((entry, client, contract_sow))
+        return resolved, errors
 
-    def create_or_update_timesheet(self, employee, client, contract_sow, year, week_number, billable_hours, non_billable_hours, unplanned_hours, total_hours, non_billable_hours_comments, unplanned_hours_comments,user_email):
-        try:
-            timesheet, _ = Timesheet.objects.get_or_create(
-                resource=employee,
-                client=client,
-                contract_sow=contract_sow,
-            )
-            approver = timesheet.approver
-            entry_timesheet, _ = EmployeeEntryTimesheet.objects.update_or_create(
+    def build_entries(self, employee, resolved, user_email):
+        """Entry rows for the validated entries, linked to the employee's timesheets (created if missing)."""
+        timesheets = resolve_timesheets(
+            employee, {(client.pk if client else None, contract_sow.pk if contract_sow else None) for _, client, contract_sow in resolved}
+        )
+        entries = []
+        for entry, client, contract_sow in resolved:
+            timesheet = timesheets[(client.pk if client else None, contract_sow.pk if contract_sow else None)]
+            billable_hours = time_to_hours(entry.get('billable_hours', 0))
+            entries.append(EmployeeEntryTimesheet(
                 timesheet_id=timesheet,
-                approver=approver,
-                year=year,
-                week_number=week_number,
+                approver=timesheet.approver,
                 client=client,
                 contract_sow=contract_sow,
-                defaults={
-                    "billable_hours": time_to_hours(billable_hours),
-                    "non_billable_hours": time_to_hours(non_billable_hours),
-                    "unplanned_hours": time_to_hours(unplanned_hours),
-                    "total_hours": time_to_hours(total_hours),
-                    "non_billable_hours_comments": non_billable_hours_comments,
-                    "unplanned_hours_comments": unplanned_hours_comments,
-                    "employee_id": employee,
-                    "username_created": user_email,
-                    "username_updated": user_email,
-                    "ts_approval_status": "submitted",
-                }
-            )
-            return entry_timesheet
-        except Exception as e:
-            raise ValueError(f"Error creating/updating Timesheet: {str(e)}")
-        
+                billable_hours=billable_hours,
+                non_billable_hours=0.0,
+                unplanned_hours=0.0,
+                total_hours=billable_hours,
+                non_billable_hours_comments="",
+                unplanned_hours_comments="",
+                username_created=user_email,
+                username_updated=user_email,
+                ts_approval_status="submitted",
+            ))
+        return entries
+
     def create_non_billable_unplanned_entries(self, employee, year, week_number, non_billable_hours, unplanned_hours, non_billable_hours_comments, unplanned_hours_comments,user_email):
+        """Insert or update the week's non-billable/unplanned record in one INSERT ... ON CONFLICT."""
         try:
-            entry_timesheet = EmployeeUnplannedNonbillableHours.objects.filter(
+            entry_timesheet = EmployeeUnplannedNonbillableHours(
                 employee_id=employee,
                 year=year,
-                week_number=week_number
-            ).first()
-
-            if entry_timesheet:
-                entry_timesheet.non_billable_hours = time_to_hours(non_billable_hours)
-                entry_timesheet.unplanned_hours = time_to_hours(unplanned_hours)
-                entry_timesheet.non_billable_hours_comments = non_billable_hours_comments
-                entry_timesheet.unplanned_hours_comments = unplanned_hours_comments
-                entry_timesheet.ts_approval_status = "submitted"
-                entry_timesheet.username_updated = user_email
-                entry_timesheet.save()
-            else:
-                entry_timesheet = EmployeeUnplannedNonbillableHours.objects.create(
-                    employee_id=employee,
-                    year=year,
-                    week_number=week_number,
-                    approver=[{"approver_id": "PMO1", "approver_name": "HR Manager"}],
-                    non_billable_hours=time_to_hours(non_billable_hours),
-                    unplanned_hours=time_to_hours(unplanned_hours),
-                    non_billable_hours_comments=non_billable_hours_comments,
-                    unplanned_hours_comments=unplanned_hours_comments,
-                    username_created = user_email,
-                    ts_approval_status="submitted",
-                )
-
+                week_number=week_number,
+                approver=[{"approver_id": "PMO1", "approver_name": "HR Manager"}],
+                non_billable_hours=time_to_hours(non_billable_hours),
+                unplanned_hours=time_to_hours(unplanned_hours),
+                non_billable_hours_comments=non_billable_hours_comments,
+                unplanned_hours_comments=unplanned_hours_comments,
+                username_created=user_email,
+                username_updated=user_email,
+                ts_approval_status="submitted",
+            )
+            EmployeeUnplannedNonbillableHours.objects.bulk_create(
+                [entry_timesheet], update_conflicts=True, unique_fields=['employee_id', 'year', 'week_number'],
+                update_fields=['non_billable_hours', 'unplanned_hours', 'non_billable_hours_comments',
+                               'unplanned_hours_comments', 'ts_approval_status', 'username_updated', 'date_updated'],
+            )
+            invalidate_missing_weeks([employee.pk])
+            queue_pending_refresh([(employee.pk, year, week_number)])
             return entry_timesheet
 
         except Exception as e:
@@ -452,7 +441,6 @@ class AddTimesheetView(APIView):
         week_number = request.data.get('week_number')
         non_billable_hours = time_to_hours(request.data.get('non_billable_hours', 0))
         unplanned_hours = time_to_hours(request.data.get('unplanned_hours', 0))
-        total_hours = time_to_hours(request.data.get('total_hours', 0))
         non_billable_hours_comments = request.data.get('non_billable_hours_comments', '')
         unplanned_hours_comments = request.data.get('unplanned_hours_comments', '')
         timesheets_data = request.data.get('timesheets', [])    
@@ -461,54 +449,27 @@ class AddTimesheetView(APIView):
         except ValueError as ve:
             return Response({"error": str(ve)}, status=status.HTTP_400_BAD_REQUEST)
         user_email = employee.employee_email
-        if not math.isclose(unplanned_hours, 0.0) or not math.isclose(non_billable_hours, 0.0):
-            entry_timesheet_unplanned = self.create_non_billable_unplanned_entries(
-                employee, year, week_number, non_billable_hours, unplanned_hours, 
-                non_billable_hours_comments, unplanned_hours_comments, user_email
-            )
-        elif math.isclose(unplanned_hours, 0.0) and math.isclose(non_billable_hours, 0.0):
-            try:
-                record = EmployeeUnplannedNonbillableHours.objects.get(
+        resolved, errors = self.validate_entries(timesheets_data or [])
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            if not math.isclose(unplanned_hours, 0.0) or not math.isclose(non_billable_hours, 0.0):
+                entry_timesheet_unplanned = self.create_non_billable_unplanned_entries(
+                    employee, year, week_number, non_billable_hours, unplanned_hours, 
+                    non_billable_hours_comments, unplanned_hours_comments, user_email
+                )
+            elif math.isclose(unplanned_hours, 0.0) and math.isclose(non_billable_hours, 0.0):
+                cleared = EmployeeUnplannedNonbillableHours.objects.filter(
                     employee_id=employee,
                     year=year,
                     week_number=week_number
-                )
-                record.unplanned_hours = 0.0
-                record.non_billable_hours = 0.0
-                record.save()
-            except EmployeeUnplannedNonbillableHours.DoesNotExist:
-                print("No record found for this employee, year, and week_number.")
-        errors = []
-        if timesheets_data:
-            for entry in timesheets_data:
-                client_name = entry.get('client_name')
-                contract_sow_name = entry.get('contract_sow_name')
-                billable_hours = entry.get('billable_hours', 0)
-                non_billable_hours = 0
-                unplanned_hours = 0
-                non_billable_hours_comments = ""
-                unplanned_hours_comments = ""
-                try:
-                    client = self.get_client(client_name)
-                    contract_sow = self.get_contract_sow(contract_sow_name, client)
-                    entry_timesheet = self.create_or_update_timesheet(
-                        employee,
-                        client,
-                        contract_sow,
-                        year,
-                        week_number,
-                        billable_hours,
-                        non_billable_hours,
-                        unplanned_hours,
-                        total_hours,
-                        non_billable_hours_comments,
-                        unplanned_hours_comments,
-                        user_email,
-                    )
-                except ValueError as ve:
-                    errors.append({"entry": entry, "error": str(ve)})
-            if errors:
-                return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+                ).update(unplanned_hours=0.0, non_billable_hours=0.0, date_updated=timezone.now())
+                queue_pending_refresh([(employee.pk, year, week_number)])
+                if not cleared:
+                    print("No record found for this employee, year, and week_number.")
+            if resolved:
+                entries = self.build_entries(employee, resolved, user_email)
+                upsert_week_entries(employee, year, week_number, entries, ENTRY_UPDATE_FIELDS)
         return Response({"message": "Timesheet entries created/updated successfully."}, status=status.HTTP_201_CREATED)
 
 
@@ -802,11 +763,6 @@ class ClientTimesheetView(APIView):
         }
         return Response(data, status=status.HTTP_200_OK)
     
-def get_week_dates(year, week_number):
-    first_day_of_year = datetime.strptime(f'{year}-01-01', DATE_FORMAT)
-    start_date = first_day_of_year + timedelta(days=(week_number - 1) * 7 - first_day_of_year.weekday())
-    end_date = start_date + timedelta(days=6)
-    return start_date.date(), end_date.date()
     
 class UnplannedHoursView(APIView):
     def post(self, request):
@@ -828,7 +784,7 @@ class UnplannedHoursView(APIView):
         for timesheet in timesheets:
             week_number = timesheet['week_number']
             year = timesheet['year']
-            start_date, end_date = get_week_dates(year, week_number)
+            start_date, end_date = week_bounds(year, week_number)
 
             data.append({
                 "unplanned_hours": timesheet['unplanned_hours'],
@@ -862,7 +818,7 @@ class TimeOffHoursView(APIView):
         for timesheet in timesheets:
             week_number = timesheet['week_number']
             year = timesheet['year']
-            start_date, end_date = get_week_dates(year, week_number)
+            start_date, end_date = week_bounds(year, week_number)
 
             data.append({
                 "non_billable_hours": timesheet['non_billable_hours'],
@@ -920,6 +876,15 @@ class EmployeeHoursView(APIView):
             billable_hours=Sum("billable_hours"),
             non_billable_hours=Sum("non_billable_hours"),
         )
+        timesheet_data = list(timesheet_data)
+        week_windows = {
+            (entry["year"], entry["week_number"]): get_week_start_and_end_dates(entry["year"], entry["week_number"])
+            for entry in timesheet_data
+        }
+        allocated_hours_by_week = planned_hours_by_window(
+            {entry["timesheet_id"] for entry in timesheet_data if entry["timesheet_id"]},
+            week_windows
+        )
         timesheet_aggregated = defaultdict(list)
         for entry in timesheet_data:
             key = (entry["year"], entry["week_number"], entry["employee_id"])
@@ -933,17 +898,9 @@ class EmployeeHoursView(APIView):
                     }
                 timesheet_aggregated[key]["billable_hours"] += entry["billable_hours"]
                 timesheet_aggregated[key]["non_billable_hours"] += entry["non_billable_hours"]
-                timesheet_id = entry["timesheet_id"]
-                entry_timesheet = Timesheet.objects.filter(id=timesheet_id).first()
-                if entry_timesheet and entry_timesheet.resource_estimation_data:
-                    week_start_date, week_end_date = get_week_start_and_end_dates(entry["year"], entry["week_number"])
-                    daily_data = entry_timesheet.resource_estimation_data.get("Estimation_Data", {}).get("daily", [])
-                    filtered_data = [
-                        day for day in daily_data
-                        if week_start_date <= datetime.strptime(day["date"], "%d/%m/%Y").date() <= week_end_date
-                    ]
-                    allocated_hours = sum(day["hours"] for day in filtered_data)
-                    timesheet_aggregated[key]["allocated_hours"] += allocated_hours
+                timesheet_aggregated[key]["allocated_hours"] += allocated_hours_by_week.get(
+                    (entry["timesheet_id"], (entry["year"], entry["week_number"])), 0
+                )
 
                 timesheet_aggregated[key]["details"].append(entry)
 
@@ -965,14 +922,21 @@ class EmployeeHoursView(APIView):
         }
         result = []
         all_keys = set(timesheet_aggregated.keys()) | set(unplanned_dict.keys())
+        employee_names = get_employee_names({employee_id for _, _, employee_id in all_keys})
+        client_names = dict(Client.objects.filter(
+            uuid__in={entry["client_id"] for entry in timesheet_data if entry["client_id"]}
+        ).values_list("uuid", "name"))
+        contract_sow_names = dict(SowContract.objects.filter(
+            uuid__in={entry["contract_sow_id"] for entry in timesheet_data if entry["contract_sow_id"]}
+        ).values_list("uuid", "contractsow_name"))
         for key in all_keys:
             year, week_number, employee_id = key
             week_start_date, week_end_date = get_week_start_and_end_dates(year, week_number)
             unplanned_entry = unplanned_dict.get(key, {})
+            employee_name = employee_names.get(employee_id)
 
             if allocation_type == "overview_timesheet":
                 timesheet_entry = timesheet_aggregated.get(key, {})
-                employee_name = Employee.objects.filter(employee_source_id=employee_id).first().employee_full_name
                 result.append({
                     "year": year,
                     "week_number": week_number,
@@ -992,22 +956,9 @@ class EmployeeHoursView(APIView):
                     continue
                 detailed_entries = []
                 for entry in details:
-                    allocated_hours = 0
-                    timesheet_id = entry["timesheet_id"]
-                    entry_timesheet = Timesheet.objects.filter(id=timesheet_id).first()
-                    employee_name = Employee.objects.filter(employee_source_id=employee_id).first().employee_full_name
-                    if entry_timesheet and entry_timesheet.resource_estimation_data:
-                        daily_data = entry_timesheet.resource_estimation_data.get("Estimation_Data", {}).get("daily", [])
-                        filtered_data = [
-                            day for day in daily_data
-                            if week_start_date <= datetime.strptime(day["date"], "%d/%m/%Y").date() <= week_end_date
-                        ]
-                        allocated_hours = sum(day["hours"] for day in filtered_data)
-
-                    client = Client.objects.filter(uuid=entry["client_id"]).first()
-                    contract_sow = SowContract.objects.filter(uuid=entry["contract_sow_id"]).first()
-                    client_name = client.name if client else "Unknown"
-                    contract_sow_name = contract_sow.contractsow_name if contract_sow else "Unknown"
+                    allocated_hours = allocated_hours_by_week.get((entry["timesheet_id"], (year, week_number)), 0)
+                    client_name = client_names.get(entry["client_id"], "Unknown")
+                    contract_sow_name = contract_sow_names.get(entry["contract_sow_id"], "Unknown")
 
                     detailed_entries.append({
                         "client_name": client_name,
@@ -1037,7 +988,7 @@ class EmployeeHoursView(APIView):
                     "approved_by": unplanned_entry.get("approved_by", ""),
                 })
         if export_type == "excel":
-            return export_to_excel(result,allocation_type)
+            return export_to_excel(result, allocation_type, requested_export_format(request))
         else:
             return JsonResponse(result, safe=False, status=status.HTTP_200_OK)
     
@@ -1051,97 +1002,63 @@ def get_week_start_and_end_dates(year, week_number):
     start_date = first_day_of_year + timedelta(days=days_to_add)
     end_date = start_date + timedelta(days=4)
     return start_date, end_date
-def export_to_excel(data, allocation_type):
+def get_employee_names(employee_ids):
+    """{employee_source_id: full name} for the given ids, in one query."""
+    return dict(Employee.objects.filter(employee_source_id__in=employee_ids).values_list("employee_source_id", "employee_full_name"))
+
+OVERVIEW_EXPORT_HEADERS = [
+    "Year", "Week Number", "Employee ID", "Employee Name", "Week Start Date", "Week End Date",
+    "Allocated Hours", "Billable Hours","Non Billable Hours", "Time Off Hours", "Unplanned Hours"
+]
+DETAILED_EXPORT_HEADERS = [
+    "Year", "Week Number", "Employee ID", "Employee Name", "Week Start Date", "Week End Date",
+    "Client Name", "Contract SOW Name", "Allocated Hours", "Billable Hours","Non Billable Hours", "Project Timesheet Status",
+    "Project Approver Comments", "Project Timesheet Approved By",
+    "Time Off Hours", "Unplanned Hours", "Unplanned Hours Comments", "Time Off Hours Comments",
+    "Non Working/Timeoff (HR) Timesheet Status", "HR Approver Comments", "HR Approved By"
+]
+
+def overview_export_rows(data):
+    for row in data:
+        yield [
+            row["year"], row["week_number"], row["employee_id"], row["employee_name"],
+            row["week_start_date"], row["week_end_date"],
+            row["allocated_hours"], row["billable_hours"], row.get("non_billable_hours", 0),
+            row["timeoff_hours"], row["unplanned_hours"]
+        ]
+
+def detailed_export_rows(data):
+    for row in data:
+        week_columns = [
+            row["year"], row["week_number"], row["employee_id"], row["employee_name"],
+            row["week_start_date"], row["week_end_date"]
+        ]
+        unplanned_columns = [
+            row["timeoff_hours"], row["unplanned_hours"], row["unplanned_hours_comments"], row["timeoff_hours_comments"],
+            row["unplanned_timesheet_status"], row["approver_comments"], row["approved_by"]
+        ]
+        details = row.get("details")
+        if not details:
+            # If no details, add a row with N/A for client and contract info
+            yield week_columns + ["N/A", "N/A", 0, 0, 0, "", "", ""] + unplanned_columns
+            continue
+        for entry in details:
+            yield week_columns + [
+                entry["client_name"], entry["contract_sow_name"],
+                entry["allocated_hours"], entry["billable_hours"], entry["non_billable_hours"],
+                entry["timesheet_status"], entry["approver_comments"], entry["approved_by"]
+            ] + unplanned_columns
+
+def export_to_excel(data, allocation_type, file_format="xlsx"):
     """
-    Convert the given data to an Excel file and return it as a response.
+    Stream the given data as an Excel (or CSV) file.
     Handles both overview_timesheet and detailed_timesheet formats.
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Timesheet Data"
-
-    # Set headers
-    if allocation_type == "overview_timesheet":
-        headers = [
-            "Year", "Week Number", "Employee ID", "Employee Name", "Week Start Date", "Week End Date",
-            "Allocated Hours", "Billable Hours","Non Billable Hours", "Time Off Hours", "Unplanned Hours"
-        ]
-        ws.append(headers)
-
-        # Fill data for overview_timesheet
-        for row in data:
-            ws.append([
-                row["year"], row["week_number"], row["employee_id"],row["employee_name"],
-                row["week_start_date"], row["week_end_date"],
-                row["allocated_hours"], row["billable_hours"],row["non_billable_hours"],
-                row["timeoff_hours"], row["unplanned_hours"]
-            ])
-
-    elif allocation_type == "detailed_timesheet":
-        headers = [
-            "Year", "Week Number", "Employee ID", "Employee Name", "Week Start Date", "Week End Date",
-            "Client Name", "Contract SOW Name", "Allocated Hours", "Billable Hours","Non Billable Hours", "Project Timesheet Status",
-            "Project Approver Comments", "Project Timesheet Approved By",
-            "Time Off Hours", "Unplanned Hours", "Unplanned Hours Comments", "Time Off Hours Comments",
-            "Non Working/Timeoff (HR) Timesheet Status", "HR Approver Comments", "HR Approved By" 
-        ]
-        ws.append(headers)
-
-        # Fill data for detailed_timesheet
-        for row in data:
-            year = row["year"]
-            week_number = row["week_number"]
-            employee_id = row["employee_id"]
-            employee_name = row["employee_name"]
-            week_start_date = row["week_start_date"]
-            week_end_date = row["week_end_date"]
-            non_billable_hours = row["timeoff_hours"]
-            unplanned_hours = row["unplanned_hours"]
-            unplanned_hours_comments = row["unplanned_hours_comments"]
-            non_billable_hours_comments = row["timeoff_hours_comments"]
-            unplanned_approval_status = row["unplanned_timesheet_status"]
-            unplanned_approver_comments = row["approver_comments"]
-            unplanned_approved_by = row["approved_by"]
-
-            # If there are details, iterate through each entry in the details
-            if "details" in row and row["details"]:
-                for entry in row["details"]:
-                    client_name = entry["client_name"]
-                    contract_sow_name = entry["contract_sow_name"]
-                    allocated_hours = entry["allocated_hours"]
-                    billable_hours = entry["billable_hours"]
-                    non_billable_hours = entry["non_billable_hours"]
-                    timesheet_status = entry["timesheet_status"]
-                    approver_comments = entry["approver_comments"]
-                    approved_by = entry["approved_by"]
-                    # Append each entry as a new row
-                    ws.append([
-                        year, week_number, employee_id,employee_name,
-                        week_start_date, week_end_date,
-                        client_name, contract_sow_name,
-                        allocated_hours, billable_hours,non_billable_hours,timesheet_status, approver_comments, approved_by,
-                        non_billable_hours, unplanned_hours, unplanned_hours_comments,
-                        non_billable_hours_comments,
-                        unplanned_approval_status, unplanned_approver_comments, unplanned_approved_by
-                    ])
-            else:
-                # If no details, add a row with N/A for client and contract info
-                ws.append([
-                    year, week_number, employee_id,employee_name,
-                    week_start_date, week_end_date,
-                    "N/A", "N/A", 0, 0, non_billable_hours, unplanned_hours, unplanned_hours_comments,
-                    non_billable_hours_comments,
-                    unplanned_approval_status, unplanned_approver_comments, unplanned_approved_by
-                ])
-
-    # Save to an in-memory file and return as response
-    excel_file = BytesIO()
-    wb.save(excel_file)
-    excel_file.seek(0)
-
-    response = HttpResponse(excel_file, content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response['Content-Disposition'] = 'attachment; filename="timesheet_data.xlsx"'
-    return response
+    if allocation_type == "detailed_timesheet":
+        sheet = ExportSheet("Timesheet Data", DETAILED_EXPORT_HEADERS, detailed_export_rows(data))
+    else:
+        sheet = ExportSheet("Timesheet Data", OVERVIEW_EXPORT_HEADERS, overview_export_rows(data))
+    return export_response([sheet], "timesheet_data", file_format)
 
 class EmployeeHoursDownloadView(APIView):
 
@@ -1167,6 +1084,15 @@ class EmployeeHoursDownloadView(APIView):
         ).annotate(
             billable_hours=Sum("billable_hours")
         )
+        timesheet_data = list(timesheet_data)
+        week_windows = {
+            (entry["year"], entry["week_number"]): get_week_start_and_end_dates(entry["year"], entry["week_number"])
+            for entry in timesheet_data
+        }
+        allocated_hours_by_week = planned_hours_by_window(
+            {entry["timesheet_id"] for entry in timesheet_data if entry["timesheet_id"]},
+            week_windows
+        )
         timesheet_aggregated = defaultdict(list)
         for entry in timesheet_data:
             key = (entry["year"], entry["week_number"], entry["employee_id"])
@@ -1177,19 +1103,9 @@ class EmployeeHoursDownloadView(APIView):
                     "details": []
                 }
             timesheet_aggregated[key]["billable_hours"] += entry["billable_hours"]
-
-            timesheet_id = entry["timesheet_id"]
-            entry_timesheet = Timesheet.objects.filter(id=timesheet_id).first()
-            if entry_timesheet and entry_timesheet.resource_estimation_data:
-                week_start_date, week_end_date = get_week_start_and_end_dates(entry["year"], entry["week_number"])
-                daily_data = entry_timesheet.resource_estimation_data.get("Estimation_Data", {}).get("daily", [])
-                filtered_data = [
-                    day for day in daily_data
-                    if week_start_date <= datetime.strptime(day["date"], "%d/%m/%Y").date() <= week_end_date
-                ]
-                allocated_hours = sum(day["hours"] for day in filtered_data)
-                timesheet_aggregated[key]["allocated_hours"] += allocated_hours
-
+            timesheet_aggregated[key]["allocated_hours"] += allocated_hours_by_week.get(
+                (entry["timesheet_id"], (entry["year"], entry["week_number"])), 0
+            )
             timesheet_aggregated[key]["details"].append(entry)
         unplanned_data = EmployeeUnplannedNonbillableHours.objects.filter(
             year__gte=start_date.year,
@@ -1206,17 +1122,17 @@ class EmployeeHoursDownloadView(APIView):
         }
         result = []
         all_keys = set(timesheet_aggregated.keys()) | set(unplanned_dict.keys())
+        employee_names = get_employee_names({employee_id for _, _, employee_id in all_keys})
         for key in all_keys:
             year, week_number, employee_id = key
             week_start_date, week_end_date = get_week_start_and_end_dates(year, week_number)
             unplanned_entry = unplanned_dict.get(key, {})
             timesheet_entry = timesheet_aggregated.get(key, {})
-            employee_name = Employee.objects.filter(employee_source_id=employee_id).first().employee_full_name
             result.append({
                 "year": year,
                 "week_number": week_number,
                 "employee_id": employee_id,
-                "employee_name": employee_name,
+                "employee_name": employee_names.get(employee_id),
                 "week_start_date": week_start_date,
                 "week_end_date": week_end_date,
                 "allocated_hours": timesheet_entry.get("allocated_hours", 0),
@@ -1224,15 +1140,7 @@ class EmployeeHoursDownloadView(APIView):
                 "timeoff_hours": unplanned_entry.get("non_billable_hours", 0),
                 "unplanned_hours": unplanned_entry.get("unplanned_hours", 0),
             })
-        return export_to_excel(result, allocation_type)
-
-def format_hours(hours):
-    """Convert decimal hours to HH:MM format."""
-    if hours is None:
-        hours = 0
-    total_minutes = int(hours * 60)
-    hours, minutes = divmod(total_minutes, 60)
-    return f"{hours:02}:{minutes:02}"
+        return export_to_excel(result, allocation_type, requested_export_format(request))
 
 class RecallTimesheetView(APIView):
 
@@ -1305,18 +1213,13 @@ class RecallTimesheetView(APIView):
             year = year
         )
 
+        timesheets = timesheets.select_related('client', 'contract_sow')
+        allocated_hours_by_timesheet = planned_hours_by_timesheet(
+            [ts.timesheet_id_id for ts in timesheets if ts.timesheet_id_id], start_date, end_date
+        )
         total_billable_hours = 0
         for ts in timesheets:
-            data = ts.timesheet_id.resource_estimation_data
-            if data:
-                daily_data = data.get("Estimation_Data", {}).get("daily", [])
-                filtered_data = [
-                    day for day in daily_data
-                    if start_date <= datetime.strptime(day["date"], "%d/%m/%Y").date() <= end_date
-                ]
-                allocated_hours = sum(day["hours"] for day in filtered_data)
-            else:
-                allocated_hours = 0
+            allocated_hours = allocated_hours_by_timesheet.get(ts.timesheet_id_id, 0)
             billable_hours = ts.billable_hours or 0
             total_billable_hours += billable_hours
 
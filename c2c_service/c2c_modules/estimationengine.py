@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+import numpy as np
+
+CACHE_SIZE = 256
+MONDAY_OFFSET = np.timedelta64(4, 'D')
+
+
+class InvalidEstimationDate(ValueError):
+    """An `Estimation_Data.daily` entry whose date does not exist in the calendar."""
+    def __init__(self, dates):
+        self.dates = dates
+        super().__init__(f"Invalid dates in Estimation_Data.daily: {', '.join(dates)}")
+
+
+class DailySeries:
+    """
+    An estimation resource's `Estimation_Data.daily` list as sorted NumPy arrays, so range,
+    weekly and monthly totals are answered with searchsorted / reduceat instead of per-entry loops.
+    """
+    def __init__(self, dates, hours):
+        order = np.argsort(dates, kind='stable')
+        self.dates = dates[order]
+        self.hours = hours[order]
+        self.cumulative = np.concatenate(([0.0], np.cumsum(self.hours)))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def total_between(self, start_date, end_date):
+        """Total hours between two dates, both inclusive."""
+        lo = np.searchsorted(self.dates, np.datetime64(start_date, 'D'), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(end_date, 'D'), side='right')
+        return float(self.cumulative[hi] - self.cumulative[lo])
+
+    def _group_totals(self, keys):
+        if not len(keys):
+            return keys, self.hours
+        starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+        return keys[starts], np.add.reduceat(self.hours, starts)
+
+    def weekly_totals(self):
+        """{week start (Monday) date: hours}."""
+        # datetime64[W] buckets from 1970-01-01 (a Thursday); shift by 4 days to bucket from Monday.
+        week_starts = (self.dates - MONDAY_OFFSET).astype('datetime64[W]').astype('datetime64[D]') + MONDAY_OFFSET
+        keys, totals = self._group_totals(week_starts)
+        return {key.item(): float(total) for key, total in zip(keys, totals)}
+
+    def monthly_totals(self):
+        """{(year, month): hours}."""
+        keys, totals = self._group_totals(self.dates.astype('datetime64[M]'))
+        return {(key.item().year, key.item().month): float(total) for key, total in zip(keys, totals)}
+
+    def iso_week_number_totals(self):
+        """{ISO week number: hours}, across all years."""
+        totals = {}
+        for week_start, hours in self.weekly_totals().items():
+            week_number = week_start.isocalendar()[1]
+            totals[week_number] = totals.get(week_number, 0) + hours
+        return totals
+
+
+def detect_date_order(first_parts, middle_parts):
+    """Month-first only when a middle part can't be a month; matches identify_date_format."""
+    return 'mdy' if len(middle_parts) and middle_parts.max() > 12 else 'dmy'
+
+def parse_daily_series(daily_data):
+    """
+    Parse a list of {date: 'dd/mm/YYYY', hours} dicts in one pass. Entries that are not a
+    three-part date with numeric hours are skipped; an impossible date such as 31/02/2025
+    raises InvalidEstimationDate instead of rolling over into the next month.
+    """
+    raw, first, second, years, hours = [], [], [], [], []
+    for entry in daily_data or []:
+        date_str = str(entry.get('date', ''))
+        parts = date_str.split('/')
+        if len(parts) != 3:
+            continue
+        try:
+            day, month, year = int(parts[0]), int(parts[1]), int(parts[2])
+            value = float(entry.get('hours') or 0)
+        except (TypeError, ValueError):
+            continue
+        raw.append(date_str)
+        first.append(day)
+        second.append(month)
+        years.append(year)
+        hours.append(value)
+    if detect_date_order(np.array(first, dtype=np.int64), np.array(second, dtype=np.int64)) == 'mdy':
+        first, second = second, first
+    dates = []
+    invalid = []
+    for date_str, day, month, year in zip(raw, first, second, years):
+        try:
+            dates.append(date(year, month, day))
+        except ValueError:
+            invalid.append(date_str)
+    if invalid:
+        raise InvalidEstimationDate(invalid)
+    return DailySeries(np.array(dates, dtype='datetime64[D]'), np.array(hours, dtype=np.float64))
+
+
+class EstimationSeriesCache:
+    """LRU of parsed series per estimation, keyed by uuid and `date_updated` so edits invalidate it."""
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_parse(self, estimation):
+        key = (estimation.uuid, estimation.date_updated)
+        with self._lock:
+            series = self._entries.get(key)
+            if series is not None:
+                self._entries.move_to_end(key)
+                return series
+        series = [
+            parse_daily_series(resource.get('Estimation_Data', {}).get('daily', [])) if isinstance(resource, dict) else parse_daily_series([])
+            for resource in estimation_resources(estimation)
+        ]
+        with self._lock:
+            self._entries[key] = series
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return series
+
+
+def estimation_resources(estimation):
+    resources = estimation.resource
+    return resources if isinstance(resources, list) else [resources]
+
+def resource_slot_indexes(resources):
+    """Resource index of every allocation slot, i.e. each resource repeated `num_of_resources` times."""
+    counts = [int(resource.get('num_of_resources') or 0) for resource in resources]
+    return np.repeat(np.arange(len(counts)), counts)
+
+def get_estimation_series(estimation):
+    """Parsed daily series for each resource of an Estimation, in `Estimation.resource` order."""
+    return series_cache.get_or_parse(estimation)
+
+
+series_cache = EstimationSeriesCache()
@@ -51,7 +51,7 @@ def normalize_dates(estimation_data):
     return estimation_data
 
 class EstimationPostAPIView(ListModelMixin, CreateModelMixin, GenericAPIView):
-    queryset = Estimation.objects.all().order_by('-date_created')
+    queryset = EstimationSerializer.setup_eager_loading(Estimation.objects.all()).order_by('-date_created')
     serializer_class = EstimationSerializer
     pagination_class = Pagination
     lookup_field = 'uuid'
@@ -115,7 +115,7 @@ class EstimationGetAPIView(ListModelMixin, CreateModelMixin, GenericAPIView):
                 queryset = queryset.filter(contract_creation_date__gte=date_created)
             if client:
                 queryset = queryset.filter(client=client)  # Filter by client_uuid
-            queryset = queryset.order_by('-date_created')
+            queryset = EstimationSerializer.setup_eager_loading(queryset.order_by('-date_created'))
             page = self.paginate_queryset(queryset)
             if page is not None:
                 serializer = self.get_serializer(page, many=True)
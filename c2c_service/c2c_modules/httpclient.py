@@ -0,0 +1,220 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config import (AUTH_API, OPENAI_API, MPS_DOCUMENT_PARSER_API, OUTBOUND_CONNECT_TIMEOUT, OUTBOUND_READ_TIMEOUT,
+                    OPENAI_READ_TIMEOUT, OUTBOUND_MAX_CONCURRENCY, OUTBOUND_BREAKER_THRESHOLD,
+                    OUTBOUND_BREAKER_RESET_SECONDS)
+from c2c_modules.custom_logger import warning
+
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30
+MAX_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 0.2
+RETRY_STATUS_CODES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+upstreams = []  # every upstream made by build_upstream, for outbound_metrics
+
+
+class UpstreamUnavailable(requests.RequestException):
+    """Raised without calling the upstream when its circuit is open or all its slots stay busy."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `reset_seconds`;
+    then lets a single trial call through and closes again if it succeeds.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold=DEFAULT_BREAKER_THRESHOLD, reset_seconds=DEFAULT_BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class UpstreamStats:
+    """Call counts and latency for one upstream, as reported by `outbound_metrics`."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms, failed):
+        with self._lock:
+            self.calls += 1
+            self.failures += int(failed)
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "retries": self.retries,
+                "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0,
+                "max_ms": round(self.max_ms, 1),
+            }
+
+
+class Upstream:
+    """
+    Outbound client for one downstream service: a pooled keep-alive session, connect/read
+    timeouts, a cap on concurrent calls, retries with jittered backoff and a circuit breaker.
+    """
+    def __init__(self, name, base_url, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, breaker=None, max_retries=MAX_RETRIES):
+        self.name = name
+        self.base_url = base_url or ""
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = UpstreamStats()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path):
+        return path if path.startswith(("http://", "https://")) else self.base_url + path
+
+    def should_retry(self, method, idempotent, exc=None, response=None):
+        if isinstance(exc, requests.ConnectTimeout):
+            return True  # The request never reached the upstream.
+        if not (idempotent or method in IDEMPOTENT_METHODS):
+            return False
+        if exc is not None:
+            return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+        return response.status_code in RETRY_STATUS_CODES
+
+    def request(self, method, path, idempotent=False, **kwargs):
+        """
+        Send a request and return the `requests.Response`. POSTs are only retried when
+        `idempotent=True`. Raises UpstreamUnavailable when the call is rejected locally.
+        """
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            response, exc = self._send(method, self.url(path), **kwargs)
+            if attempt >= self.max_retries or not self.should_retry(method, idempotent, exc, response):
+                break
+            attempt += 1
+            self.stats.count("retries")
+            # Full jitter, so callers retrying a recovering upstream do not arrive in lockstep.
+            time.sleep(random.uniform(0, RETRY_BACKOFF_SECONDS * 2 ** attempt))
+        if exc is not None:
+            raise exc
+        return response
+
+    def admit(self):
+        """Raise UpstreamUnavailable if the circuit is open; shared with the async proxy."""
+        if not self.breaker.allow():
+            self.stats.count("rejected")
+            raise UpstreamUnavailable(f"{self.name} upstream circuit is open")
+
+    def record_result(self, method, url, started, exc=None, status_code=None):
+        """Update the latency stats and the circuit for a finished call; shared with the async proxy."""
+        failed = exc is not None or status_code >= 500
+        self.stats.record((time.perf_counter() - started) * 1000, failed)
+        if failed:
+            self.breaker.record_failure()
+            warning(f"{self.name} upstream call {method} {url} failed: {exc or status_code}")
+        else:
+            self.breaker.record_success()
+
+    def _send(self, method, url, **kwargs):
+        if not self._slots.acquire(timeout=self.timeout[0]):
+            self.stats.count("rejected")
+            return None, UpstreamUnavailable(f"{self.name} upstream has no free connection slot")
+        try:
+            self.admit()
+        except UpstreamUnavailable as e:
+            self._slots.release()
+            return None, e
+        started = time.perf_counter()
+        response = exc = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException as e:
+            exc = e
+        finally:
+            self._slots.release()
+        self.record_result(method, url, started, exc, response.status_code if response is not None else None)
+        return response, exc
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+
+def build_upstream(name, base_url, read_timeout=None):
+    upstream = Upstream(
+        name,
+        base_url,
+        connect_timeout=float(OUTBOUND_CONNECT_TIMEOUT or DEFAULT_CONNECT_TIMEOUT),
+        read_timeout=float(read_timeout or OUTBOUND_READ_TIMEOUT or DEFAULT_READ_TIMEOUT),
+        max_concurrency=int(OUTBOUND_MAX_CONCURRENCY or DEFAULT_MAX_CONCURRENCY),
+        breaker=CircuitBreaker(
+            int(OUTBOUND_BREAKER_THRESHOLD or DEFAULT_BREAKER_THRESHOLD),
+            float(OUTBOUND_BREAKER_RESET_SECONDS or DEFAULT_BREAKER_RESET_SECONDS)
+        ),
+    )
+    upstreams.append(upstream)
+    return upstream
+
+def outbound_metrics():
+    """{upstream name: call counts, latency and circuit state}."""
+    return {
+        upstream.name: {**upstream.stats.snapshot(), "circuit": upstream.breaker.state}
+        for upstream in upstreams
+    }
+
+
+auth_api = build_upstream("auth", AUTH_API)
+openai_api = build_upstream("openai", OPENAI_API, OPENAI_READ_TIMEOUT)
+document_parser_api = build_upstream("document_parser", MPS_DOCUMENT_PARSER_API, OPENAI_READ_TIMEOUT)
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+import jwt
+from jwt import PyJWKClient
+from jwt.exceptions import PyJWKClientError
+from config import (JWT_VERIFY_MODE, JWKS_URL, JWT_AUDIENCE, JWT_ISSUER, JWT_ROLES_CLAIM, JWKS_REFRESH_SECONDS,
+                    JWKS_MIN_REFETCH_SECONDS)
+from c2c_modules.custom_logger import info, error
+
+DEFAULT_REFRESH_SECONDS = 3600
+DEFAULT_MIN_REFETCH_SECONDS = 60
+MAX_UNKNOWN_KIDS = 1024
+JWT_ALGORITHMS = ["RS256"]
+
+
+class KeySetUnavailable(Exception):
+    """Raised when no signing key can be resolved locally, so the caller should fall back to the auth API."""
+
+
+class JWKSKeyStore:
+    """
+    Keeps the auth provider's JWKS in memory and refreshes it on a daemon thread,
+    so token verification never waits on the key endpoint after the first fetch. A token with an
+    unknown `kid` triggers at most one fetch per `min_refetch_seconds` across all requests, and a
+    kid still missing after a fetch is not looked up again for that long, so garbage tokens cannot
+    turn into one outbound call each.
+    """
+    def __init__(self, jwks_url, refresh_seconds=DEFAULT_REFRESH_SECONDS, min_refetch_seconds=DEFAULT_MIN_REFETCH_SECONDS):
+        self.jwks_url = jwks_url
+        self.refresh_seconds = refresh_seconds
+        self.min_refetch_seconds = min_refetch_seconds
+        self._last_fetch = None
+        self._unknown_kids = OrderedDict()  # kid -> when a fetch last came back without it
+        self._client = PyJWKClient(jwks_url, cache_keys=True, cache_jwk_set=True, lifespan=refresh_seconds * 2)
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._refresher = None
+
+    def refresh(self):
+        with self._lock:
+            self._last_fetch = time.monotonic()
+        try:
+            keys = {key.key_id: key for key in self._client.get_signing_keys(refresh=True)}
+        except PyJWKClientError as e:
+            error(f"Error refreshing JWKS from {self.jwks_url}: {e}")
+            return False
+        with self._lock:
+            self._keys = keys
+        return True
+
+    def start(self):
+        if self._refresher is not None:
+            return
+        def run():
+            while True:
+                self.refresh()
+                time.sleep(self.refresh_seconds)
+        self._refresher = threading.Thread(target=run, name="jwks-refresh", daemon=True)
+        self._refresher.start()
+
+    def claim_refetch(self, kid):
+        """Whether this request may fetch the key set to look for `kid`; claims the slot if so."""
+        now = time.monotonic()
+        with self._lock:
+            missed_at = self._unknown_kids.get(kid)
+            if missed_at is not None and now - missed_at < self.min_refetch_seconds:
+                return False
+            if self._last_fetch is not None and now - self._last_fetch < self.min_refetch_seconds:
+                return False
+            self._last_fetch = now
+            return True
+
+    def remember_unknown(self, kid):
+        with self._lock:
+            self._unknown_kids[kid] = time.monotonic()
+            self._unknown_kids.move_to_end(kid)
+            while len(self._unknown_kids) > MAX_UNKNOWN_KIDS:
+                self._unknown_kids.popitem(last=False)
+
+    def get_signing_key(self, access_token):
+        kid = jwt.get_unverified_header(access_token).get('kid')
+        with self._lock:
+            key = self._keys.get(kid)
+        if key is None and self.claim_refetch(kid):
+            # Key rotation: the token may be signed with a key published after our last refresh.
+            if self.refresh():
+                with self._lock:
+                    key = self._keys.get(kid)
+            if key is None:
+                self.remember_unknown(kid)
+        if key is None:
+            raise KeySetUnavailable(f"No signing key found for kid {kid}")
+        return key.key
+
+
+def local_verification_enabled():
+    return (JWT_VERIFY_MODE or "remote").lower() == "local" and bool(JWKS_URL)
+
+
+def roles_from_claims(claims):
+    roles = claims.get(JWT_ROLES_CLAIM or "roles")
+    if roles is None:
+        return None
+    if isinstance(roles, str):
+        roles = [roles]
+    return [role.lower() for role in roles]
+
+
+def verify_token(access_token):
+    """
+    Verify the token signature and standard claims against the cached key set.
+    Raises jwt.ExpiredSignatureError / jwt.InvalidTokenError for bad tokens and
+    KeySetUnavailable when the key set cannot be resolved.
+    """
+    signing_key = key_store.get_signing_key(access_token)
+    options = {"verify_aud": bool(JWT_AUDIENCE), "verify_iss": bool(JWT_ISSUER)}
+    return jwt.decode(
+        access_token,
+        signing_key,
+        algorithms=JWT_ALGORITHMS,
+        audience=JWT_AUDIENCE or None,
+        issuer=JWT_ISSUER or None,
+        options=options,
+    )
+
+
+key_store = None
+if local_verification_enabled():
+    info(f"Verifying access tokens locally against {JWKS_URL}")
+    key_store = JWKSKeyStore(JWKS_URL, int(JWKS_REFRESH_SECONDS or DEFAULT_REFRESH_SECONDS),
+                             int(JWKS_MIN_REFETCH_SECONDS or DEFAULT_MIN_REFETCH_SECONDS))
+    key_store.start()
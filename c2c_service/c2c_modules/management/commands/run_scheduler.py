@@ -0,0 +1,86 @@
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections, DEFAULT_DB_ALIAS, DatabaseError
+from c2c_modules.tasks import build_invoice_scheduler
+from c2c_modules.custom_logger import info, error
+
+# Arbitrary application-wide key for the scheduler leader lock.
+SCHEDULER_LOCK_ID = 720_240_001
+
+
+class LeaderLock:
+    """
+    Session-level Postgres advisory lock on a connection of its own. It is held for as long as
+    that connection lives, and released by the server if the connection or the process dies, so
+    the holder rechecks it (on the same connection) before every job run.
+    """
+    def __init__(self, alias=DEFAULT_DB_ALIAS, retry_delay=2):
+        self.alias = alias
+        self.retry_delay = retry_delay
+        self.connection = None
+        self._lock = threading.Lock()
+
+    def _try_lock(self):
+        if self.connection is None:
+            self.connection = connections.create_connection(self.alias)
+            # Jobs recheck the lock from the scheduler's worker threads.
+            self.connection.inc_thread_sharing()
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [SCHEDULER_LOCK_ID])
+            return cursor.fetchone()[0]
+
+    def held(self):
+        """
+        Take the lock, or confirm it is still ours. A failed check (a dropped connection, a
+        database restart) is retried once on a fresh connection; the server released the lock
+        with the old connection, so the retry tells whether another session has taken it since.
+        False only when the lock is held elsewhere or the database stays unreachable.
+        """
+        if connections[self.alias].vendor != 'postgresql':
+            return True
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._try_lock():
+                        return True
+                    self.release()
+                    return False
+                except DatabaseError as e:
+                    error(f"Scheduler leader lock check failed (attempt {attempt + 1}): {e}")
+                    self.release()
+                    if attempt == 0:
+                        time.sleep(self.retry_delay)
+            return False
+
+    def release(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except DatabaseError:
+                pass
+            self.connection = None
+
+
+class Command(BaseCommand):
+    help = "Run the invoice scheduler. Only the process holding the leader lock schedules jobs; others wait on standby."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-seconds', type=int, default=30, help="How often a standby process retries the leader lock.")
+
+    def handle(self, *args, **options):
+        leader_lock = LeaderLock()
+        while True:
+            while not leader_lock.held():
+                info("Scheduler leader lock is held by another process; waiting.")
+                time.sleep(options['retry_seconds'])
+            info("Acquired scheduler leader lock. Starting the scheduler...")
+            scheduler = build_invoice_scheduler(is_leader=leader_lock.held)
+            try:
+                # Returns when a job finds the lock lost and shuts the scheduler down.
+                scheduler.start()
+            except (KeyboardInterrupt, SystemExit):
+                scheduler.shutdown()
+                leader_lock.release()
+                return
+            info("Scheduler stepped down; back on standby.")
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-17 17:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0038_alter_employeeunplannednonbillablehours_non_billable_hours_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerJobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(db_index=True, max_length=255)),
+                ('hostname', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('success', 'Success'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, default=dict, null=True)),
+            ],
+            options={
+                'ordering': ('-started_at',),
+            },
+        ),
+    ]
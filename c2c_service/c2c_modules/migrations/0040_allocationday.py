@@ -0,0 +1,64 @@
+# Generated by Django 5.0.2 on 2026-10-17 17:15
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import datetime
+from django.db import migrations, models
+
+
+def backfill_allocation_days(apps, schema_editor):
+    Timesheet = apps.get_model('c2c_modules', 'Timesheet')
+    AllocationDay = apps.get_model('c2c_modules', 'AllocationDay')
+    batch = []
+    for timesheet in Timesheet.objects.only('id', 'resource_id', 'contract_sow_id', 'resource_estimation_data').iterator(chunk_size=500):
+        daily_data = (timesheet.resource_estimation_data or {}).get('Estimation_Data', {}).get('daily', [])
+        date_format = '%d/%m/%Y'
+        for entry in daily_data:
+            parts = str(entry.get('date', '')).split('/')
+            if len(parts) == 3 and parts[1].isdigit() and int(parts[1]) > 12:
+                date_format = '%m/%d/%Y'
+                break
+        hours_by_date = defaultdict(float)
+        for entry in daily_data:
+            try:
+                hours_by_date[datetime.strptime(entry['date'], date_format).date()] += float(entry.get('hours') or 0)
+            except (KeyError, TypeError, ValueError):
+                continue
+        for entry_date, hours in hours_by_date.items():
+            batch.append(AllocationDay(
+                timesheet_id=timesheet.id,
+                employee_id=timesheet.resource_id,
+                contract_sow_id=timesheet.contract_sow_id,
+                date=entry_date,
+                hours=hours
+            ))
+        if len(batch) >= 5000:
+            AllocationDay.objects.bulk_create(batch)
+            batch = []
+    AllocationDay.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0039_schedulerjobrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllocationDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hours', models.FloatField(default=0)),
+                ('contract_sow', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='allocation_days', to='c2c_modules.sowcontract')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocation_days', to='c2c_modules.employee')),
+                ('timesheet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocation_days', to='c2c_modules.timesheet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'date'], name='c2c_modules_employe_c3dd5a_idx'), models.Index(fields=['contract_sow', 'date'], name='c2c_modules_contrac_57103e_idx'), models.Index(fields=['date'], name='c2c_modules_date_6bd7d2_idx')],
+                'unique_together': {('timesheet', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_allocation_days, migrations.RunPython.noop),
+    ]
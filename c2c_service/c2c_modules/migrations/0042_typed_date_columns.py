@@ -0,0 +1,160 @@
+# Generated by Django 5.0.2 on 2026-10-17 18:02
+
+import c2c_modules.datefields
+import django.utils.timezone
+from c2c_modules.datefields import parse_legacy_date, format_legacy_date
+from django.db import migrations, models
+
+DATE_FIELDS = {
+    'Contract': ('start_date', 'end_date'),
+    'Estimation': ('contract_start_date', 'contract_end_date'),
+    'SowContract': ('start_date', 'end_date'),
+    'PurchaseOrder': ('start_date', 'end_date'),
+}
+
+
+def copy_legacy_dates(apps, schema_editor):
+    """
+    Fill the typed columns. Values that cannot be parsed are kept in UnparsedLegacyDate (the
+    column is left NULL, or the creation date for a Contract start) instead of being dropped.
+    """
+    unparsed_model = apps.get_model('c2c_modules', 'UnparsedLegacyDate')
+    for model_name, fields in DATE_FIELDS.items():
+        model = apps.get_model('c2c_modules', model_name)
+        typed_fields = [f'{field}_typed' for field in fields]
+        batch = []
+        unparsed = []
+        for row in model.objects.iterator(chunk_size=500):
+            for field in fields:
+                legacy_value = getattr(row, field)
+                value = parse_legacy_date(legacy_value)
+                if value is None and legacy_value and legacy_value.strip():
+                    unparsed.append(unparsed_model(
+                        model_name=model_name, object_id=str(row.pk), field_name=field, value=legacy_value
+                    ))
+                if value is None and model_name == 'Contract' and field == 'start_date':
+                    value = row.date_created.date()
+                setattr(row, f'{field}_typed', value)
+            batch.append(row)
+            if len(batch) >= 500:
+                model.objects.bulk_update(batch, typed_fields)
+                batch = []
+        model.objects.bulk_update(batch, typed_fields)
+        unparsed_model.objects.bulk_create(unparsed, batch_size=500)
+
+
+def restore_legacy_dates(apps, schema_editor):
+    unparsed_model = apps.get_model('c2c_modules', 'UnparsedLegacyDate')
+    unparsed = {
+        (row.model_name, row.object_id, row.field_name): row.value
+        for row in unparsed_model.objects.all()
+    }
+    for model_name, fields in DATE_FIELDS.items():
+        model = apps.get_model('c2c_modules', model_name)
+        batch = []
+        for row in model.objects.iterator(chunk_size=500):
+            for field in fields:
+                value = unparsed.get((model_name, str(row.pk), field))
+                if value is None:
+                    value = format_legacy_date(getattr(row, f'{field}_typed'))
+                setattr(row, field, value)
+            batch.append(row)
+        model.objects.bulk_update(batch, list(fields), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0041_dashboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnparsedLegacyDate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=64)),
+                ('object_id', models.CharField(max_length=64)),
+                ('field_name', models.CharField(max_length=64)),
+                ('value', models.TextField()),
+                ('date_created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        *[
+            migrations.AddField(
+                model_name=model_name.lower(),
+                name=f'{field}_typed',
+                field=c2c_modules.datefields.LegacyDateField(blank=True, null=True),
+            )
+            for model_name, fields in DATE_FIELDS.items()
+            for field in fields
+        ],
+        # Nullable while both columns exist, so that reversing can re-add it to a populated table and refill it.
+        migrations.AlterField(
+            model_name='contract',
+            name='start_date',
+            field=models.CharField(db_index=True, max_length=255, null=True, verbose_name='Start_Date'),
+        ),
+        migrations.RunPython(copy_legacy_dates, restore_legacy_dates),
+        *[
+            operation
+            for model_name, fields in DATE_FIELDS.items()
+            for field in fields
+            for operation in (
+                migrations.RemoveField(model_name=model_name.lower(), name=field),
+                migrations.RenameField(model_name=model_name.lower(), old_name=f'{field}_typed', new_name=field),
+            )
+        ],
+        migrations.AlterField(
+            model_name='contract',
+            name='end_date',
+            field=c2c_modules.datefields.LegacyDateField(blank=True, db_index=True, null=True, verbose_name='End_Date'),
+        ),
+        migrations.AlterField(
+            model_name='contract',
+            name='start_date',
+            field=c2c_modules.datefields.LegacyDateField(db_index=True, verbose_name='Start_Date'),
+        ),
+        migrations.AlterField(
+            model_name='estimation',
+            name='contract_end_date',
+            field=c2c_modules.datefields.LegacyDateField(blank=True, db_index=True, null=True, verbose_name='End_Date'),
+        ),
+        migrations.AlterField(
+            model_name='estimation',
+            name='contract_start_date',
+            field=c2c_modules.datefields.LegacyDateField(blank=True, db_index=True, null=True, verbose_name='Start_Date'),
+        ),
+        migrations.AlterField(
+            model_name='purchaseorder',
+            name='end_date',
+            field=c2c_modules.datefields.LegacyDateField(blank=True, db_index=True, null=True, verbose_name='End_Date'),
+        ),
+        migrations.AlterField(
+            model_name='purchaseorder',
+            name='start_date',
+            field=c2c_modules.datefields.LegacyDateField(blank=True, db_index=True, null=True, verbose_name='Start_Date'),
+        ),
+        migrations.AlterField(
+            model_name='sowcontract',
+            name='end_date',
+            field=c2c_modules.datefields.LegacyDateField(blank=True, db_index=True, null=True, verbose_name='End_Date'),
+        ),
+        migrations.AlterField(
+            model_name='sowcontract',
+            name='start_date',
+            field=c2c_modules.datefields.LegacyDateField(blank=True, db_index=True, null=True, verbose_name='Start_Date'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['start_date', 'end_date'], name='c2c_modules_start_d_1818cc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['start_date', 'end_date'], name='c2c_modules_start_d_051940_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sowcontract',
+            index=models.Index(fields=['start_date', 'end_date'], name='c2c_modules_start_d_ac2c6c_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.2 on 2026-10-17 19:10
+
+from django.db import migrations, models
+
+
+def fill_file_names(apps, schema_editor):
+    FileModel = apps.get_model('c2c_modules', 'FileModel')
+    FileModel.objects.filter(file_name__isnull=True).update(file_name=models.F('blob_name'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0042_typed_date_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filemodel',
+            name='content_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='filemodel',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='filemodel',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_file_names, migrations.RunPython.noop),
+    ]
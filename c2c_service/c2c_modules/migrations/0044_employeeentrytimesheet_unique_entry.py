@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-17 19:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def keep_latest(queryset, key_fields):
+    """Delete all but the most recently updated row of each group sharing `key_fields`."""
+    groups = queryset.values(*key_fields).annotate(rows=Count('id')).filter(rows__gt=1)
+    for group in groups:
+        rows = queryset.filter(**{field: group[field] for field in key_fields})
+        keep_id = rows.order_by('-date_updated', '-id').values_list('id', flat=True).first()
+        rows.exclude(id=keep_id).delete()
+
+
+def repair_week_entries(apps, schema_editor):
+    """
+    Give every entry both a client and a contract or neither, then keep the most recently updated
+    entry of each (employee, year, week, client, contract) group, so the unique constraints of this
+    migration and the next can be added.
+    """
+    EmployeeEntryTimesheet = apps.get_model('c2c_modules', 'EmployeeEntryTimesheet')
+    EmployeeUnplannedNonbillableHours = apps.get_model('c2c_modules', 'EmployeeUnplannedNonbillableHours')
+    SowContract = apps.get_model('c2c_modules', 'SowContract')
+    # A contract without client takes the contract's client; a client without contract is left with neither.
+    EmployeeEntryTimesheet.objects.filter(client__isnull=True, contract_sow__isnull=False).update(
+        client=Subquery(SowContract.objects.filter(uuid=OuterRef('contract_sow_id')).values('client_id')[:1])
+    )
+    EmployeeEntryTimesheet.objects.filter(client__isnull=False, contract_sow__isnull=True).update(client=None)
+    week_fields = ['employee_id_id', 'year', 'week_number']
+    keep_latest(
+        EmployeeEntryTimesheet.objects.filter(client__isnull=False, contract_sow__isnull=False),
+        week_fields + ['client_id', 'contract_sow_id'],
+    )
+    keep_latest(EmployeeEntryTimesheet.objects.filter(client__isnull=True, contract_sow__isnull=True), week_fields)
+    keep_latest(EmployeeUnplannedNonbillableHours.objects.all(), week_fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0043_filemodel_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(repair_week_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='employeeentrytimesheet',
+            constraint=models.UniqueConstraint(fields=('employee_id', 'year', 'week_number', 'client', 'contract_sow'), name='unique_entry_employee_week_client_sow'),
+        ),
+    ]
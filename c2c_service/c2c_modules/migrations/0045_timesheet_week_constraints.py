@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-17 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0044_employeeentrytimesheet_unique_entry'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='employeeentrytimesheet',
+            constraint=models.UniqueConstraint(condition=models.Q(('client__isnull', True), ('contract_sow__isnull', True)), fields=('employee_id', 'year', 'week_number'), name='unique_entry_employee_week_no_client'),
+        ),
+        migrations.AddConstraint(
+            model_name='employeeentrytimesheet',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('client__isnull', True), ('contract_sow__isnull', True)), models.Q(('client__isnull', False), ('contract_sow__isnull', False)), _connector='OR'), name='entry_client_and_sow_together'),
+        ),
+        migrations.AddConstraint(
+            model_name='employeeunplannednonbillablehours',
+            constraint=models.UniqueConstraint(fields=('employee_id', 'year', 'week_number'), name='unique_unplanned_employee_week'),
+        ),
+    ]
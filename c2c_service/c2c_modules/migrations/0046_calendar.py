@@ -0,0 +1,75 @@
+# Generated by Django 5.0.2 on 2026-10-17 17:54
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+FIRST_YEAR = 2020
+YEARS_AHEAD = 2
+
+
+def fill_calendar(apps, schema_editor):
+    """Weeks and days from FIRST_YEAR to YEARS_AHEAD past this year; the scheduler extends them later."""
+    CalendarWeek = apps.get_model('c2c_modules', 'CalendarWeek')
+    CalendarDay = apps.get_model('c2c_modules', 'CalendarDay')
+    last_year = datetime.date.today().year + YEARS_AHEAD
+    monday = datetime.date.fromisocalendar(FIRST_YEAR, 1, 1)
+    weeks = []
+    while monday.isocalendar()[0] <= last_year:
+        year, week_number, _ = monday.isocalendar()
+        weeks.append(CalendarWeek(year=year, week_number=week_number, start_date=monday,
+                                  end_date=monday + datetime.timedelta(days=6)))
+        monday += datetime.timedelta(weeks=1)
+    CalendarWeek.objects.bulk_create(weeks, batch_size=1000)
+    days = [
+        CalendarDay(date=week_start + datetime.timedelta(days=offset), week_id=week_id,
+                    iso_week_day=offset + 1, is_weekend=offset >= 5)
+        for week_id, week_start in CalendarWeek.objects.values_list('id', 'start_date')
+        for offset in range(7)
+    ]
+    CalendarDay.objects.bulk_create(days, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0045_timesheet_week_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarHoliday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('region', models.CharField(choices=[('US', 'US'), ('LATAM', 'LATAM'), ('IND', 'IND'), ('EUR', 'EUR')], max_length=50)),
+                ('name', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'unique_together': {('region', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendarWeek',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('week_number', models.PositiveIntegerField()),
+                ('start_date', models.DateField(unique=True)),
+                ('end_date', models.DateField(db_index=True)),
+            ],
+            options={
+                'unique_together': {('year', 'week_number')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendarDay',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('iso_week_day', models.PositiveSmallIntegerField()),
+                ('is_weekend', models.BooleanField(default=False)),
+                ('week', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='c2c_modules.calendarweek')),
+            ],
+        ),
+        migrations.RunPython(fill_calendar, migrations.RunPython.noop),
+    ]
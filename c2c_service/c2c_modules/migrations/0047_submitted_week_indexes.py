@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0046_calendar'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeeentrytimesheet',
+            index=models.Index(condition=models.Q(('ts_approval_status', 'submitted')), fields=['employee_id', 'year', 'week_number'], name='entry_submitted_week_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeunplannednonbillablehours',
+            index=models.Index(condition=models.Q(('ts_approval_status', 'submitted')), fields=['employee_id', 'year', 'week_number'], name='unplanned_submitted_week_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-17 18:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0047_submitted_week_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingApprovalCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approver_id', models.CharField(blank=True, default='', max_length=255)),
+                ('kind', models.CharField(choices=[('entries', 'Timesheet entries'), ('unplanned', 'Unplanned/time-off hours'), ('any', 'Entries or unplanned/time-off hours')], max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('date_updated', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('approver_id', 'kind')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PendingApprovalWeek',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approver_id', models.CharField(blank=True, default='', max_length=255)),
+                ('kind', models.CharField(choices=[('entries', 'Timesheet entries'), ('unplanned', 'Unplanned/time-off hours'), ('any', 'Entries or unplanned/time-off hours')], max_length=20)),
+                ('year', models.PositiveIntegerField()),
+                ('week_number', models.PositiveIntegerField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_approval_weeks', to='c2c_modules.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'year', 'week_number'], name='c2c_modules_employe_ee134c_idx')],
+                'unique_together': {('approver_id', 'kind', 'employee', 'year', 'week_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.0.2 on 2026-10-17 18:15
+
+import uuid
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_approver_assignments(apps, schema_editor):
+    ApproverAssignment = apps.get_model('c2c_modules', 'ApproverAssignment')
+    for model_name, field in (('Allocation', 'allocation'), ('Timesheet', 'timesheet'), ('EmployeeEntryTimesheet', 'entry')):
+        model = apps.get_model('c2c_modules', model_name)
+        batch = []
+        for pk, approvers in model.objects.values_list('pk', 'approver').iterator(chunk_size=2000):
+            approver_ids = {
+                str(approver['approver_id']) for approver in approvers or []
+                if isinstance(approver, dict) and approver.get('approver_id')
+            }
+            batch.extend(ApproverAssignment(approver_id=approver_id, **{f'{field}_id': pk}) for approver_id in approver_ids)
+            if len(batch) >= 5000:
+                ApproverAssignment.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        ApproverAssignment.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_guest_user_clients(apps, schema_editor):
+    GuestUser = apps.get_model('c2c_modules', 'GuestUser')
+    GuestUserClient = apps.get_model('c2c_modules', 'GuestUserClient')
+    Client = apps.get_model('c2c_modules', 'Client')
+    client_uuids = set(Client.objects.values_list('uuid', flat=True))
+    batch = []
+    for guest_user_id, client_ids in GuestUser.objects.values_list('pk', 'client_ids'):
+        for client_id in client_ids or []:
+            try:
+                client_uuid = uuid.UUID(str(client_id))
+            except ValueError:
+                continue
+            if client_uuid in client_uuids:
+                batch.append(GuestUserClient(guest_user_id=guest_user_id, client_id=client_uuid))
+    GuestUserClient.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('c2c_modules', '0048_pending_approval_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApproverAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approver_id', models.CharField(max_length=255)),
+                ('allocation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='approver_assignments', to='c2c_modules.allocation')),
+                ('entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='approver_assignments', to='c2c_modules.employeeentrytimesheet')),
+                ('timesheet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='approver_assignments', to='c2c_modules.timesheet')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GuestUserClient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guest_user_links', to='c2c_modules.client')),
+                ('guest_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='client_links', to='c2c_modules.guestuser')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='approverassignment',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('allocation__isnull', False), ('entry__isnull', True), ('timesheet__isnull', True)), models.Q(('allocation__isnull', True), ('entry__isnull', True), ('timesheet__isnull', False)), models.Q(('allocation__isnull', True), ('entry__isnull', False), ('timesheet__isnull', True)), _connector='OR'), name='approver_assignment_single_target'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='approverassignment',
+            unique_together={('approver_id', 'allocation'), ('approver_id', 'entry'), ('approver_id', 'timesheet')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='guestuserclient',
+            unique_together={('guest_user', 'client')},
+        ),
+        migrations.RunPython(backfill_approver_assignments, migrations.RunPython.noop),
+        migrations.RunPython(backfill_guest_user_clients, migrations.RunPython.noop),
+    ]
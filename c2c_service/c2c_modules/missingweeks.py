@@ -0,0 +1,286 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Value, IntegerField
+from django.db.models.fields.json import KT
+from config import MISSING_WEEKS_CACHE_SECONDS
+from c2c_modules.models import (Employee, Timesheet, EmployeeEntryTimesheet, EmployeeUnplannedNonbillableHours, CalendarWeek,
+                                AllocationDay)
+from c2c_modules.allocationdays import planned_hours_by_window
+from c2c_modules.utils import format_hours
+from c2c_modules.workcalendar import work_week_bounds, ensure_calendar_covers, WORKDAYS_PER_WEEK
+from c2c_modules.custom_logger import warning
+
+DEFAULT_MISSING_WEEKS_CACHE_SECONDS = 60 * 60
+MISSING_WEEKS_CACHE_PREFIX = "c2c_missing_weeks:"
+# Allocations that ended longer ago than this are still checked up to the current week.
+RECENT_END_WINDOW = timedelta(weeks=4)
+NOT_SUBMITTED = "not_submitted"
+WEEK_DATE_FORMAT = '%Y-%m-%d'
+MISSING_SUBMISSION_FIELDS = ['employee_id', 'employee_name', 'year', 'week_number', 'week_start_date', 'week_end_date']
+MISSING_SUBMISSIONS_CHUNK_SIZE = 2000
+MISSING_SUBMISSIONS_ORDER = "ORDER BY employee_id, week_start_date"
+
+
+def get_week_start_end_dates(year, week_number):
+    monday, friday = work_week_bounds(year, week_number)
+    return monday.strftime(WEEK_DATE_FORMAT), friday.strftime(WEEK_DATE_FORMAT)
+
+def allocation_window(start_date, end_date, current_date):
+    """(first Monday, last day) whose weeks the allocation expects timesheets for, or None."""
+    try:
+        start_date = datetime.fromisoformat(start_date.replace("Z", "")).date()
+        end_date = datetime.fromisoformat(end_date.replace("Z", "")).date()
+    except (TypeError, AttributeError, ValueError):
+        return None
+    until = current_date
+    if end_date > current_date - RECENT_END_WINDOW:
+        until = min(end_date, current_date)
+    if start_date.weekday() >= WORKDAYS_PER_WEEK:
+        start_date += timedelta(days=7 - start_date.weekday())
+    if start_date > until:
+        return None
+    return start_date - timedelta(days=start_date.weekday()), until
+
+def missing_week_keys(employee, windows):
+    """
+    [(timesheet id, year, week number)] of the calendar weeks in each allocation window that have
+    no entry for that timesheet: one UNION of `CalendarWeek` range scans anti-joined (NOT EXISTS)
+    against the employee's entries.
+    """
+    if not windows:
+        return []
+    ensure_calendar_covers(min(first for first, _ in windows.values()), max(until for _, until in windows.values()))
+    queries = [
+        CalendarWeek.objects.filter(start_date__range=(first_monday, until))
+        .exclude(Exists(EmployeeEntryTimesheet.objects.filter(
+            employee_id=employee, timesheet_id=timesheet_id,
+            year=OuterRef('year'), week_number=OuterRef('week_number'),
+        )))
+        .annotate(timesheet=Value(timesheet_id, output_field=IntegerField()))
+        .values_list('timesheet', 'year', 'week_number')
+        for timesheet_id, (first_monday, until) in windows.items()
+    ]
+    return list(queries[0].union(*queries[1:], all=True))
+
+def build_missing_weeks(employee, current_date):
+    """One bucket per ISO week with a missing entry, holding a row for every allocation missing it."""
+    # Only the allocation dates are read out of the estimation JSON, not the daily breakdown.
+    timesheets = {
+        timesheet.id: timesheet
+        for timesheet in Timesheet.objects.filter(resource=employee)
+        .select_related('client', 'contract_sow').defer('resource_estimation_data')
+        .annotate(allocation_start=KT('resource_estimation_data__start_date'),
+                  allocation_end=KT('resource_estimation_data__end_date'))
+    }
+    windows = {}
+    for timesheet_id, timesheet in timesheets.items():
+        window = allocation_window(timesheet.allocation_start, timesheet.allocation_end, current_date)
+        if window is None:
+            warning(f"Timesheet {timesheet_id} has no usable allocation dates; skipped for missing weeks")
+            continue
+        windows[timesheet_id] = window
+    keys = missing_week_keys(employee, windows)
+    week_windows = {(year, week_number): work_week_bounds(year, week_number) for _, year, week_number in keys}
+    allocated = planned_hours_by_window({timesheet_id for timesheet_id, _, _ in keys}, week_windows)
+    buckets = {}
+    for timesheet_id, year, week_number in sorted(keys):
+        bucket = buckets.get((year, week_number))
+        if bucket is None:
+            monday, friday = week_windows[(year, week_number)]
+            bucket = buckets[(year, week_number)] = {
+                "week_start_date": monday,
+                "week_end_date": friday,
+                "week_number": week_number,
+                "year": year,
+                "timeoff_hours": format_hours(0),
+                "total_hours": format_hours(0),
+                "unplanned_hours": format_hours(0),
+                "timeoff_hours_comments": "",
+                "unplanned_hours_comments": "",
+                "approver_comments": "",
+                "timesheet_status": NOT_SUBMITTED,
+                "timesheets": [],
+            }
+        timesheet = timesheets[timesheet_id]
+        bucket["timesheets"].append({
+            "client_name": timesheet.client.name if timesheet.client else "N/A",
+            "contract_sow_name": timesheet.contract_sow.contractsow_name if timesheet.contract_sow else "N/A",
+            "allocated_hours": format_hours(allocated[(timesheet_id, (year, week_number))]),
+            "billable_hours": format_hours(0),
+            "non_billable_hours": format_hours(0),
+            "timesheet_status": NOT_SUBMITTED,
+            "manager_comments": ""
+        })
+    return buckets
+
+def get_recalled_timesheets(employee):
+    """The employee's recalled weeks, with entries and unplanned/time-off hours, in three queries."""
+    recalled_timesheets = list(
+        EmployeeEntryTimesheet.objects.filter(employee_id=employee, ts_approval_status="recall")
+        .select_related('client', 'contract_sow')
+    )
+    recalled_unplanned_hours = EmployeeUnplannedNonbillableHours.objects.filter(employee_id=employee, ts_approval_status="recall")
+    week_windows = {
+        (timesheet.year, timesheet.week_number): work_week_bounds(timesheet.year, timesheet.week_number)
+        for timesheet in recalled_timesheets
+    }
+    allocated = planned_hours_by_window(
+        {timesheet.timesheet_id_id for timesheet in recalled_timesheets if timesheet.timesheet_id_id}, week_windows
+    )
+    grouped_recalled_data = defaultdict(lambda: {"timesheets": [], "unplanned_hours": None})
+    total_hours = 0
+    unplanned_dummy = {
+            "timeoff_hours": format_hours(0),
+            "unplanned_hours": format_hours(0),
+            "timeoff_hours_comments": "",
+            "unplanned_hours_comments": "",
+            "approver_comments": "",
+            "timesheet_status": "recall",
+        }
+    for timesheet in recalled_timesheets:
+        key = (timesheet.year, timesheet.week_number)
+        allocated_hours = allocated[(timesheet.timesheet_id_id, key)]
+        total_hours += timesheet.non_billable_hours + timesheet.billable_hours
+        grouped_recalled_data[key]["timesheets"].append({
+            "client_name": timesheet.client.name if timesheet.client else "N/A",
+            "contract_sow_name": timesheet.contract_sow.contractsow_name if timesheet.contract_sow else "N/A",
+            "allocated_hours": format_hours(allocated_hours),
+            "billable_hours": format_hours(timesheet.billable_hours),
+            "non_billable_hours": format_hours(timesheet.non_billable_hours),
+            "total_hours": format_hours(timesheet.total_hours),
+            "approver_comments": timesheet.approver_comments,
+            "timesheet_status": timesheet.ts_approval_status
+        })
+    for unplanned in recalled_unplanned_hours:
+        total_hours += (unplanned.non_billable_hours or 0) + (unplanned.unplanned_hours or 0)
+        key = (unplanned.year, unplanned.week_number)
+        grouped_recalled_data[key]["unplanned_hours"] = {
+            "timeoff_hours": format_hours(unplanned.non_billable_hours),
+            "unplanned_hours": format_hours(unplanned.unplanned_hours),
+            "timeoff_hours_comments": unplanned.non_billable_hours_comments,
+            "unplanned_hours_comments": unplanned.unplanned_hours_comments,
+            "approver_comments": unplanned.approver_comments,
+            "timesheet_status": unplanned.ts_approval_status
+        }
+    final_result = []
+    for (year, week), data in sorted(grouped_recalled_data.items()):
+        week_start_date, week_end_date = get_week_start_end_dates(year, week)
+        final_result.append({
+            "employee_id": employee.employee_source_id,
+            "employee_name": employee.employee_full_name,
+            "week_start_date": week_start_date,
+            "week_end_date": week_end_date,
+            "year": year,
+            "week_number": week,
+            "total_hours": format_hours(total_hours),
+            "timesheets": data["timesheets"],
+            **(data["unplanned_hours"] if data["unplanned_hours"] else unplanned_dummy)
+        })
+    return final_result
+
+def build_missing_timesheets(employee, current_date):
+    """(weeks to fill in, newest first, number of recalled weeks) for the missing-timesheet screen."""
+    missing_weeks = build_missing_weeks(employee, current_date)
+    recalled_timesheets = get_recalled_timesheets(employee)
+    week_start_date_lookup = {}
+    for recalled_entry in recalled_timesheets:
+        recalled_week_start_date = datetime.strptime(recalled_entry['week_start_date'], WEEK_DATE_FORMAT).date()
+        recalled_entry['week_start_date'] = recalled_week_start_date
+        week_start_date_lookup[recalled_week_start_date] = recalled_entry
+    for missing_week in missing_weeks.values():
+        week_start_date_lookup.setdefault(missing_week['week_start_date'], missing_week)
+    complete_data = sorted(week_start_date_lookup.values(), key=lambda x: (-x["year"], -x["week_number"]))
+    return complete_data, len(recalled_timesheets)
+
+def missing_weeks_cache_key(employee_id):
+    return f"{MISSING_WEEKS_CACHE_PREFIX}{employee_id}"
+
+def get_missing_timesheets(employee, current_date):
+    """
+    `build_missing_timesheets`, cached per employee for the day until one of their entries,
+    unplanned hours or allocations changes (see `invalidate_missing_weeks`).
+    """
+    key = missing_weeks_cache_key(employee.pk)
+    cached = cache.get(key)
+    if cached is not None and cached["date"] == current_date:
+        return cached["data"], cached["recalled_count"]
+    complete_data, recalled_count = build_missing_timesheets(employee, current_date)
+    cache.set(key, {"date": current_date, "data": complete_data, "recalled_count": recalled_count},
+              timeout=int(MISSING_WEEKS_CACHE_SECONDS or DEFAULT_MISSING_WEEKS_CACHE_SECONDS))
+    return complete_data, recalled_count
+
+def invalidate_missing_weeks(employee_ids):
+    """Drop the cached missing weeks of these employees once the current transaction commits."""
+    keys = [missing_weeks_cache_key(employee_id) for employee_id in set(employee_ids) if employee_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def quoted_column(model, field_name):
+    return connection.ops.quote_name(model._meta.get_field(field_name).column)
+
+def quoted_table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+def missing_submissions_sql(active_only):
+    """
+    Every (employee, calendar week overlapping the range) pair without an entry or an
+    unplanned/time-off row for that week: a cross join anti-joined (NOT EXISTS) against both
+    submission tables, so only the missing pairs leave the database. With `active_only`, the
+    employee must also have allocated hours in that week.
+    """
+    employee_id = quoted_column(Employee, 'employee_source_id')
+    conditions = [
+        f"""NOT EXISTS (SELECT 1 FROM {quoted_table(model)} s WHERE s.{quoted_column(model, 'employee_id')} = e.{employee_id}
+            AND s.{quoted_column(model, 'year')} = w.{quoted_column(CalendarWeek, 'year')}
+            AND s.{quoted_column(model, 'week_number')} = w.{quoted_column(CalendarWeek, 'week_number')})"""
+        for model in (EmployeeEntryTimesheet, EmployeeUnplannedNonbillableHours)
+    ]
+    if active_only:
+        conditions.append(
+            f"""EXISTS (SELECT 1 FROM {quoted_table(AllocationDay)} a WHERE a.{quoted_column(AllocationDay, 'employee')} = e.{employee_id}
+            AND a.{quoted_column(AllocationDay, 'date')} BETWEEN w.{quoted_column(CalendarWeek, 'start_date')} AND w.{quoted_column(CalendarWeek, 'end_date')}
+            AND a.{quoted_column(AllocationDay, 'hours')} > 0)"""
+        )
+    selected = [
+        f"e.{employee_id}", f"e.{quoted_column(Employee, 'employee_full_name')}",
+        *(f"w.{quoted_column(CalendarWeek, field)}" for field in ('year', 'week_number', 'start_date', 'end_date')),
+    ]
+    aliases = ", ".join(f"{expression} AS {connection.ops.quote_name(alias)}" for expression, alias in zip(selected, MISSING_SUBMISSION_FIELDS))
+    return f"""SELECT {aliases} FROM {quoted_table(Employee)} e CROSS JOIN {quoted_table(CalendarWeek)} w
+        WHERE w.{quoted_column(CalendarWeek, 'start_date')} <= %s AND w.{quoted_column(CalendarWeek, 'end_date')} >= %s AND {' AND '.join(conditions)}"""
+
+def missing_submission(row):
+    record = dict(zip(MISSING_SUBMISSION_FIELDS, row))
+    record["employee_name"] = (record["employee_name"] or "").strip()
+    record["week_start_date"] = str(record["week_start_date"])
+    record["week_end_date"] = str(record["week_end_date"])
+    return record
+
+def missing_submissions_page(start_date, end_date, active_only, limit, offset):
+    """(one page of missing submissions, total number of them) in a single query."""
+    ensure_calendar_covers(start_date, end_date)
+    sql = f"SELECT page.*, COUNT(*) OVER () FROM ({missing_submissions_sql(active_only)}) page {MISSING_SUBMISSIONS_ORDER} LIMIT %s OFFSET %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [end_date, start_date, limit, offset])
+        rows = cursor.fetchall()
+    if not rows and offset:
+        # Past the last page there is no row to carry the window count.
+        return [], missing_submissions_count(start_date, end_date, active_only)
+    return [missing_submission(row) for row in rows], rows[0][-1] if rows else 0
+
+def missing_submissions_count(start_date, end_date, active_only):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM ({missing_submissions_sql(active_only)}) page", [end_date, start_date])
+        return cursor.fetchone()[0]
+
+def iter_missing_submissions(start_date, end_date, active_only):
+    """All missing submissions, fetched from the cursor in chunks while the caller consumes them."""
+    ensure_calendar_covers(start_date, end_date)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT * FROM ({missing_submissions_sql(active_only)}) page {MISSING_SUBMISSIONS_ORDER}", [end_date, start_date])
+        while rows := cursor.fetchmany(MISSING_SUBMISSIONS_CHUNK_SIZE):
+            for row in rows:
+                yield missing_submission(row)
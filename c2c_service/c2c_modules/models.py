@@ -1,4 +1,4 @@
-from django.db import models, IntegrityError, transaction
+from django.db import models, IntegrityError
 import uuid
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -8,6 +8,7 @@ from django.apps import apps
 from config import (ACTIVE, INACTIVE, POTENTIAL_LEAD, ONBOARDED, US, LATAM,
                     IND, EUR, USD, INR, EMPLOYEE, CONTRACTOR, EMPLOYEE_HOURLY, SUB_CONTRACTOR)
 from django.utils.translation import gettext_lazy as _
+from c2c_modules.datefields import LegacyDateField
 
 NET15="Net 15"
 NET30="Net 30"
@@ -29,6 +30,11 @@ TS_APPROVAL_STATUS_CHOICES = [
         ("submitted", "Submitted"),
         ("recall", "Recall"),
     ]
+PENDING_APPROVAL_KIND_CHOICES = [
+        ("entries", "Timesheet entries"),
+        ("unplanned", "Unplanned/time-off hours"),
+        ("any", "Entries or unplanned/time-off hours"),
+    ]
 STATUS_CHOICES = [
         ('active', 'Active'),
         ('inactive', 'Inactive'),
@@ -74,8 +80,8 @@ class Client(AbstractBaseModel):
 class Contract(AbstractBaseModel):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="client_contracts")
     name = models.CharField(max_length=255,unique=True)
-    start_date = models.CharField(_(START_DATE),max_length=255, db_index=True)
-    end_date = models.CharField(_(END_DATE),max_length=255, null=True, blank=True)
+    start_date = LegacyDateField(_(START_DATE), db_index=True)
+    end_date = LegacyDateField(_(END_DATE), db_index=True, null=True, blank=True)
     status = models.BooleanField(default=True)
     files = models.JSONField(default=list)
     contract_name = models.CharField(max_length=255, default="Default Contract Name")
@@ -90,6 +96,7 @@ class Contract(AbstractBaseModel):
     class Meta:
         verbose_name = 'Contract'
         verbose_name_plural = 'Contracts'
+        indexes = [models.Index(fields=['start_date', 'end_date'])]
 
 
 class FileModel(AbstractBaseModel):
@@ -97,11 +104,18 @@ class FileModel(AbstractBaseModel):
     document_id = models.CharField(max_length=255,blank=True, null=True)
     document_type = models.CharField(max_length=30, blank=True, null=True)
     blob_name = models.CharField(max_length=255, null=True,blank=True)
+    file_name = models.CharField(max_length=255, null=True,blank=True)
+    content_sha256 = models.CharField(max_length=64, db_index=True, null=True, blank=True)
+    size = models.BigIntegerField(null=True, blank=True)
     status = models.CharField(max_length=8, choices=STATUS_CHOICES, default='active')
 
     def __str__(self):
         return self.blob_name if self.blob_name else str(self.pk)
 
+    @property
+    def download_name(self):
+        return self.file_name or (self.blob_name or "").split("/")[-1]
+
 
 class Estimation(AbstractBaseModel):
     name = models.CharField(max_length=255,unique=True)
@@ -112,8 +126,8 @@ class Estimation(AbstractBaseModel):
     company_avg_cost = models.FloatField(null=True, blank=True)
     company_avg_price = models.FloatField(null=True, blank=True)
     company_avg_gm = models.FloatField(null=True, blank=True)
-    contract_start_date = models.CharField(_(START_DATE),max_length=255, db_index=True,null=True,blank=True)
-    contract_end_date = models.CharField(_(END_DATE),max_length=255, db_index=True,null=True,blank=True)
+    contract_start_date = LegacyDateField(_(START_DATE), db_index=True,null=True,blank=True)
+    contract_end_date = LegacyDateField(_(END_DATE), db_index=True,null=True,blank=True)
     resource = models.JSONField()
     estimation_archived = models.BooleanField(default=False)
     billing = models.CharField(max_length=255, db_index=True,null=True,blank=True)
@@ -161,9 +175,9 @@ class SowContract(AbstractBaseModel):
     estimation = models.ForeignKey(Estimation, on_delete=models.CASCADE, related_name="estimation_contractsow")
     contractsow_name = models.CharField(max_length=255,unique=True)
     total_contract_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    start_date = models.CharField(_(START_DATE),max_length=255, db_index=True,blank=True, null=True)
+    start_date = LegacyDateField(_(START_DATE), db_index=True,blank=True, null=True)
     contractsow_creation_date = models.DateField(("contractsow_creation_date"), db_index=True, auto_now_add=True)
-    end_date = models.CharField(_(END_DATE),max_length=255, db_index=True,blank=True, null=True)
+    end_date = LegacyDateField(_(END_DATE), db_index=True,blank=True, null=True)
     document = models.JSONField(default=list)
     payment_term_client = models.CharField(max_length=255, default="Default Payment term")
     payment_term_contract = models.CharField(max_length=20,choices=PAYMENT_TERMS_CHOICES,default=NET30,)
@@ -176,6 +190,7 @@ class SowContract(AbstractBaseModel):
     class Meta:
         verbose_name = 'Sow_Contract'
         verbose_name_plural = 'Sow_Contracts'
+        indexes = [models.Index(fields=['start_date', 'end_date'])]
 
 
 
@@ -185,13 +200,18 @@ class PurchaseOrder(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='client_po')
     account_number = models.CharField(max_length=50)
     po_amount = models.DecimalField(max_digits=30, decimal_places=2)
-    start_date = models.CharField(_(START_DATE),max_length=255, db_index=True,blank=True, null=True)
-    end_date = models.CharField(_(END_DATE),max_length=255, db_index=True,blank=True, null=True)
+    start_date = LegacyDateField(_(START_DATE), db_index=True,blank=True, null=True)
+    end_date = LegacyDateField(_(END_DATE), db_index=True,blank=True, null=True)
     purchase_order_documents = models.JSONField(default=list)
     po_creation_date = models.DateTimeField(("po_creation_date"), db_index=True, auto_now_add=True,  null=True)
     username_created = models.CharField(max_length=255,null=True,blank=True)
     username_updated = models.CharField(max_length=255,null=True,blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['start_date', 'end_date'])]
+
+UTILIZED_AMOUNT_KEY = ['sow_contract', 'purchase_order']
+
 class UtilizedAmount(models.Model):
     id = models.AutoField(primary_key=True)
     purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='utilized_amounts')
@@ -205,17 +225,16 @@ class UtilizedAmount(models.Model):
         unique_together = ['sow_contract', 'purchase_order']
 
     def save(self, *args, **kwargs):
-        with transaction.atomic():
-            if not self.pk:
-                try:
-                    existing_record = UtilizedAmount.objects.get(sow_contract=self.sow_contract, purchase_order=self.purchase_order)
-                    existing_record.utilized_amount = self.utilized_amount
-                    existing_record.save()
-                    self.pk = existing_record.pk
-                except UtilizedAmount.DoesNotExist:
-                    super().save(*args, **kwargs)
-            else:
-                super().save(*args, **kwargs)
+        if self.pk:
+            return super().save(*args, **kwargs)
+        # A new amount for an existing (sow_contract, purchase_order) pair replaces the stored one,
+        # in one INSERT ... ON CONFLICT DO UPDATE.
+        UtilizedAmount.objects.bulk_create(
+            [self], update_conflicts=True, unique_fields=UTILIZED_AMOUNT_KEY, update_fields=['utilized_amount'],
+        )
+        self._state.adding = False
+        post_save.send(sender=UtilizedAmount, instance=self, created=False, update_fields=None, raw=False,
+                       using=self._state.db)
 
 
 class MainMilestone(AbstractBaseModel):
@@ -264,16 +283,6 @@ class Allocation(AbstractBaseModel):
         verbose_name = 'Allocation'
         verbose_name_plural = 'Allocations'
 
-    def clean(self):
-        # Additional validation logic can be added here
-        super().clean()
-        if Allocation.objects.filter(
-            contract_sow=self.contract_sow,
-            estimation=self.estimation,
-            client=self.client
-        ).exclude(pk=self.pk).exists():
-            raise ValidationError("An allocation with this contract_sow, estimation, and client already exists.")
-
 
 class Timesheet(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="timesheet_client",null=True,blank=True)
@@ -294,6 +303,25 @@ class Timesheet(models.Model):
     def __str__(self):
         return f"{self.resource_id} - {self.resource_role}"
 
+class AllocationDay(models.Model):
+    """One row per timesheet and day of `Timesheet.resource_estimation_data['Estimation_Data']['daily']`."""
+    timesheet = models.ForeignKey(Timesheet, on_delete=models.CASCADE, related_name="allocation_days")
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="allocation_days")
+    contract_sow = models.ForeignKey(SowContract, on_delete=models.CASCADE, related_name="allocation_days", null=True, blank=True)
+    date = models.DateField()
+    hours = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ['timesheet', 'date']
+        indexes = [
+            models.Index(fields=['employee', 'date']),
+            models.Index(fields=['contract_sow', 'date']),
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.date} - {self.hours}"
+
 class EmployeeEntryTimesheet(models.Model):
     timesheet_id = models.ForeignKey(Timesheet, on_delete=models.CASCADE,blank=True, null=True, related_name="employee_entry_timesheet")
     employee_id = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="employee_entry_id")
@@ -315,6 +343,33 @@ class EmployeeEntryTimesheet(models.Model):
     date_updated = models.DateTimeField(_("Date Updated"), auto_now=True, db_index=True)
     username_created = models.CharField(max_length=255,blank=True,null=True)
     username_updated = models.CharField(max_length=255,blank=True,null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['employee_id', 'year', 'week_number', 'client', 'contract_sow'],
+                name='unique_entry_employee_week_client_sow',
+            ),
+            # NULLs are distinct in the constraint above, so the entry without client and contract needs its own.
+            models.UniqueConstraint(
+                fields=['employee_id', 'year', 'week_number'],
+                condition=models.Q(client__isnull=True, contract_sow__isnull=True),
+                name='unique_entry_employee_week_no_client',
+            ),
+            models.CheckConstraint(
+                check=models.Q(client__isnull=True, contract_sow__isnull=True) | models.Q(client__isnull=False, contract_sow__isnull=False),
+                name='entry_client_and_sow_together',
+            ),
+        ]
+        indexes = [
+            # Backs the submitted-week anti-join of the admin approval list.
+            models.Index(
+                fields=['employee_id', 'year', 'week_number'],
+                condition=models.Q(ts_approval_status='submitted'),
+                name='entry_submitted_week_idx',
+            ),
+        ]
+
     def parse_time_string(self, time_input):
         """Convert a time input to a float value and back to 'HH:MM' string format."""
         if isinstance(time_input, int):
@@ -328,26 +383,11 @@ class EmployeeEntryTimesheet(models.Model):
         raise ValueError("Invalid time input; expected int or str.")
 
     def clean(self):
+        # Uniqueness is enforced by the database constraints; this only gives the pairing rule a readable error.
         super().clean()
-        
-        # Allow empty client and contract_sow entries, but ensure uniqueness for employee, year, and week
-        if self.client and self.contract_sow and EmployeeEntryTimesheet.objects.filter(
-            employee_id=self.employee_id,
-            year=self.year,
-            week_number=self.week_number,
-            client=self.client,
-            contract_sow=self.contract_sow
-        ).exclude(id=self.id).exists():
-            raise ValidationError("An entry with this employee, client, contract SOW, year, and week already exists.")
-
-        if not self.client and not self.contract_sow: 
-            # Allow empty client and contract_sow, no conflict here
-            return
-
-        if self.client and not self.contract_sow:
+        if self.client_id and not self.contract_sow_id:
             raise ValidationError("Contract SOW is required when client is provided.")
-
-        if self.contract_sow and not self.client:
+        if self.contract_sow_id and not self.client_id:
             raise ValidationError("Client is required when contract SOW is provided.")
 
     def set_hours_as_float(self):
@@ -361,7 +401,6 @@ class EmployeeEntryTimesheet(models.Model):
     def calculate_total_hours(self):
         self.total_hours = self.billable_hours + self.non_billable_hours + self.unplanned_hours
 
-    @transaction.atomic
     def save(self, *args, **kwargs):
         self.set_hours_as_float()
         self.calculate_total_hours()
@@ -385,6 +424,19 @@ class EmployeeUnplannedNonbillableHours(models.Model):
     date_updated = models.DateTimeField(_("Date Updated"), auto_now=True, db_index=True)
     username_created = models.CharField(max_length=255,blank=True,null=True)
     username_updated = models.CharField(max_length=255,blank=True,null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee_id', 'year', 'week_number'], name='unique_unplanned_employee_week'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['employee_id', 'year', 'week_number'],
+                condition=models.Q(ts_approval_status='submitted'),
+                name='unplanned_submitted_week_idx',
+            ),
+        ]
+
     def parse_time_string(self, time_input):
         """Convert a time input to a float value and back to 'HH:MM' string format."""
         if isinstance(time_input, int):
@@ -405,10 +457,8 @@ class EmployeeUnplannedNonbillableHours(models.Model):
             elif isinstance(value, int):
                 setattr(self, field, float(value))
     
-    @transaction.atomic
     def save(self, *args, **kwargs):
         self.set_hours_as_float()
-        self.clean()
         super().save(*args, **kwargs)
 
 class Invoices(models.Model):
@@ -444,6 +494,48 @@ class ProfilingResult(models.Model):
     def __str__(self):
         return f"{self.path} - {self.function_name} - {self.cumulative_time:.6f}s"
     
+class SchedulerJobRun(models.Model):
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+
+    job_id = models.CharField(max_length=255, db_index=True)
+    hostname = models.CharField(max_length=255, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(default=timezone.now, db_index=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    result = models.JSONField(default=dict, blank=True, null=True)
+
+    class Meta:
+        ordering = ('-started_at',)
+
+    def __str__(self):
+        return f"{self.job_id} - {self.status} - {self.started_at}"
+
+
+class DashboardSnapshot(models.Model):
+    """One precomputed section of the dashboard, refreshed when its source tables change."""
+    section = models.CharField(max_length=64, unique=True)
+    data = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.section} - {self.computed_at}"
+
+class UnparsedLegacyDate(models.Model):
+    """A date string migration 0042 could not parse, kept so it can be corrected by hand."""
+    model_name = models.CharField(max_length=64)
+    object_id = models.CharField(max_length=64)
+    field_name = models.CharField(max_length=64)
+    value = models.TextField()
+    date_created = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.model_name}.{self.field_name} {self.object_id}: {self.value}"
+
 class GuestUser(models.Model):
     guest_user_id = models.CharField(max_length=255, primary_key=True)
     guest_user_name = models.CharField(max_length=255, blank=True, null=True)
@@ -482,4 +574,106 @@ class C2CRateCardConfig(models.Model):
 
     def __str__(self):
         return f"Rate Card {self.unique_id} - {self.status}"
-    
\ No newline at end of file
+    
+
+class CalendarWeek(models.Model):
+    """One row per ISO week, Monday to Sunday; see `workcalendar`."""
+    year = models.PositiveIntegerField()
+    week_number = models.PositiveIntegerField()
+    start_date = models.DateField(unique=True)
+    end_date = models.DateField(db_index=True)
+
+    class Meta:
+        unique_together = ['year', 'week_number']
+
+    def __str__(self):
+        return f"{self.year}-W{self.week_number:02d}"
+
+class CalendarDay(models.Model):
+    """One row per calendar day, so reports can join dates to their ISO week and weekend flag in SQL."""
+    date = models.DateField(primary_key=True)
+    week = models.ForeignKey(CalendarWeek, on_delete=models.CASCADE, related_name="days")
+    iso_week_day = models.PositiveSmallIntegerField()
+    is_weekend = models.BooleanField(default=False)
+
+    def __str__(self):
+        return str(self.date)
+
+class CalendarHoliday(models.Model):
+    """A public holiday in one region; working-day figures for that region leave it out."""
+    date = models.DateField(db_index=True)
+    region = models.CharField(max_length=50, choices=REGION_CHOICES)
+    name = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        unique_together = ['region', 'date']
+
+    def __str__(self):
+        return f"{self.region} - {self.date} - {self.name}"
+
+class PendingApprovalWeek(models.Model):
+    """
+    An employee week awaiting approval in one queue: an approver's own (`approver_id`) or, with an
+    empty `approver_id`, everyone's. Kept in step with the entry and unplanned tables on every change.
+    """
+    approver_id = models.CharField(max_length=255, blank=True, default="")
+    kind = models.CharField(max_length=20, choices=PENDING_APPROVAL_KIND_CHOICES)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="pending_approval_weeks")
+    year = models.PositiveIntegerField()
+    week_number = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ['approver_id', 'kind', 'employee', 'year', 'week_number']
+        indexes = [models.Index(fields=['employee', 'year', 'week_number'])]
+
+    def __str__(self):
+        return f"{self.approver_id or '*'} - {self.kind} - {self.employee_id} - {self.year}-W{self.week_number:02d}"
+
+class PendingApprovalCounter(models.Model):
+    """Number of `PendingApprovalWeek` rows per approver and kind, read by the notification count and stream."""
+    approver_id = models.CharField(max_length=255, blank=True, default="")
+    kind = models.CharField(max_length=20, choices=PENDING_APPROVAL_KIND_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    date_updated = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ['approver_id', 'kind']
+
+    def __str__(self):
+        return f"{self.approver_id or '*'} - {self.kind} - {self.count}"
+
+class ApproverAssignment(models.Model):
+    """
+    One approver of an allocation, timesheet or timesheet entry, mirroring its `approver` JSON list
+    so approver queues are indexed joins rather than JSON containment scans.
+    """
+    approver_id = models.CharField(max_length=255)
+    allocation = models.ForeignKey(Allocation, on_delete=models.CASCADE, related_name="approver_assignments", null=True, blank=True)
+    timesheet = models.ForeignKey(Timesheet, on_delete=models.CASCADE, related_name="approver_assignments", null=True, blank=True)
+    entry = models.ForeignKey(EmployeeEntryTimesheet, on_delete=models.CASCADE, related_name="approver_assignments", null=True, blank=True)
+
+    class Meta:
+        unique_together = [['approver_id', 'allocation'], ['approver_id', 'timesheet'], ['approver_id', 'entry']]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(allocation__isnull=False, timesheet__isnull=True, entry__isnull=True)
+                | models.Q(allocation__isnull=True, timesheet__isnull=False, entry__isnull=True)
+                | models.Q(allocation__isnull=True, timesheet__isnull=True, entry__isnull=False),
+                name='approver_assignment_single_target',
+            ),
+        ]
+
+    def __str__(self):
+        target = self.allocation_id or self.timesheet_id or self.entry_id
+        return f"{self.approver_id} - {target}"
+
+class GuestUserClient(models.Model):
+    """A client whose timesheets a guest user approves, mirroring `GuestUser.client_ids`."""
+    guest_user = models.ForeignKey(GuestUser, on_delete=models.CASCADE, related_name="client_links")
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="guest_user_links")
+
+    class Meta:
+        unique_together = ['guest_user', 'client']
+
+    def __str__(self):
+        return f"{self.guest_user_id} - {self.client_id}"
@@ -0,0 +1,296 @@
+import asyncio
+import json
+import threading
+import weakref
+from collections import defaultdict
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q, Count
+from django.utils import timezone
+from config import PENDING_COUNTS_POLL_SECONDS, PENDING_COUNTS_STREAM_SECONDS
+from c2c_modules.models import (EmployeeEntryTimesheet, EmployeeUnplannedNonbillableHours, PendingApprovalWeek,
+                                PendingApprovalCounter)
+from c2c_modules.approvers import approver_ids
+from c2c_modules.utils import check_role
+from c2c_modules.custom_logger import info, error
+
+# `approver_id` of the queues that list every employee (timesheet admin, HR manager).
+ALL_APPROVERS = ""
+ENTRIES = "entries"
+UNPLANNED = "unplanned"
+ANY = "any"
+GLOBAL_SCOPES = [(ALL_APPROVERS, ENTRIES), (ALL_APPROVERS, UNPLANNED), (ALL_APPROVERS, ANY)]
+SUBMITTED = "submitted"
+KEY_CHUNK_SIZE = 500
+DEFAULT_POLL_SECONDS = 2
+DEFAULT_STREAM_SECONDS = 300
+HEARTBEAT_SECONDS = 25
+RECONNECT_MILLISECONDS = 5000
+
+
+def week_filter(keys):
+    """Filter on the years and weeks of `keys`; a superset that callers narrow down to the exact keys."""
+    return {
+        'year__in': {year for _, year, _ in keys},
+        'week_number__in': {week_number for _, _, week_number in keys},
+    }
+
+def pending_scopes(keys):
+    """
+    {(employee id, year, week number): {(approver id, kind)}} of the given weeks as they stand now,
+    in two queries: a week is pending for every approver of a submitted entry, and for everyone when
+    it has a submitted entry or submitted unplanned/time-off hours.
+    """
+    scopes = defaultdict(set)
+    employee_ids = {employee_id for employee_id, _, _ in keys}
+    entries = EmployeeEntryTimesheet.objects.filter(
+        employee_id__in=employee_ids, ts_approval_status=SUBMITTED, **week_filter(keys)
+    ).values_list('employee_id', 'year', 'week_number', 'approver')
+    for employee_id, year, week_number, approvers in entries:
+        key = (employee_id, year, week_number)
+        if key not in keys:
+            continue
+        scopes[key].update({(ALL_APPROVERS, ENTRIES), (ALL_APPROVERS, ANY)})
+        for approver_id in approver_ids(approvers):
+            scopes[key].add((approver_id, ENTRIES))
+    unplanned = EmployeeUnplannedNonbillableHours.objects.filter(
+        Q(unplanned_hours__gt=0) | Q(non_billable_hours__gt=0),
+        employee_id__in=employee_ids, ts_approval_status=SUBMITTED, **week_filter(keys)
+    ).values_list('employee_id', 'year', 'week_number')
+    for key in unplanned:
+        if key in keys:
+            scopes[key].update({(ALL_APPROVERS, UNPLANNED), (ALL_APPROVERS, ANY)})
+    return scopes
+
+def recount(scopes):
+    """Store the `PendingApprovalWeek` totals of the given (approver id, kind) scopes in one upsert."""
+    if not scopes:
+        return
+    scope_filter = Q()
+    for approver_id, kind in scopes:
+        scope_filter |= Q(approver_id=approver_id, kind=kind)
+    counts = dict.fromkeys(scopes, 0)
+    rows = PendingApprovalWeek.objects.filter(scope_filter).values('approver_id', 'kind').annotate(total=Count('id'))
+    for row in rows:
+        counts[(row['approver_id'], row['kind'])] = row['total']
+    now = timezone.now()
+    PendingApprovalCounter.objects.bulk_create(
+        [PendingApprovalCounter(approver_id=approver_id, kind=kind, count=count, date_updated=now)
+         for (approver_id, kind), count in counts.items()],
+        update_conflicts=True, unique_fields=['approver_id', 'kind'], update_fields=['count', 'date_updated'],
+    )
+
+def refresh_pending_weeks(keys):
+    """
+    Bring the pending weeks of `keys` ((employee id, year, week number)) in line with the entry and
+    unplanned tables, then recount only the queues that gained or lost a week.
+    """
+    keys = set(keys)
+    changed = set()
+    for chunk in [list(keys)[start:start + KEY_CHUNK_SIZE] for start in range(0, len(keys), KEY_CHUNK_SIZE)]:
+        chunk = set(chunk)
+        current = pending_scopes(chunk)
+        stored = PendingApprovalWeek.objects.filter(
+            employee_id__in={employee_id for employee_id, _, _ in chunk}, **week_filter(chunk)
+        ).values_list('id', 'approver_id', 'kind', 'employee_id', 'year', 'week_number')
+        stale_ids = []
+        stored_scopes = defaultdict(set)
+        for row_id, approver_id, kind, employee_id, year, week_number in stored:
+            key = (employee_id, year, week_number)
+            if key not in chunk:
+                continue
+            if (approver_id, kind) in current.get(key, ()):
+                stored_scopes[key].add((approver_id, kind))
+            else:
+                stale_ids.append(row_id)
+                changed.add((approver_id, kind))
+        added = []
+        for key, scopes in current.items():
+            for approver_id, kind in scopes - stored_scopes[key]:
+                employee_id, year, week_number = key
+                added.append(PendingApprovalWeek(approver_id=approver_id, kind=kind, employee_id=employee_id,
+                                                 year=year, week_number=week_number))
+                changed.add((approver_id, kind))
+        with transaction.atomic():
+            PendingApprovalWeek.objects.filter(id__in=stale_ids).delete()
+            PendingApprovalWeek.objects.bulk_create(added, ignore_conflicts=True)
+    recount(changed)
+    return changed
+
+
+_pending = threading.local()
+
+def queue_pending_refresh(keys):
+    """
+    Refresh the pending weeks of `keys` once the current transaction commits. Changes made in one
+    transaction are refreshed together by the first callback; the rest find nothing to do.
+    """
+    keys = {(str(employee_id), int(year), int(week_number)) for employee_id, year, week_number in keys if employee_id}
+    if not keys:
+        return
+    pending = getattr(_pending, 'keys', None)
+    if pending is None:
+        pending = _pending.keys = set()
+    pending.update(keys)
+    transaction.on_commit(flush_pending_refresh)
+
+def flush_pending_refresh():
+    keys = getattr(_pending, 'keys', None) or set()
+    _pending.keys = set()
+    if not keys:
+        return
+    try:
+        refresh_pending_weeks(keys)
+    except Exception as e:
+        error(f"Error refreshing pending approval counts for {len(keys)} weeks: {e}")
+
+def reconcile_pending_counts():
+    """
+    Periodic full rebuild from the entry and unplanned tables, catching writes that bypassed the
+    refresh hooks (raw SQL, admin bulk actions).
+    """
+    keys = set(EmployeeEntryTimesheet.objects.filter(ts_approval_status=SUBMITTED).values_list('employee_id', 'year', 'week_number'))
+    keys |= set(EmployeeUnplannedNonbillableHours.objects.filter(ts_approval_status=SUBMITTED).values_list('employee_id', 'year', 'week_number'))
+    keys |= set(PendingApprovalWeek.objects.values_list('employee_id', 'year', 'week_number'))
+    changed = refresh_pending_weeks(keys)
+    # The everyone-queues always have a row, so readers can tell an empty queue from a table never built.
+    recount(set(GLOBAL_SCOPES) - changed)
+    info(f"Pending approval counts reconciled over {len(keys)} weeks, {len(changed)} queues changed")
+    return {'status': 'success', 'weeks': len(keys), 'changed_queues': len(changed)}
+
+
+def load_counters(approver_id=None):
+    """
+    {(approver id, kind): count} of the approver's own queue and the everyone-queues, or of every
+    queue without an approver. The counters are built on first use.
+    """
+    counters = PendingApprovalCounter.objects.all()
+    if approver_id:
+        counters = counters.filter(Q(approver_id=ALL_APPROVERS) | Q(approver_id=str(approver_id), kind=ENTRIES))
+    counters = {(approver, kind): count for approver, kind, count in counters.values_list('approver_id', 'kind', 'count')}
+    if (ALL_APPROVERS, ANY) not in counters:
+        reconcile_pending_counts()
+        return load_counters(approver_id)
+    return counters
+
+def pending_count(counters, approver_id, user_roles):
+    """The notification count for the caller's roles, from {(approver id, kind): count}."""
+    def has_role(role):
+        return check_role(role) in user_roles
+    own_entries = counters.get((str(approver_id), ENTRIES), 0) if approver_id else 0
+    all_unplanned = counters.get((ALL_APPROVERS, UNPLANNED), 0)
+    all_weeks = counters.get((ALL_APPROVERS, ANY), 0)
+    if has_role('c2c_timesheet_admin') and has_role('c2c_timesheet_manager'):
+        return all_weeks + own_entries
+    if has_role('c2c_timesheet_admin'):
+        return all_weeks
+    if has_role('c2c_hr_manager') and has_role('c2c_timesheet_manager'):
+        return own_entries + all_unplanned
+    if has_role('c2c_hr_manager'):
+        return all_unplanned
+    if has_role('c2c_timesheet_manager') or has_role('c2c_guest_employee'):
+        return own_entries
+    return 0
+
+
+class CounterWatcher:
+    """
+    Follows `PendingApprovalCounter` for all the streams of one event loop: a single query per poll
+    loads the counters changed since the last one, however many browser tabs are listening.
+    """
+    def __init__(self):
+        self.counters = {}
+        self.version = 0
+        self.last_seen = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task = None
+
+    def load(self):
+        counters = PendingApprovalCounter.objects.all()
+        if self.last_seen is None:
+            load_counters()
+        else:
+            # Overlap the previous poll so a transaction that committed late is not missed.
+            counters = counters.filter(date_updated__gte=self.last_seen - timedelta(seconds=self.poll_seconds() * 2))
+        return list(counters.values_list('approver_id', 'kind', 'count', 'date_updated'))
+
+    def poll_seconds(self):
+        return float(PENDING_COUNTS_POLL_SECONDS or DEFAULT_POLL_SECONDS)
+
+    async def poll(self):
+        try:
+            while self.subscribers:
+                rows = await sync_to_async(self.load)()
+                updated = False
+                for approver_id, kind, count, date_updated in rows:
+                    if self.counters.get((approver_id, kind)) != count:
+                        self.counters[(approver_id, kind)] = count
+                        updated = True
+                    if self.last_seen is None or date_updated > self.last_seen:
+                        self.last_seen = date_updated
+                if self.last_seen is None:
+                    self.last_seen = timezone.now()
+                if updated or not self.version:
+                    async with self.changed:
+                        self.version += 1
+                        self.changed.notify_all()
+                await asyncio.sleep(self.poll_seconds())
+        except Exception as e:
+            error(f"Pending approval counter watcher stopped: {e}")
+        finally:
+            # Changes made while nobody listened are picked up by a full load on the next start.
+            self.task = None
+            self.last_seen = None
+
+    async def wait(self, version, timeout):
+        """The counters once they differ from `version`, or after `timeout` seconds."""
+        if self.task is None:
+            self.task = asyncio.create_task(self.poll())
+        async with self.changed:
+            if self.version == version:
+                try:
+                    await asyncio.wait_for(self.changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return self.counters, self.version
+
+# One watcher per event loop, like the outbound HTTP clients; each uvicorn worker runs one.
+_watchers = weakref.WeakKeyDictionary()
+
+def get_counter_watcher():
+    loop = asyncio.get_running_loop()
+    watcher = _watchers.get(loop)
+    if watcher is None:
+        watcher = _watchers[loop] = CounterWatcher()
+    return watcher
+
+def count_event(count):
+    return f"event: pending-count\ndata: {json.dumps({'timesheet_pending_approval_count': count})}\n\n"
+
+async def stream_pending_count(approver_id, user_roles):
+    """
+    Server-sent events carrying the caller's pending approval count whenever it changes, with a
+    comment line as heartbeat. The stream ends after PENDING_COUNTS_STREAM_SECONDS; EventSource
+    reconnects on its own.
+    """
+    watcher = get_counter_watcher()
+    watcher.subscribers += 1
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + float(PENDING_COUNTS_STREAM_SECONDS or DEFAULT_STREAM_SECONDS)
+    try:
+        yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+        version, last_count = 0, None
+        while loop.time() < deadline:
+            counters, version = await watcher.wait(version, min(HEARTBEAT_SECONDS, max(deadline - loop.time(), 0)))
+            if not version:
+                continue
+            count = pending_count(counters, approver_id, user_roles)
+            if count != last_count:
+                last_count = count
+                yield count_event(count)
+            else:
+                yield ": keep-alive\n\n"
+    finally:
+        watcher.subscribers -= 1
@@ -17,7 +17,7 @@ class PricingGetAPIView(ListModelMixin, CreateModelMixin, GenericAPIView):
     pagination_class = Pagination
 
     def get_queryset(self):
-        return Pricing.objects.filter(client=self.kwargs['client']).order_by('pricing_creation_date')
+        return PricingSerializer.setup_eager_loading(Pricing.objects.filter(client=self.kwargs['client'])).order_by('pricing_creation_date')
 
     @swagger_auto_schema(tags=["Pricing"])
     def get(self, request, client, *args, **kwargs):
@@ -31,7 +31,7 @@ class PricingGetAPIView(ListModelMixin, CreateModelMixin, GenericAPIView):
             return Response({"roles_response": result})
 
 class PricingPostAPIView(ListModelMixin, CreateModelMixin, GenericAPIView):
-    queryset = Pricing.objects.all()  # Add order_by here
+    queryset = PricingSerializer.setup_eager_loading(Pricing.objects.all())  # Add order_by here
     lookup_field = 'uuid'
     pagination_class = Pagination
     serializer_class = PricingSerializer
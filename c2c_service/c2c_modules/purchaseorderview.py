@@ -6,7 +6,8 @@ from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework import status, generics
 from rest_framework.views import APIView
-from c2c_modules.models import PurchaseOrder, UtilizedAmount, SowContract
+from c2c_modules.models import PurchaseOrder, UtilizedAmount, SowContract, UTILIZED_AMOUNT_KEY
+from c2c_modules.dashboard import mark_dirty
 from c2c_modules.serializer import PurchaseOrderCreateSerializer, PurchaseOrderSerializer, UtilizedAmountSerializer, PurchaseOrderWithUtilizationSerializer, POSowContractSerializer, ContractSowIdListSerializer
 from c2c_modules.utils import has_permission, upload_file_to_blob
 from rest_framework.filters import SearchFilter
@@ -116,26 +117,24 @@ class UtilizedAmountListCreateAPIView(generics.ListCreateAPIView):
         data = request.data
         sow_contract = data.get('sow_contract')
         purchase_orders = data.get('purchase_order', [])
-        utilized_amounts = []
         try:
             sow_contract = SowContract.objects.get(uuid=sow_contract)
         except SowContract.DoesNotExist:
             return Response({"error": "Sow Contract not found"}, status=status.HTTP_404_NOT_FOUND)
-        for order in purchase_orders:
-            purchase_order_id = order.get('id')
-            utilized_amount_value = Decimal(order.get('utilized_amount', 0))
-            try:
-                utilized_amount = UtilizedAmount.objects.get(purchase_order=purchase_order_id, sow_contract=sow_contract)
-                utilized_amount.utilized_amount = utilized_amount_value
-                utilized_amount.username_updated = username
-                utilized_amount.save()
-            except UtilizedAmount.DoesNotExist:
-                utilized_amount = UtilizedAmount.objects.create(purchase_order_id=purchase_order_id,
-                                                                sow_contract=sow_contract,
-                                                                utilized_amount=utilized_amount_value,
-                                                                username_created=username,
-                                                                username_updated=username)
-            utilized_amounts.append(utilized_amount)
+        amounts_by_order = {
+            order.get('id'): UtilizedAmount(purchase_order_id=order.get('id'),
+                                            sow_contract=sow_contract,
+                                            utilized_amount=Decimal(order.get('utilized_amount', 0)),
+                                            username_created=username,
+                                            username_updated=username)
+            for order in purchase_orders
+        }
+        # One INSERT ... ON CONFLICT for all purchase orders; existing pairs keep username_created.
+        utilized_amounts = UtilizedAmount.objects.bulk_create(
+            amounts_by_order.values(), update_conflicts=True, unique_fields=UTILIZED_AMOUNT_KEY,
+            update_fields=['utilized_amount', 'username_updated'],
+        )
+        mark_dirty(UtilizedAmount.__name__)
         response_data = {
             "utilized_purchase_orders": UtilizedAmountSerializer(utilized_amounts, many=True).data,
             "roles_response": result
@@ -168,7 +167,7 @@ class PurchaseOrderWithUtilizationAPIView(generics.ListAPIView):
     pagination_class = Pagination
 
     def get_queryset(self):
-        queryset = PurchaseOrder.objects.prefetch_related('utilized_amounts').all().order_by('id')
+        queryset = PurchaseOrderWithUtilizationSerializer.setup_eager_loading(PurchaseOrder.objects.all()).order_by('id')
         return queryset
 
     @swagger_auto_schema(tags=["Purchase Orders"])
@@ -190,7 +189,7 @@ class PurchaseOrderClientWithUtilizationAPIView(generics.ListAPIView,ListModelMi
 
     def get_queryset(self):
         client_id = self.kwargs['client_id']
-        queryset = PurchaseOrder.objects.prefetch_related('utilized_amounts').all().order_by('id')
+        queryset = PurchaseOrderWithUtilizationSerializer.setup_eager_loading(PurchaseOrder.objects.all()).order_by('id')
         if client_id is not None:
             queryset = queryset.filter(client=client_id)
         return queryset
@@ -213,7 +212,7 @@ class PurchaseOrderClientWithUnUtilizationAPIView(generics.ListAPIView):
 
     def get_queryset(self):
         client_id = self.kwargs['client_id']
-        queryset = PurchaseOrder.objects.prefetch_related('utilized_amounts').annotate(
+        queryset = PurchaseOrderWithUtilizationSerializer.setup_eager_loading(PurchaseOrder.objects.all()).annotate(
                         total_utilized_amount=Coalesce(Sum('utilized_amounts__utilized_amount'), Value(0), output_field=DecimalField())
                     ).annotate(
                         remaining_amount=ExpressionWrapper(
@@ -245,7 +244,7 @@ class PurchaseOrderByIdAPIView(generics.ListAPIView):
     def get_queryset(self):
         purchase_order_id = self.request.query_params.get('purchase_order', None)
         if purchase_order_id is not None:
-            return PurchaseOrder.objects.prefetch_related('utilized_amounts').filter(id=purchase_order_id)
+            return PurchaseOrderWithUtilizationSerializer.setup_eager_loading(PurchaseOrder.objects.filter(id=purchase_order_id))
         return PurchaseOrder.objects.none()
 
     @swagger_auto_schema(tags=["Purchase Orders"])
@@ -1,67 +1,34 @@
-from .models import Employee, SowContract, Timesheet, EmployeeEntryTimesheet, EmployeeUnplannedNonbillableHours, Allocation, Estimation
+from .models import Employee, SowContract, Timesheet, EmployeeEntryTimesheet, Allocation, Estimation
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 from datetime import datetime, timedelta, timezone
 from c2c_modules.utils import has_permission
+from c2c_modules.allocationdays import planned_hours_by_timesheet, planned_hours_by_week_number
+from c2c_modules.datefields import format_legacy_date
+from c2c_modules.estimationengine import get_estimation_series, estimation_resources, resource_slot_indexes, InvalidEstimationDate
 from django.utils import timezone
-import pandas as pd
-from django.http import JsonResponse, HttpResponse
-from django.db import models
+from django.http import JsonResponse
 from decimal import Decimal  # Import Decimal
-from django.db.models import Q
+from django.db.models import Q, F, Sum
+from django.db.models.fields.json import KT
+from collections import defaultdict
 from c2c_modules.serializer import ReportSowContractSerializer 
-import openpyxl
-from openpyxl.utils import get_column_letter
+from c2c_modules.exports import ExportSheet, export_response, dict_rows, requested_export_format
+from c2c_modules.missingweeks import missing_submissions_page, iter_missing_submissions, MISSING_SUBMISSION_FIELDS
 
 class MissingTimesheetView(APIView):
-    
-    def get_missing_submissions(self, start_date, end_date):
-        # Get all employee IDs
-        all_employees = Employee.objects.all()
-        employee_ids = {emp.employee_source_id: emp.employee_full_name.strip() for emp in all_employees}
-
-        # Calculate week numbers within the given date range
-        current_date = start_date
-        week_numbers = []
-
-        while current_date <= end_date:
-            week_number = current_date.isocalendar()[1]
-            year = current_date.isocalendar()[0]
-            
-            # Store unique week numbers with their corresponding year
-            if (year, week_number) not in week_numbers:
-                week_numbers.append((year, week_number))
-            
-            # Move to the next week
-            current_date += timedelta(days=7)
-
-        # Constructing the query using Q objects for EmployeeEntryTimesheet
-        timesheet_query = models.Q()
-        for week in week_numbers:
-            timesheet_query |= models.Q(year=week[0], week_number=week[1])
+    page_size = 100
+    max_page_size = 1000
 
-        # Query EmployeeEntryTimesheet for the specified weeks
-        submitted_timesheets = EmployeeEntryTimesheet.objects.filter(timesheet_query).values_list('employee_id__employee_source_id', flat=True)
-
-        # Constructing the query using Q objects for EmployeeUnplannedNonbillableHours
-        unplanned_query = models.Q()
-        for week in week_numbers:
-            unplanned_query |= models.Q(year=week[0], week_number=week[1])
-
-        # Query EmployeeUnplannedNonbillableHours for the specified weeks
-        unplanned_hours_records = EmployeeUnplannedNonbillableHours.objects.filter(unplanned_query).values_list('employee_id__employee_unplanned_non_billable_entry_id', flat=True)
-
-        # Combine results from both queries
-        combined_submitted_ids = set(submitted_timesheets).union(set(unplanned_hours_records))
-
-        # Find employees who did not submit timesheets
-        missing_employees = [
-            {'employee_id': emp_id, 'employee_name': employee_ids[emp_id]}
-            for emp_id in employee_ids.keys() if emp_id not in combined_submitted_ids
-        ]
-
-        return missing_employees
+    def get_page(self, request):
+        """(limit, offset, page number, page size) from the `page` and `page_size` query parameters."""
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+            page_size = min(max(int(request.GET.get('page_size', self.page_size)), 1), self.max_page_size)
+        except ValueError:
+            page, page_size = 1, self.page_size
+        return page_size, (page - 1) * page_size, page, page_size
 
     def get(self, request, *args, **kwargs):
         required_roles = ["c2c_super_admin"]
@@ -71,39 +38,35 @@ class MissingTimesheetView(APIView):
         
         # Define the response type
         response_type = request.GET.get('response_type', 'JSON').lower()
+        # Only count weeks in which the employee has allocated hours
+        active_only = request.GET.get('active_only', 'false').lower() == 'true'
 
         # Calculate start and end dates for the previous week if no dates are provided
         if 'start_date' in request.GET and 'end_date' in request.GET:
-            start_date_str = request.GET.get('start_date')
-            end_date_str = request.GET.get('end_date')
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-            end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
+            try:
+                start_date = datetime.strptime(request.GET.get('start_date'), "%Y-%m-%d").date()
+                end_date = datetime.strptime(request.GET.get('end_date'), "%Y-%m-%d").date()
+            except ValueError:
+                return Response({"error": "start_date and end_date must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
         else:
-            today = timezone.now()
+            today = timezone.now().date()
             start_date = today - timedelta(days=today.weekday() + 7)  # Start of last week (Monday)
             end_date = start_date + timedelta(days=6)  # End of last week (Sunday)
 
-        # Get missing submissions
-        missing_employees = self.get_missing_submissions(start_date, end_date)
-
         if response_type == 'download':
-            return self.generate_excel_response(missing_employees)
+            missing_submissions = iter_missing_submissions(start_date, end_date, active_only)
+            return self.generate_excel_response(missing_submissions, requested_export_format(request))
 
-        return JsonResponse({'employees': missing_employees}, status=200)
+        limit, offset, page, page_size = self.get_page(request)
+        missing_submissions, count = missing_submissions_page(start_date, end_date, active_only, limit, offset)
+        return JsonResponse({'count': count, 'page': page, 'page_size': page_size, 'employees': missing_submissions}, status=200)
 
-    def generate_excel_response(self, missing_employees):
+    def generate_excel_response(self, missing_submissions, file_format="xlsx"):
         """
-        Generate an Excel file with a list of missing submissions.
+        Stream a workbook (or CSV) with one row per employee and week without a submission.
         """
-        output = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        output['Content-Disposition'] = f'attachment; filename="missing_submissions.xlsx"'
-
-        df = pd.DataFrame(missing_employees)
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name='Missing Submissions', index=False)
-
-        return output
+        sheets = [ExportSheet('Missing Submissions', MISSING_SUBMISSION_FIELDS, dict_rows(missing_submissions, MISSING_SUBMISSION_FIELDS))]
+        return export_response(sheets, "missing_submissions", file_format)
 
 class EmployeeUtilizationView(APIView):
 
@@ -157,40 +120,27 @@ class EmployeeUtilizationView(APIView):
 
         employee_hours = {}
         total_working_hours = self.calculate_total_working_hours(start_date, end_date)
-        for contract in contracts:
-            try:
-                timesheets = Timesheet.objects.filter(
-                    contract_sow_id=contract,
-                    allocation__contract_sow__start_date__lte=end_date.strftime('%Y-%m-%d'), 
-                    allocation__contract_sow__end_date__gte=start_date.strftime('%Y-%m-%d')
-                )
-
-                if not timesheets.exists():
-                    continue
-
-                total_working_hours = self.calculate_total_working_hours(start_date, end_date)
-
-                for timesheet in timesheets:
-                    resource_data = timesheet.resource_estimation_data
-                    billable_hours = sum(day['hours'] for day in resource_data.get('Estimation_Data', {}).get('daily', [])
-                                         if start_date <= timezone.make_aware(datetime.strptime(day['date'], "%d/%m/%Y")) <= end_date)
-                    
-                    employee_name = timesheet.resource.employee_full_name
-                    billability = resource_data.get('billability', 'unknown').lower()
-                    #print(employee_name, billable_hours)
-                    if employee_name not in employee_hours:
-                        employee_hours[employee_name] = {'billable': 0, 'non_billable': 0}
-
-                    if billability == 'billable':
-                        employee_hours[employee_name]['billable'] += billable_hours
-                    elif billability == 'non-billable':
-                        employee_hours[employee_name]['non_billable'] += billable_hours
-                    else:
-                        employee_hours[employee_name]['unknown'] += billable_hours
-
-            except Exception as e:
-                print(e)
-                continue
+        timesheets = Timesheet.objects.filter(
+            contract_sow_id__in=contracts,
+            allocation__contract_sow__start_date__lte=end_date.date(),
+            allocation__contract_sow__end_date__gte=start_date.date()
+        ).annotate(billability=KT('resource_estimation_data__billability'))
+        planned_hours = planned_hours_by_timesheet(
+            timesheets.values('id'), start_date.date(), end_date.date()
+        )
+        for timesheet in timesheets.values('id', 'resource__employee_full_name', 'billability'):
+            billable_hours = planned_hours.get(timesheet['id'], 0)
+            employee_name = timesheet['resource__employee_full_name']
+            billability = (timesheet['billability'] or 'unknown').lower()
+            if employee_name not in employee_hours:
+                employee_hours[employee_name] = {'billable': 0, 'non_billable': 0}
+
+            if billability == 'billable':
+                employee_hours[employee_name]['billable'] += billable_hours
+            elif billability == 'non-billable':
+                employee_hours[employee_name]['non_billable'] += billable_hours
+            else:
+                employee_hours[employee_name]['unknown'] = employee_hours[employee_name].get('unknown', 0) + billable_hours
 
         for employee_name, hours in employee_hours.items():
             if 'billable' in hours : billable_hours  = hours['billable'] 
@@ -248,7 +198,7 @@ class EmployeeUtilizationView(APIView):
         #     utilization_data[key]['employees'] = unique_employees
 
         if response_type == 'download':
-            return self.generate_excel_response(utilization_data)
+            return self.generate_excel_response(utilization_data, requested_export_format(request))
 
         response_data = [
             {
@@ -262,20 +212,16 @@ class EmployeeUtilizationView(APIView):
         return JsonResponse(output_response, safe=False, status=status.HTTP_200_OK)
 
 
-    def generate_excel_response(self, utilization_data):
+    def generate_excel_response(self, utilization_data, file_format="xlsx"):
         """
-        Generate an Excel file with separate sheets for each range.
+        Stream a workbook (or CSV) with separate sheets for each range.
         """
-        output = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        output['Content-Disposition'] = f'attachment; filename="utilization_report.xlsx"'
-
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            for key in utilization_data.keys():
-                df = pd.DataFrame({
-                    'Employee Names': utilization_data[key]['employee_names'],
-                })
-                df.to_excel(writer, sheet_name=key[:31], index=False)  # Sheet names are limited to 31 characters
-        return output  
+        columns = ['name', 'billable', 'non-billable', 'unknown', 'worked_hours']
+        sheets = [
+            ExportSheet(key, columns, dict_rows(value['employees'], columns))
+            for key, value in utilization_data.items()
+        ]
+        return export_response(sheets, "utilization_report", file_format)
     
 
 class FinancialDataView(APIView):
@@ -309,7 +255,7 @@ class FinancialDataView(APIView):
         customers_data = {}
         projects_data = []
 
-        for contract in active_contracts:
+        for contract in active_contracts.select_related('pricing', 'client').iterator():
             total_revenue += contract.total_contract_amount
             
             # Get pricing information to calculate CTC for this contract
@@ -404,31 +350,28 @@ class FinancialDataView(APIView):
         response_type = request.GET.get('response_type', 'json').lower()
 
         if response_type == 'download':
-            return self.generate_excel_response(financial_data)
+            return self.generate_excel_response(financial_data, requested_export_format(request))
 
         return JsonResponse(financial_data, status=200)
 
-    def generate_excel_response(self, financial_data):
+    def generate_excel_response(self, financial_data, file_format="xlsx"):
         """
-        Generate an Excel file with financial data.
+        Stream a workbook (or CSV) with the financial data sections present in the report.
         """
-        output = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        output['Content-Disposition'] = f'attachment; filename="financial_data.xlsx"'
-
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Write organization data
-            org_df = pd.DataFrame([financial_data["organization"]])
-            org_df.to_excel(writer, sheet_name='Organization', index=False)
-
-            # Write customers data
-            customers_df = pd.DataFrame(financial_data["customers"])
-            customers_df.to_excel(writer, sheet_name='Customers', index=False)
-
-            # Write projects data
-            projects_df = pd.DataFrame(financial_data["projects"])
-            projects_df.to_excel(writer, sheet_name='Projects', index=False)
-
-        return output
+        amount_columns = ['revenue', 'profit', 'cost_to_company']
+        sections = [
+            ('organization', 'Organization', amount_columns),
+            ('totals', 'Totals', amount_columns),
+            ('customers', 'Customers', ['customer_id', 'customer_name'] + amount_columns),
+            ('projects', 'Projects', ['project_id', 'project_name'] + amount_columns),
+        ]
+        sheets = []
+        for key, title, columns in sections:
+            if key in financial_data:
+                records = financial_data[key]
+                records = [records] if isinstance(records, dict) else records
+                sheets.append(ExportSheet(title, columns, dict_rows(records, columns)))
+        return export_response(sheets, "financial_data", file_format)
 
 
 
@@ -535,39 +478,51 @@ class ResourceCountsView(APIView):
         response_type = request.GET.get('response_type', 'json').lower()
 
         if response_type == 'download':
-            return self.generate_excel_response(resource_counts)
+            return self.generate_excel_response(resource_counts, requested_export_format(request))
 
         return JsonResponse(resource_counts, status=200)
 
-    def generate_excel_response(self, resource_counts):
+    def generate_excel_response(self, resource_counts, file_format="xlsx"):
         """
-        Generate an Excel file with resource counts.
+        Stream a workbook (or CSV) with the resource counts.
         """
-        output = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        output['Content-Disposition'] = f'attachment; filename="resource_counts.xlsx"'
-
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Write organization data
-            org_df = pd.DataFrame([resource_counts["organization"]])
-            org_df.to_excel(writer, sheet_name='Organization', index=False)
-
-            # Write projects data
-            projects_df = pd.DataFrame(resource_counts["projects"])
-            projects_df.to_excel(writer, sheet_name='Projects', index=False)
-
-        return output
+        total_columns = ['total_billable_resources', 'total_non_billable_resources']
+        project_columns = ['project_name', 'billable_resources', 'non_billable_resources']
+        sheets = []
+        for key, title in (('organization', 'Organization'), ('total_resources', 'Totals')):
+            if key in resource_counts:
+                sheets.append(ExportSheet(title, total_columns, dict_rows([resource_counts[key]], total_columns)))
+        if 'projects' in resource_counts:
+            sheets.append(ExportSheet('Projects', project_columns, dict_rows(resource_counts['projects'], project_columns)))
+        return export_response(sheets, "resource_counts", file_format)
 
 
 
 class ContractBurndownView(APIView):
     
-    def get_current_estimation_data(self, estimation_list):
-        new_estimation_indexes = []
-        for resource in estimation_list:
-            for resource_count in range(0, resource['num_of_resources']):
-                new_estimation_indexes.append(resource)
-        return new_estimation_indexes
-    
+    def get_budgeto_weekly_costs(self, allocation):
+        """
+        Estimated cost per ISO week number of the unassigned (BUDGETO123) slots of an allocation,
+        and how many such slots it has.
+        """
+        budgeto_indexes = [
+            index for index, resource in enumerate(allocation.resource_data)
+            if resource.get('resource_id') == 'BUDGETO123'
+        ]
+        weekly_costs = defaultdict(float)
+        if not budgeto_indexes:
+            return 0, weekly_costs
+        estimation = allocation.estimation
+        resources = estimation_resources(estimation)
+        series = get_estimation_series(estimation)
+        slot_indexes = resource_slot_indexes(resources)
+        for index in budgeto_indexes:
+            resource_index = slot_indexes[index]
+            bill_rate = float(resources[resource_index].get("pay_rate_info", {}).get("billrate", 0))
+            for week_number, hours in series[resource_index].iso_week_number_totals().items():
+                weekly_costs[week_number] += hours * bill_rate
+        return len(budgeto_indexes), weekly_costs
+
     def get(self, request, contract_id):
         # Step 1: Retrieve the SOW contract
         try:
@@ -588,91 +543,58 @@ class ContractBurndownView(APIView):
             print("No extension contract to process")
 
         # Step 3: Get all allocations for this contract and its extensions
-        allocations = Allocation.objects.filter(contract_sow__in=[sow_contract] + list(extension_contracts))
+        allocations = Allocation.objects.filter(contract_sow__in=[sow_contract] + list(extension_contracts)).select_related('estimation')
 
         # Prepare data structure for response
         result = []
         
         # Get start and end dates from the primary contract
-        start_date = datetime.strptime(sow_contract.start_date, "%Y-%m-%d")  # Adjust format as necessary
-        end_date = datetime.strptime(sow_contract.end_date, "%Y-%m-%d") if sow_contract.end_date else timezone.now()
+        start_date = datetime.combine(sow_contract.start_date, datetime.min.time())
+        end_date = datetime.combine(sow_contract.end_date, datetime.min.time()) if sow_contract.end_date else timezone.now()
+
+        # Step 4: Load planned hours, bill rates and submitted hours once for every resource
+        resource_ids = [
+            resource.get("resource_id")
+            for allocation in allocations
+            for resource in allocation.resource_data
+            if resource.get("resource_id")
+        ]
+        timesheets = list(Timesheet.objects.filter(resource_id__in=set(resource_ids)).annotate(
+            billrate=KT('resource_estimation_data__pay_rate_info__billrate')
+        ).values('id', 'resource_id', 'billrate'))
+        timesheets_by_resource = defaultdict(list)
+        for timesheet in timesheets:
+            timesheets_by_resource[timesheet['resource_id']].append(timesheet)
+        timesheet_ids = [timesheet['id'] for timesheet in timesheets]
+        planned_hours = planned_hours_by_week_number(timesheet_ids)
+        submitted_hours = {
+            (row['timesheet_id'], row['week_number']): row['billable_hours'] or 0
+            for row in EmployeeEntryTimesheet.objects.filter(
+                timesheet_id__in=timesheet_ids,
+                ts_approval_status="submitted",
+                employee_id=F('timesheet_id__resource_id')
+            ).values('timesheet_id', 'week_number').annotate(billable_hours=Sum('billable_hours'))
+        }
+        try:
+            budgeto_costs = [self.get_budgeto_weekly_costs(allocation) for allocation in allocations]
+        except InvalidEstimationDate as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         current_date = start_date
-        
-        # Step 4: Calculate weekly budgets and actual costs
         while current_date <= end_date:
             week_number = current_date.isocalendar()[1]
             planned_budget = 0
             actual_cost = 0
             allocation_cost = 0
 
-            # Calculate planned budget for this week
-            for allocation in allocations:
-                for resource in allocation.resource_data:
-                    resource_id = resource.get("resource_id")
-                    if not resource_id:
-                        continue
-                    
-                    # Check if resource_id is "Budgeto123"
-                    if resource_id == "BUDGETO123":
-                        estimation_id = allocation.estimation_id
-                        try:
-                            estimation_record = Estimation.objects.get(uuid=estimation_id)  # Fetching estimation record
-                            estimation_resource_data = estimation_record.resource
-                            # Call function to get current estimation data
-                            new_estimation_indexes = self.get_current_estimation_data(estimation_resource_data)
-                            
-                            # Compare with existing resources and pick matching index (implement logic as needed)
-                            for index, resource in enumerate(allocation.resource_data):
-                                # Check if resource_id matches 'BUDGETO123'
-                                if resource.get('resource_id') == 'BUDGETO123':
-                                    # Fetch the corresponding item from new_estimation_indexes
-                                    estimation_data = new_estimation_indexes[index]
-                                    # Get daily_entries from estimation_data
-                                    daily_entries = estimation_data.get("Estimation_Data", {}).get("daily", [])
-                                    # Calculate total_hours_for_week
-                                    total_hours_for_week = sum(
-                                        entry['hours'] for entry in daily_entries 
-                                        if datetime.strptime(entry['date'], '%d/%m/%Y').date().isocalendar()[1] == week_number
-                                    )
-                                    # Get the bill_rate from estimation_data or set default to 0
-                                    bill_rate = estimation_data.get("pay_rate_info", {}).get("billrate", 0)
-                                    bill_rate = float(bill_rate)  
-                                    # Calculate the planned_budget
-                                    allocation_cost += total_hours_for_week * bill_rate
-
-                        except Estimation.DoesNotExist:
-                            print(f"No estimation found for ID {estimation_id}")
-
-                    # Query Timesheet for this resource_id
-                    timesheets = Timesheet.objects.filter(resource_id=resource_id)
-                    
-                    # Calculate total hours for this week from Estimation_Data in Timesheet
-                    for timesheet in timesheets:
-                        estimation_data = timesheet.resource_estimation_data.get("Estimation_Data", {})
-                        
-                        daily_entries = estimation_data.get("daily", [])
-                        
-                        total_hours_for_week = sum(
-                            entry['hours'] for entry in daily_entries 
-                            if datetime.strptime(entry['date'], '%d/%m/%Y').date().isocalendar()[1] == week_number
-                        )
-                        
-                        # bill_rate = estimation_data.get("pay_rate_info", {}).get("billrate", 0)  # Get bill rate
-                        bill_rate = timesheet.resource_estimation_data.get("pay_rate_info", {}).get("billrate", 0)
-                        
-                        planned_budget += total_hours_for_week * bill_rate
-                        
-                        entry_timesheet_records = EmployeeEntryTimesheet.objects.filter(
-                            timesheet_id=timesheet,
-                            week_number=week_number,
-                            employee_id=resource_id  # Ensure we match with employee ID
-                        )
-                        
-                        for entry in entry_timesheet_records:
-                            if entry.ts_approval_status == "submitted":  # Only consider submitted timesheets
-                                actual_cost += entry.billable_hours * timesheet.resource_estimation_data.get("pay_rate_info", {}).get("billrate", 0)
-                        
+            for resource_id in resource_ids:
+                for timesheet in timesheets_by_resource[resource_id]:
+                    bill_rate = float(timesheet['billrate'] or 0)
+                    planned_budget += planned_hours.get((timesheet['id'], week_number), 0) * bill_rate
+                    actual_cost += submitted_hours.get((timesheet['id'], week_number), 0) * bill_rate
+            for budgeto_count, weekly_costs in budgeto_costs:
+                allocation_cost += budgeto_count * weekly_costs.get(week_number, 0)
+
             remaining_budget = planned_budget - actual_cost
             
             result.append({
@@ -791,13 +713,9 @@ class SowContractAPIView(APIView):
             result.append(contract_data)
         return result
 
-    def get_weeks_between_dates(self, start_date_str, end_date_str):
+    def get_weeks_between_dates(self, start_date, end_date):
         weeks = []
         current_date = datetime.today().date()
-        start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-        end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-        start_date = start_date.date() if isinstance(start_date, datetime) else start_date
-        end_date = end_date.date() if isinstance(end_date, datetime) else end_date
         while start_date <= end_date:
             week_number = start_date.isocalendar()[1]
             year = start_date.isocalendar()[0]
@@ -927,84 +845,67 @@ class ContractsEndingReportAPIView(APIView):
     """
     API view to retrieve contracts ending within a given number of weeks along with related timesheets.
     """
+    export_headers = ["Employee ID", "Employee Name", "Contract Name", "Start Date", "End Date", "Client Name", "Status"]
+
+    def get_closing_contracts(self, weeks, today):
+        """{contract uuid: (closing week, contract)} for contracts ending within the next `weeks` weeks."""
+        contracts = SowContract.objects.filter(
+            end_date__gt=today,
+            end_date__lte=today + timedelta(days=weeks * 7)
+        ).only('uuid', 'contractsow_name', 'start_date', 'end_date')
+        return {
+            contract.uuid: (((contract.end_date - today).days - 1) // 7 + 1, contract)
+            for contract in contracts.iterator()
+        }
+
+    def iter_closing_entries(self, closing_contracts):
+        """Yield (week, entry) for every timesheet on the given contracts, streamed from the database."""
+        timesheets = Timesheet.objects.filter(
+            contract_sow__in=list(closing_contracts)
+        ).select_related("resource", "client").order_by('id')
+        for timesheet in timesheets.iterator():
+            week, contract = closing_contracts[timesheet.contract_sow_id]
+            yield week, {
+                "employee_id": timesheet.resource.employee_source_id,
+                "employee_name": timesheet.resource.employee_full_name,
+                "contract_name": contract.contractsow_name,
+                "contract_start_date": format_legacy_date(contract.start_date),
+                "contract_end_date": format_legacy_date(contract.end_date),
+                "client_name": timesheet.client.name if timesheet.client else None,
+                "status": f"Completing contract in {week} week(s)"
+            }
+
     def post(self, request, *args, **kwargs):
         weeks = request.data.get("weeks", 2)
         export_type = request.data.get("export_type", "json")
         today = timezone.now().date()
-        contracts = SowContract.objects.exclude(end_date__isnull=True).exclude(end_date="")
-        closing_data = {f"Closed_in_week_{week}": [] for week in range(1, weeks + 1)}
-        for contract in contracts:
-            try:
-                end_date = datetime.strptime(contract.end_date, "%Y-%m-%d").date()
-            except ValueError:
-                continue
-            
-            for week in range(1, weeks + 1):
-                if today + timedelta(days=(week - 1) * 7) < end_date <= today + timedelta(days=week * 7):
-                    related_timesheets = Timesheet.objects.filter(contract_sow=contract).select_related("resource", "client")
-                    
-                    for timesheet in related_timesheets:
-                        closing_data[f"Closed_in_week_{week}"].append({
-                            "employee_id": timesheet.resource.employee_source_id,
-                            "employee_name": timesheet.resource.employee_full_name,
-                            "contract_name": contract.contractsow_name,
-                            "contract_start_date": contract.start_date,
-                            "contract_end_date": contract.end_date,
-                            "client_name": timesheet.client.name if timesheet.client else None,
-                            "status": f"Completing contract in {week} week(s)"
-                        })
-                    break  # Stop checking further weeks once assigned
+        closing_contracts = self.get_closing_contracts(weeks, today)
         if export_type == "excel":
-            return self.export_contracts_to_excel(closing_data,weeks)
-        else:
-            return Response(
-                {
-                    "placement_ending_report": closing_data,
-                    "closing_count_weeks": weeks
-                },
-                status=status.HTTP_200_OK
-            )
-    
-    def export_contracts_to_excel(self, placement_ending_report, closing_count_weeks):
+            return self.export_contracts_to_excel(closing_contracts, weeks, requested_export_format(request))
+        closing_data = {f"Closed_in_week_{week}": [] for week in range(1, weeks + 1)}
+        for week, entry in self.iter_closing_entries(closing_contracts):
+            closing_data[f"Closed_in_week_{week}"].append(entry)
+        return Response(
+            {
+                "placement_ending_report": closing_data,
+                "closing_count_weeks": weeks
+            },
+            status=status.HTTP_200_OK
+        )
+
+    def export_contracts_to_excel(self, closing_contracts, closing_count_weeks, file_format="xlsx"):
         """
-        Exports the placement ending report data to an Excel file.
+        Streams the placement ending report as a workbook (or CSV) with a sheet per closing week.
         """
-        wb = openpyxl.Workbook()
-        wb.remove(wb.active)  # Remove the default sheet
+        keys = ["employee_id", "employee_name", "contract_name", "contract_start_date", "contract_end_date", "client_name", "status"]
 
-        # Define column headers
-        headers = ["Employee ID", "Employee Name", "Contract Name", "Start Date", "End Date", "Client Name", "Status"]
+        def week_rows(week_num):
+            week_contracts = {uuid: value for uuid, value in closing_contracts.items() if value[0] == week_num}
+            if week_contracts:
+                yield from dict_rows((entry for _, entry in self.iter_closing_entries(week_contracts)), keys)
 
-        # Create a sheet for each closing week
-        for week_num in range(1, closing_count_weeks + 1):
-            week_key = f"Closed_in_week_{week_num}"
-            if week_key not in placement_ending_report:
-                continue
-            
-            ws = wb.create_sheet(title=f"Week {week_num}")
-            
-            # Write headers
-            ws.append(headers)
-
-            # Write contract data
-            for contract in placement_ending_report[week_key]:
-                ws.append([
-                    contract["employee_id"],
-                    contract["employee_name"],
-                    contract["contract_name"],
-                    contract["contract_start_date"],
-                    contract["contract_end_date"],
-                    contract["client_name"],
-                    contract["status"],
-                ])
-
-            # Auto-adjust column widths
-            for col_idx, _ in enumerate(headers, start=1):
-                ws.column_dimensions[get_column_letter(col_idx)].auto_size = True
-
-        # Prepare response
-        response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        response["Content-Disposition"] = 'attachment; filename="contracts_report.xlsx"'
-
-        wb.save(response)
-        return response
\ No newline at end of file
+        sheets = [
+            ExportSheet(f"Week {week_num}", self.export_headers, week_rows(week_num))
+            for week_num in range(1, closing_count_weeks + 1)
+        ]
+        return export_response(sheets, "contracts_report", file_format)
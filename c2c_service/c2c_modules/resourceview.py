@@ -16,6 +16,8 @@ import re
 from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
 from c2c_modules.custom_logger import info, error, warning
+from c2c_modules.timesheetsubmission import (resolve_clients, resolve_contracts, pick_contract, entry_hours,
+                                             upsert_week_entries, HOUR_FIELDS)
 from config import PROFILE
 
 
@@ -23,7 +25,6 @@ from config import PROFILE
 RESOURCE_NOT_FOUND = "Resource not found"
 EMPLOYEE_ERROR_MESSAGE  = "Either employee_id or employee_email must be provided."
 EMPLOYEE_NOT_FOUND = "Employee does not exist."
-DATE_FORMAT = "%Y-%m-%d"
 class Pagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
@@ -86,7 +87,9 @@ class ResourceTimesheetsView(APIView):
                 timesheet_ids = timesheets.values_list('id', flat=True)
                 entry_timesheets = EmployeeEntryTimesheet.objects.filter(timesheet_id__in=timesheet_ids)
                 total_planned_hours = entry_timesheets.aggregate(Sum('billable_hours'))['billable_hours__sum'] or 0
-                ongoing_projects, completed_projects, future_projects, incomplete_projects = classify_projects(timesheets, current_date)
+                ongoing_projects, completed_projects, future_projects, incomplete_projects = classify_projects(
+                    TimesheetSerializer.setup_eager_loading(timesheets, employee=resource), current_date
+                )
 
                 data = {
                     'employee_full_name': resource.employee_full_name,
@@ -121,9 +124,7 @@ class TimesheetOverviewView(APIView):
         return {"id": None, "source": "NotFound"}
 
     def get_distinct_resources_by_approver(self,approver_id):
-        filtered_timesheets = Timesheet.objects.filter(
-            Q(approver__contains=[{"approver_id": approver_id}])
-        )
+        filtered_timesheets = Timesheet.objects.filter(approver_assignments__approver_id=approver_id)
         distinct_resource_ids = (
             filtered_timesheets
             .select_related('resource')
@@ -222,7 +223,7 @@ class ResourceTimesheetsByNameView(APIView):
         if not timesheets.exists():
             return self.build_empty_timesheet_response(resource)
         total_planned_hours = timesheets.aggregate(Sum('billable_hours'))['billable_hours__sum'] or 0
-        ongoing_projects, completed_projects, future_projects, incomplete_projects = classify_projects(timesheets, current_date)
+        ongoing_projects, completed_projects, future_projects, incomplete_projects = classify_projects(TimesheetSerializer.setup_eager_loading(timesheets), current_date)
         return self.build_timesheet_response(resource, total_planned_hours, timesheets, ongoing_projects, future_projects, completed_projects, incomplete_projects)
 
     def build_empty_timesheet_response(self, resource):
@@ -252,101 +253,6 @@ class ResourceTimesheetsByNameView(APIView):
         }
 
 
-class TimesheetSubmissionAPIView(APIView):
-    
-    def check_permissions(self, request):
-        required_roles = ["c2c_timesheet_manager", "c2c_super_admin", "c2c_timesheet_employee","c2c_guest_employee"]
-        return has_permission(request, required_roles)
-
-    def get_employee(self, employee_id=None, employee_email=None):
-        try:
-            if employee_id:
-                return Employee.objects.get(employee_source_id=employee_id)
-            else:
-                return Employee.objects.get(employee_email=employee_email)
-        except Employee.DoesNotExist:
-            raise ValueError("Employee not found.")
-
-    def validate_timesheet_data(self, timesheet_data):
-        total_hours = 0
-        for entry in timesheet_data:
-            billable_hours = entry.get('billable_hours', 0)
-            non_billable_hours = entry.get('non_billable_hours', 0)
-            unplanned_hours = entry.get('unplanned_hours', 0)
-            total_hours += billable_hours + non_billable_hours + unplanned_hours
-        
-        if total_hours > 40:
-            raise ValueError("Total hours cannot exceed 40 in a week.")
-        return total_hours
-
-    def process_timesheet_entries(self, timesheet_data, employee, year, week_number):
-        for entry in timesheet_data:
-            client_name = entry.get('client_name')
-            contract_name = entry.get('contract_name')
-            billable_hours = entry.get('billable_hours', 0)
-            non_billable_hours = entry.get('non_billable_hours', 0)
-            unplanned_hours = entry.get('unplanned_hours', 0)
-
-            client = self.get_client(client_name)
-            contract_sow = self.get_contract(contract_name)
-
-            EmployeeEntryTimesheet.objects.update_or_create(
-                employee_id=employee,
-                year=year,
-                week_number=week_number,
-                client=client,
-                contract_sow=contract_sow,
-                defaults={
-                    'billable_hours': billable_hours,
-                    'non_billable_hours': non_billable_hours,
-                    'unplanned_hours': unplanned_hours,
-                    'total_hours': billable_hours + non_billable_hours + unplanned_hours
-                }
-            )
-
-    def get_client(self, client_name):
-        try:
-            return Client.objects.get(name=client_name)
-        except Client.DoesNotExist:
-            raise ValueError(f"Client {client_name} does not exist.")
-
-    def get_contract(self, contract_name):
-        try:
-            return SowContract.objects.get(contractsow_name=contract_name)
-        except SowContract.DoesNotExist:
-            raise ValueError(f"Contract {contract_name} does not exist.")
-
-    def post(self, request, *args, **kwargs):
-        permission_result = self.check_permissions(request)
-        if permission_result["status"] != 200:
-            return Response(permission_result, status=status.HTTP_403_FORBIDDEN)
-
-        employee_id = request.data.get('employee_id')
-        employee_email = request.data.get('employee_email')
-        year = request.data.get('year')
-        week_number = request.data.get('week_number')
-        timesheet_data = request.data.get('timesheet')
-
-        if not employee_id and not employee_email:
-            return Response({"error": EMPLOYEE_ERROR_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            employee = self.get_employee(employee_id, employee_email)
-            if not timesheet_data:
-                return Response({"error": "No timesheet data provided."}, status=status.HTTP_400_BAD_REQUEST)
-
-            total_hours = self.validate_timesheet_data(timesheet_data)
-            self.process_timesheet_entries(timesheet_data, employee, year, week_number)
-
-            return Response({"message": f"Timesheet submitted successfully.{total_hours}"}, status=status.HTTP_201_CREATED)
-
-        except ValueError as ve:
-            return Response({"error": str(ve)}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            return Response({"error": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
-
 class TimesheetSubmissionAPIView(APIView):
     
     def check_permissions(self, request):
@@ -376,33 +282,27 @@ class TimesheetSubmissionAPIView(APIView):
         return total_hours
 
     def process_timesheet_entries(self, employee, year, week_number, timesheet_data):
+        """Resolve every client and contract name in one query each, then upsert the week in one statement."""
+        clients = resolve_clients(entry.get('client_name') for entry in timesheet_data)
+        contracts = resolve_contracts(entry.get('contract_name') for entry in timesheet_data)
+        entries = []
         for entry in timesheet_data:
             client_name = entry.get('client_name')
             contract_name = entry.get('contract_name')
-            billable_hours = entry.get('billable_hours', 0)
-            non_billable_hours = entry.get('non_billable_hours', 0)
-            unplanned_hours = entry.get('unplanned_hours', 0)
-
-            try:
-                client = Client.objects.get(name=client_name)
-                contract_sow = SowContract.objects.get(contractsow_name=contract_name)
-                EmployeeEntryTimesheet.objects.update_or_create(
-                    employee_id=employee,
-                    year=year,
-                    week_number=week_number,
-                    client=client,
-                    contract_sow=contract_sow,
-                    defaults={
-                        'billable_hours': billable_hours,
-                        'non_billable_hours': non_billable_hours,
-                        'unplanned_hours': unplanned_hours,
-                        'total_hours': billable_hours + non_billable_hours + unplanned_hours
-                    }
-                )
-            except Client.DoesNotExist:
+            client = clients.get(client_name)
+            if client is None:
                 raise ValueError(f"Client {client_name} does not exist.")
-            except SowContract.DoesNotExist:
+            contract_sow = pick_contract(contracts, contract_name, client)
+            if contract_sow is None:
                 raise ValueError(f"Contract {contract_name} does not exist.")
+            hours = {field: entry_hours(entry.get(field, 0)) for field in ('billable_hours', 'non_billable_hours', 'unplanned_hours')}
+            entries.append(EmployeeEntryTimesheet(
+                client=client,
+                contract_sow=contract_sow,
+                total_hours=sum(hours.values()),
+                **hours
+            ))
+        upsert_week_entries(employee, year, week_number, entries, HOUR_FIELDS)
 
     def post(self, request, *args, **kwargs):
         permission_result = self.check_permissions(request)
@@ -489,12 +389,6 @@ class EmployeeProjectsView(APIView):
             contract_start_date = contract.start_date
             contract_end_date = contract.end_date
 
-            # Handle string date conversion
-            if isinstance(contract_start_date, str):
-                contract_start_date = datetime.strptime(contract_start_date, DATE_FORMAT).date()
-            if isinstance(contract_end_date, str):
-                contract_end_date = datetime.strptime(contract_end_date,DATE_FORMAT).date()
-
             if contract_end_date and contract_end_date < current_date:
                 completed_projects.append(timesheet)
             elif contract_start_date <= current_date <= contract_end_date:
@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from config import ROLE_CACHE_BACKEND, ROLE_CACHE_MAX_ENTRIES
+from c2c_modules.custom_logger import info
+
+DEFAULT_MAX_ENTRIES = 10000
+DJANGO_CACHE_PREFIX = "c2c_user_roles:"
+DJANGO_CACHE_VERSION_KEY = DJANGO_CACHE_PREFIX + "version"
+
+
+def token_cache_key(access_token):
+    """Hash the raw token so it is never kept in memory or a shared cache as-is."""
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+
+class LocalRoleCache:
+    """
+    Bounded in-process LRU cache of role lookups keyed by token hash.
+    Entries expire at the JWT `exp` timestamp they were stored with.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['exp'] <= int(time.time()):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoRoleCache:
+    """
+    Role cache backed by the configured Django cache, shared between workers
+    when that cache is (e.g. redis or database). The cache timeout follows `exp`.
+    Role entries carry a shared version number, so `clear` drops only them.
+    """
+    def _version(self):
+        from django.core.cache import cache
+        # Seeded from the clock, so a version key lost to eviction cannot revive cleared entries.
+        return cache.get_or_set(DJANGO_CACHE_VERSION_KEY, int(time.time()), timeout=None)
+
+    def get(self, key):
+        from django.core.cache import cache
+        entry = cache.get(DJANGO_CACHE_PREFIX + key, version=self._version())
+        if entry is None or entry['exp'] <= int(time.time()):
+            return None
+        return entry
+
+    def set(self, key, entry):
+        from django.core.cache import cache
+        timeout = entry['exp'] - int(time.time())
+        if timeout > 0:
+            cache.set(DJANGO_CACHE_PREFIX + key, entry, timeout=timeout, version=self._version())
+
+    def clear(self):
+        from django.core.cache import cache
+        try:
+            cache.incr(DJANGO_CACHE_VERSION_KEY)
+        except ValueError:
+            cache.set(DJANGO_CACHE_VERSION_KEY, int(time.time()), timeout=None)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one call; the other
+    callers wait for and share its result (or its exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'event': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+        if not leader:
+            call['event'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['event'].set()
+
+
+def build_role_cache(backend=None):
+    backend = (backend or ROLE_CACHE_BACKEND or "local").lower()
+    if backend == "django":
+        info("Using Django cache backend for user roles")
+        return DjangoRoleCache()
+    max_entries = int(ROLE_CACHE_MAX_ENTRIES or DEFAULT_MAX_ENTRIES)
+    return LocalRoleCache(max_entries=max_entries)
+
+
+role_cache = build_role_cache()
+role_lookups = SingleFlight()
@@ -4,18 +4,103 @@ from c2c_modules.models import Client, Contract, FileModel, Estimation, Pricing,
 import re
 from c2c_modules.custom_logger import info
 from collections import defaultdict
-from django.db.models import Q
+from django.db.models import Q, Exists, OuterRef, Count, Prefetch
+from django.db.models.manager import BaseManager
 from datetime import datetime, timedelta, date
 from django.db.models import Sum
 from django.core.exceptions import ObjectDoesNotExist
 import uuid
 import calendar
+from c2c_modules.datefields import LegacyDateField, parse_legacy_date, format_legacy_date
+from c2c_modules.workcalendar import work_week_bounds, format_date_range
 
 
 EST_NAME = 'estimation.name'
 CLIENT_NAME = 'client.name'
 SOW_NAME = 'contract_sow.contractsow_name'
 
+def active_files_by_document(document_ids):
+    """Active files of many documents in one query, as {document_id: [{uuid, blob_name, file_name}]}."""
+    files = defaultdict(list)
+    rows = FileModel.objects.filter(
+        document_id__in=[str(document_id) for document_id in document_ids],
+        status='active'
+    ).values('document_id', 'uuid', 'blob_name', 'file_name')
+    for row in rows:
+        # Blobs are stored as '<sha256>/<file name>'; older rows may not have file_name filled in.
+        row['file_name'] = row['file_name'] or (row['blob_name'] or "").split("/")[-1]
+        files[row.pop('document_id')].append(row)
+    return files
+
+def get_active_files(obj, document_id):
+    files = getattr(obj, 'active_files', None)
+    if files is None:
+        files = active_files_by_document([document_id]).get(str(document_id), [])
+    return files
+
+def parse_extension_uuid(extension_sow_contract):
+    try:
+        return uuid.UUID(extension_sow_contract, version=4) if extension_sow_contract else None
+    except ValueError:
+        return None
+
+def attach_parent_contract_names(sow_contracts):
+    """Set `parent_contract_name` on every SOW of a page from a single lookup of their parents."""
+    parent_ids = {parse_extension_uuid(sow.extension_sow_contract) for sow in sow_contracts} - {None}
+    names = dict(SowContract.objects.filter(uuid__in=parent_ids).values_list('uuid', 'contractsow_name')) if parent_ids else {}
+    for sow in sow_contracts:
+        sow.parent_contract_name = names.get(parse_extension_uuid(sow.extension_sow_contract))
+
+def get_parent_contract_name(obj):
+    if hasattr(obj, 'parent_contract_name'):
+        return obj.parent_contract_name
+    parent_id = parse_extension_uuid(obj.extension_sow_contract)
+    if parent_id is None:
+        return None
+    parent_contract = SowContract.objects.filter(uuid=parent_id).first()
+    return parent_contract.contractsow_name if parent_contract else None
+
+
+class DocumentListSerializer(serializers.ListSerializer):
+    """
+    Loads the active files of a whole page (and the parent names of SOW contracts) with one query
+    each before serializing the rows, instead of one query per row.
+    """
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, BaseManager) else data)
+        document_key = getattr(self.child, 'document_key', 'uuid')
+        files = active_files_by_document([getattr(item, document_key) for item in items])
+        for item in items:
+            item.active_files = files.get(str(getattr(item, document_key)), [])
+        if issubclass(self.child.Meta.model, SowContract):
+            attach_parent_contract_names(items)
+        return super().to_representation(items)
+
+class LegacyDateSerializerField(serializers.DateField):
+    """
+    Accepts the date strings the UI has always sent (ISO datetimes, dd/mm/YYYY) and renders the
+    UI's own ISO datetime format, which is what these columns held before they became dates.
+    """
+    def to_representation(self, value):
+        if isinstance(value, str):
+            return value
+        return format_legacy_date(value)
+
+    def to_internal_value(self, value):
+        if isinstance(value, str):
+            if not value.strip() and self.allow_null:
+                return None
+            parsed = parse_legacy_date(value)
+            if parsed is not None:
+                return parsed
+        return super().to_internal_value(value)
+
+class DateCompatModelSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        LegacyDateField: LegacyDateSerializerField,
+    }
+
 class ClientSerializer(serializers.ModelSerializer):
     client_contracts = serializers.SerializerMethodField()
     class Meta:
@@ -24,14 +109,15 @@ class ClientSerializer(serializers.ModelSerializer):
 
     def get_client_contracts(self, obj):
         contracts = obj.client_contracts.all()
+        files_by_contract = active_files_by_document([contract.uuid for contract in contracts])
         serialized_contracts = []
         for contract in contracts:
-            files = FileModel.objects.filter(document_id=contract.uuid,status='active').values('uuid', 'blob_name')
+            files = files_by_contract.get(str(contract.uuid), [])
             serialized_contract = {
                 'uuid': contract.uuid,
                 'name': contract.name,
-                'start_date': contract.start_date,
-                'end_date': contract.end_date,
+                'start_date': format_legacy_date(contract.start_date),
+                'end_date': format_legacy_date(contract.end_date),
                 'end_type': contract.end_type,
                 'status': contract.status,
                 'contract_creation_date' : contract.contract_creation_date,
@@ -42,12 +128,17 @@ class ClientSerializer(serializers.ModelSerializer):
             serialized_contracts.append(serialized_contract)
         return serialized_contracts
 
-class ContractSerializer(serializers.ModelSerializer):
+class ContractSerializer(DateCompatModelSerializer):
     client = serializers.SerializerMethodField()
     files = serializers.SerializerMethodField()
     class Meta:
         model = Contract
         fields = ['uuid', 'name', 'start_date', 'end_date', 'end_type', 'client', 'files', 'status', 'payment_terms', 'contract_name', 'contract_end_type', 'contract_version', 'contract_created_by', 'contract_creation_date','username_created','username_updated']
+        list_serializer_class = DocumentListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('client')
 
     payment_terms = serializers.CharField(read_only=True)
     contract_name = serializers.CharField(read_only=True)
@@ -62,20 +153,18 @@ class ContractSerializer(serializers.ModelSerializer):
         return serialized_client
 
     def get_files(self, obj):
-        files = FileModel.objects.filter(document_id=obj.uuid,status='active').values('uuid', 'blob_name')
-        return list(files)
+        return list(get_active_files(obj, obj.uuid))
 
-class ContractCreateSerializer(serializers.ModelSerializer):
+class ContractCreateSerializer(DateCompatModelSerializer):
     files = serializers.SerializerMethodField()
     class Meta:
         model = Contract
         fields = ['uuid', 'name', 'start_date', 'end_date', 'end_type', 'client', 'status', 'payment_terms', 'contract_name', 'contract_end_type', 'contract_version', 'contract_created_by', 'contract_creation_date','username_created','username_updated','files']
 
     def get_files(self, obj):
-        files = FileModel.objects.filter(document_id=obj.uuid,status='active').values('uuid', 'blob_name')
-        return list(files)
+        return list(get_active_files(obj, obj.uuid))
 
-class ContractUpdateSerializer(serializers.ModelSerializer):
+class ContractUpdateSerializer(DateCompatModelSerializer):
     files = serializers.SerializerMethodField()
 
     class Meta:
@@ -83,11 +172,10 @@ class ContractUpdateSerializer(serializers.ModelSerializer):
         fields = ['uuid','name', 'start_date', 'end_date', 'end_type', 'client', 'status', 'files', 'payment_terms', 'contract_name', 'contract_end_type', 'contract_version', 'contract_created_by', 'contract_creation_date','username_updated']
 
     def get_files(self, obj):
-        files = FileModel.objects.filter(document_id=obj.uuid,status='active').values('uuid', 'blob_name')
-        return list(files)
+        return list(get_active_files(obj, obj.uuid))
 
 
-class ContractSowSerializer(serializers.ModelSerializer):
+class ContractSowSerializer(DateCompatModelSerializer):
     client_uuid = serializers.ReadOnlyField(source='client.uuid')
     pricing_uuid = serializers.ReadOnlyField(source='pricing.uuid')
     pricing_name = serializers.CharField(source='pricing.name')
@@ -101,28 +189,27 @@ class ContractSowSerializer(serializers.ModelSerializer):
     class Meta:
         model = SowContract
         fields = ['uuid', 'contractsow_name','doc_contract_amount', 'total_contract_amount', 'start_date', 'end_date', 'document', 'payment_term_client', 'payment_term_contract', 'contractsow_type', 'client_uuid', 'pricing_uuid', 'pricing_name', 'estimation_name', 'estimation_uuid','doc_start_date','doc_end_date','is_contract_utilized_po','username_created','username_updated','extension_sow_contract','parent_contract_name']
+        list_serializer_class = DocumentListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('client', 'pricing', 'estimation').annotate(
+            is_utilized_po=Exists(UtilizedAmount.objects.filter(sow_contract=OuterRef('pk')))
+        )
 
     def get_is_contract_utilized_po(self, obj):
-        return UtilizedAmount.objects.filter(sow_contract=obj).exists()
+        is_utilized = getattr(obj, 'is_utilized_po', None)
+        if is_utilized is None:
+            is_utilized = UtilizedAmount.objects.filter(sow_contract=obj).exists()
+        return is_utilized
 
     def get_document(self, obj):
-        files = FileModel.objects.filter(document_id=obj.uuid,status='active').values('uuid', 'blob_name')
-        return list(files)
+        return list(get_active_files(obj, obj.uuid))
     
     def get_parent_contract_name(self, obj):
-        if obj.extension_sow_contract:
-            try:
-                # Validate if extension_sow_contract is a valid UUID
-                uuid_obj = uuid.UUID(obj.extension_sow_contract, version=4)
-                # If valid, fetch the parent contract
-                parent_contract = SowContract.objects.filter(uuid=uuid_obj).first()
-                return parent_contract.contractsow_name if parent_contract else None
-            except ValueError:
-                # Return None if extension_sow_contract is not a valid UUID
-                return None
-        return None
+        return get_parent_contract_name(obj)
 
-class ContractSowCreateSerializer(serializers.ModelSerializer):
+class ContractSowCreateSerializer(DateCompatModelSerializer):
     total_contract_amount = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False, default=Decimal('0.00'))  # Set the appropriate default value
     doc_contract_amount = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False, default=Decimal('0.00'))
     is_contract_utilized_po = serializers.SerializerMethodField()
@@ -133,26 +220,18 @@ class ContractSowCreateSerializer(serializers.ModelSerializer):
         fields = ['uuid', 'contractsow_name', 'total_contract_amount','doc_contract_amount', 'start_date', 'end_date',  'document', 'payment_term_client', 'payment_term_contract', 'contractsow_type', 'client', 'pricing', 'estimation','doc_start_date','doc_end_date','is_contract_utilized_po','username_created','username_updated','extension_sow_contract','parent_contract_name']
 
     def get_is_contract_utilized_po(self, obj):
-        return UtilizedAmount.objects.filter(sow_contract=obj).exists()
+        is_utilized = getattr(obj, 'is_utilized_po', None)
+        if is_utilized is None:
+            is_utilized = UtilizedAmount.objects.filter(sow_contract=obj).exists()
+        return is_utilized
 
     def get_document(self, obj):
-        files = FileModel.objects.filter(document_id=obj.uuid,status='active').values('uuid', 'blob_name')
-        return list(files)
+        return list(get_active_files(obj, obj.uuid))
     
     def get_parent_contract_name(self, obj):
-        if obj.extension_sow_contract:
-            try:
-                # Validate if extension_sow_contract is a valid UUID
-                uuid_obj = uuid.UUID(obj.extension_sow_contract, version=4)
-                # If valid, fetch the parent contract
-                parent_contract = SowContract.objects.filter(uuid=uuid_obj).first()
-                return parent_contract.contractsow_name if parent_contract else None
-            except ValueError:
-                # Return None if extension_sow_contract is not a valid UUID
-                return None
-        return None
+        return get_parent_contract_name(obj)
 
-class ContractSowUpdateSerializer(serializers.ModelSerializer):
+class ContractSowUpdateSerializer(DateCompatModelSerializer):
     pricing_name = serializers.ReadOnlyField(source='pricing.name')
     estimation_name = serializers.ReadOnlyField(source=EST_NAME)
     total_contract_amount = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False, default=Decimal('0.00'))  # Set the appropriate default value
@@ -165,36 +244,34 @@ class ContractSowUpdateSerializer(serializers.ModelSerializer):
         fields = ['uuid', 'contractsow_name', 'total_contract_amount','doc_contract_amount', 'start_date', 'end_date', 'document', 'payment_term_client', 'payment_term_contract', 'contractsow_type', 'pricing_name', 'estimation_name','doc_start_date','doc_end_date','username_updated','extension_sow_contract','parent_contract_name']
 
     def get_document(self, obj):
-        files = FileModel.objects.filter(document_id=obj.uuid,status='active').values('uuid', 'blob_name')
-        return list(files)
+        return list(get_active_files(obj, obj.uuid))
     
     def get_parent_contract_name(self, obj):
-        if obj.extension_sow_contract:
-            try:
-                # Validate if extension_sow_contract is a valid UUID
-                uuid_obj = uuid.UUID(obj.extension_sow_contract, version=4)
-                # If valid, fetch the parent contract
-                parent_contract = SowContract.objects.filter(uuid=uuid_obj).first()
-                return parent_contract.contractsow_name if parent_contract else None
-            except ValueError:
-                # Return None if extension_sow_contract is not a valid UUID
-                return None
-        return None
+        return get_parent_contract_name(obj)
 #   ================================================================
 
 
-class EstimationSerializer(serializers.ModelSerializer):
+class EstimationSerializer(DateCompatModelSerializer):
     is_utilized = serializers.SerializerMethodField()
     client_name = serializers.CharField(source='client.name', read_only=True)
     class Meta:
         model = Estimation
         fields = "__all__"
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('client').annotate(
+            is_linked_to_sow=Exists(SowContract.objects.filter(estimation=OuterRef('pk')))
+        )
+
     def get_is_utilized(self, obj):
-        return SowContract.objects.filter(estimation=obj).exists()
+        is_utilized = getattr(obj, 'is_linked_to_sow', None)
+        if is_utilized is None:
+            is_utilized = SowContract.objects.filter(estimation=obj).exists()
+        return is_utilized
 
 
-class EstimationUpdateSerializer(serializers.ModelSerializer):
+class EstimationUpdateSerializer(DateCompatModelSerializer):
     client_name = serializers.CharField(source=CLIENT_NAME, read_only=True)
     class Meta:
         model = Estimation
@@ -235,19 +312,28 @@ class PricingSerializer(serializers.ModelSerializer):
         model = Pricing
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('estimation').annotate(
+            is_linked_to_sow=Exists(SowContract.objects.filter(pricing=OuterRef('pk'), estimation=OuterRef('estimation')))
+        )
+
     def get_is_price_utilized(self, obj):
         # Check if a Sow_Contract exists that links the given Pricing and Estimation
-        return SowContract.objects.filter(pricing=obj, estimation=obj.estimation).exists()
+        is_utilized = getattr(obj, 'is_linked_to_sow', None)
+        if is_utilized is None:
+            is_utilized = SowContract.objects.filter(pricing=obj, estimation=obj.estimation).exists()
+        return is_utilized
 
 #   ================================================================
 
-class PurchaseOrderSerializer(serializers.ModelSerializer):
+class PurchaseOrderSerializer(DateCompatModelSerializer):
     class Meta:
         model = PurchaseOrder
         fields = '__all__'
 
 
-class PurchaseOrderCreateSerializer(serializers.ModelSerializer):
+class PurchaseOrderCreateSerializer(DateCompatModelSerializer):
     class Meta:
         model = PurchaseOrder
         fields = '__all__'
@@ -258,8 +344,8 @@ class PurchaseOrderCreateSerializer(serializers.ModelSerializer):
 class AllocationSerializer(serializers.ModelSerializer):
     contractsow_name = serializers.CharField(source=SOW_NAME, read_only=True)
     estimation_name = serializers.CharField(source=EST_NAME, read_only=True)
-    start_date = serializers.CharField(source='contract_sow.start_date', read_only=True)
-    end_date = serializers.CharField(source='contract_sow.end_date', read_only=True)
+    start_date = LegacyDateSerializerField(source='contract_sow.start_date', read_only=True)
+    end_date = LegacyDateSerializerField(source='contract_sow.end_date', read_only=True)
 
     class Meta:
         model = Allocation
@@ -293,7 +379,7 @@ class UtilizedAmountSerializer(serializers.ModelSerializer):
         model = UtilizedAmount
         fields = ['id', 'purchase_order','purchase_order_name', 'sow_contract','contractsow_name', 'utilized_amount','username_created','username_updated']
 
-class PurchaseOrderWithUtilizationSerializer(serializers.ModelSerializer):
+class PurchaseOrderWithUtilizationSerializer(DateCompatModelSerializer):
     utilized_amounts = UtilizedAmountSerializer(many=True)
     remaining_amount = serializers.SerializerMethodField()
     purchase_order_documents = serializers.SerializerMethodField()
@@ -301,16 +387,24 @@ class PurchaseOrderWithUtilizationSerializer(serializers.ModelSerializer):
     class Meta:
         model = PurchaseOrder
         fields = ['id', 'purchase_order_name', 'client', 'account_number', 'po_amount', 'start_date', 'end_date', 'purchase_order_documents', 'po_creation_date', 'utilized_amounts', 'remaining_amount']
+        list_serializer_class = DocumentListSerializer
+
+    document_key = 'id'
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related(
+            Prefetch('utilized_amounts', queryset=UtilizedAmount.objects.select_related('sow_contract', 'purchase_order'))
+        )
 
     def get_remaining_amount(self, obj):
         utilized_total = sum([ua.utilized_amount for ua in obj.utilized_amounts.all()])
         return obj.po_amount - utilized_total
 
     def get_purchase_order_documents(self, obj):
-        files = FileModel.objects.filter(document_id=obj.id,status='active').values('uuid', 'blob_name')
-        return list(files)
+        return list(get_active_files(obj, obj.id))
 
-class POSowContractSerializer(serializers.ModelSerializer):
+class POSowContractSerializer(DateCompatModelSerializer):
     class Meta:
         model = SowContract
         fields = '__all__'
@@ -318,7 +412,7 @@ class POSowContractSerializer(serializers.ModelSerializer):
 
 
 
-class SowContractSerializer(serializers.ModelSerializer):
+class SowContractSerializer(DateCompatModelSerializer):
     estimation_name = serializers.CharField(source=EST_NAME)
     estimation_uuid = serializers.UUIDField(source='estimation.uuid')
 
@@ -366,7 +460,7 @@ class EstResourceSerializer(serializers.Serializer):
     def get_num_of_resources(self, obj):
         return obj.get('num_of_resources')
 
-class EstimationResourceSerializer(serializers.ModelSerializer):
+class EstimationResourceSerializer(DateCompatModelSerializer):
     resource = EstResourceSerializer(many=True)
 
     class Meta:
@@ -388,6 +482,8 @@ class TimesheetOverviewSerializer(serializers.Serializer):
 
 def extract_date(date_str):
     """ Extracts only the date part from a datetime string """
+    if isinstance(date_str, date):
+        return date_str.isoformat()
     date_pattern = re.compile(r"\d{4}-\d{2}-\d{2}")
     if date_str:
         match = date_pattern.search(date_str)
@@ -417,13 +513,28 @@ class TimesheetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Timesheet
         fields = ['client_name', 'contractsow_name', 'project_role','resource_name', 'start_date', 'end_date','allocated_hours', 'planned_hours', 'recall_count']
-    
+
+    @staticmethod
+    def setup_eager_loading(queryset, employee=None):
+        """Annotate the per-row counts so a page of timesheets costs one query."""
+        queryset = queryset.select_related('client', 'contract_sow').annotate(
+            recall_entry_count=Count('employee_entry_timesheet', filter=Q(employee_entry_timesheet__ts_approval_status="recall"))
+        )
+        if employee:
+            queryset = queryset.annotate(
+                employee_billable_hours=Sum('employee_entry_timesheet__billable_hours', filter=Q(employee_entry_timesheet__employee_id=employee))
+            )
+        return queryset
+
     def get_planned_hours(self, obj):
         employee = self.context.get('employee')
         if employee:
-            total_billable_hours = EmployeeEntryTimesheet.objects.filter(
-                employee_id=employee, timesheet_id=obj
-            ).aggregate(total_billable=Sum('billable_hours'))['total_billable'] or 0
+            if hasattr(obj, 'employee_billable_hours'):
+                total_billable_hours = obj.employee_billable_hours or 0
+            else:
+                total_billable_hours = EmployeeEntryTimesheet.objects.filter(
+                    employee_id=employee, timesheet_id=obj
+                ).aggregate(total_billable=Sum('billable_hours'))['total_billable'] or 0
             total_billable_hours = format_hours(total_billable_hours)
             return total_billable_hours
         return 0
@@ -436,6 +547,8 @@ class TimesheetSerializer(serializers.ModelSerializer):
         return extract_date(obj.contract_sow.end_date)
 
     def get_recall_count(self, obj):
+        if hasattr(obj, 'recall_entry_count'):
+            return obj.recall_entry_count
         timesheet_id = obj.id
         recall_count = EmployeeEntryTimesheet.objects.filter(
         timesheet_id=timesheet_id,
@@ -495,8 +608,8 @@ class ContractSowIdListSerializer(serializers.Serializer):
 class EmployeeEntryTimesheetSerializer(serializers.ModelSerializer):
     client_name = serializers.CharField(source=CLIENT_NAME, read_only=True)
     contract_name = serializers.CharField(source='contract_sow.name', read_only=True)
-    start_date = serializers.DateField(source='contract_sow.start_date', read_only=True)
-    end_date = serializers.DateField(source='contract_sow.end_date', read_only=True)
+    start_date = LegacyDateSerializerField(source='contract_sow.start_date', read_only=True)
+    end_date = LegacyDateSerializerField(source='contract_sow.end_date', read_only=True)
 
     class Meta:
         model = EmployeeEntryTimesheet
@@ -575,107 +688,8 @@ class EmployeeSerializer(serializers.ModelSerializer):
         fields = ['approver_id', 'approver_name', 'approver_type']
 
 def get_week_date_range(year, week_number):
-    week_start_date = datetime.fromisocalendar(year, week_number, 1)
-    week_end_date = week_start_date + timedelta(days=4)
-    formatted_start_date = week_start_date.strftime('%d/%m/%Y')
-    formatted_end_date = week_end_date.strftime('%d/%m/%Y')
-
-    return f"{formatted_start_date} - {formatted_end_date}", week_start_date.date(), week_end_date.date()
-
-from datetime import date, timedelta
-def get_week_start_end_dates(year, week_number):
-    today = date.today()
-    if year == today.year:
-        current_year, current_week_number, _ = today.isocalendar()
-        current_monday = today - timedelta(days=today.weekday())
-        week_diff = week_number - current_week_number
-        monday = current_monday + timedelta(weeks=week_diff)
-    else:
-        monday = datetime.strptime(f'{year}-W{week_number}-1', "%Y-W%U-%w").date()
-    friday = monday + timedelta(days=4)
-    formatted_start_date = monday.strftime('%d/%m/%Y')
-    formatted_end_date = friday.strftime('%d/%m/%Y')
-    date_str = f"{formatted_start_date} - {formatted_end_date}"
-    return date_str , monday, friday
-
-class ApprovalPendingSerializer(serializers.ModelSerializer):
-    employee_name = serializers.CharField(source='employee_id.employee_full_name', read_only=True)
-    employee_id = serializers.CharField(source='employee_id.employee_source_id', read_only=True)
-    pending_timesheets = serializers.SerializerMethodField()
-    timesheet_id = serializers.CharField(source='timesheet_id.id', read_only=True)  # Add this line
-
-    class Meta:
-        model = EmployeeEntryTimesheet
-        fields = ['employee_name', 'employee_id', 'pending_timesheets', 'timesheet_id']
-    
-    def get_unplanned_hours(self, obj):
-        week_number = obj.week_number
-        employee_id = obj.employee_id
-        year = obj.year
-        unplanned_hours_queryset = EmployeeUnplannedNonbillableHours.objects.filter(
-            week_number=week_number,
-            year = year,
-            employee_id=employee_id
-        )
-        total_unplanned_hours = unplanned_hours_queryset.aggregate(
-            total=Sum('unplanned_hours')
-        )['total'] or 0.0
-        return total_unplanned_hours
-    
-    def get_timeoff_hours(self, obj):
-        week_number = obj.week_number
-        employee_id = obj.employee_id
-        year = obj.year
-        non_billable_hours_queryset = EmployeeUnplannedNonbillableHours.objects.filter(
-            week_number=week_number,
-            employee_id=employee_id,
-            year = year,
-        )
-        total_non_billable_hours = non_billable_hours_queryset.aggregate(
-            total=Sum('non_billable_hours')
-        )['total'] or 0.0
-        return total_non_billable_hours
-    
-    def get_unplanned_timesheet_id(self, obj):
-        week_number = obj.week_number
-        employee_id = obj.employee_id
-        year = obj.year
-        non_billable_hours_queryset = EmployeeUnplannedNonbillableHours.objects.filter(
-            week_number=week_number,
-            employee_id=employee_id,
-            year = year,
-        ).first()
-        if non_billable_hours_queryset:
-            return non_billable_hours_queryset.id
-        return None
-    
-    def get_pending_timesheets(self, obj):
-        year = obj.year
-        week_number = obj.week_number
-        date_str, week_start_date, week_end_date = get_week_date_range(year, week_number)
-        daily_data = obj.timesheet_id.resource_estimation_data.get("Estimation_Data", {}).get("daily", [])
-        filtered_data = [
-            day for day in daily_data
-            if week_start_date <= datetime.strptime(day["date"], "%d/%m/%Y").date() <= week_end_date
-        ]
-        allocated_hours = sum(day["hours"] for day in filtered_data)
-
-        contract_data = {
-            "timesheet_id": obj.id,
-            "client_name": obj.client.name if obj.client else "Unknown Client",
-            "contract_sow_name": obj.contract_sow.contractsow_name if obj.contract_sow else "Unknown Contract",
-            "allocated_hours": allocated_hours,
-            "timesheet_hours": format_hours(obj.billable_hours),
-        }
-        return {
-            "week_number": date_str,
-            "week": week_number,
-            "contracts": [contract_data],
-            "unplanned_hours": format_hours(self.get_unplanned_hours(obj)),
-            "timeoff_hours": format_hours(self.get_timeoff_hours(obj)),
-            "unplanned_timesheet_id": self.get_unplanned_timesheet_id(obj),
-        }
-        
+    week_start_date, week_end_date = work_week_bounds(year, week_number)
+    return format_date_range(week_start_date, week_end_date), week_start_date, week_end_date
 
 class EmployeeUnplannedNonbillableHoursSerializer(serializers.ModelSerializer):
     timesheet_id = serializers.CharField(source='id', read_only=True)
@@ -713,163 +727,7 @@ class C2CRateCardConfigSerializer(serializers.ModelSerializer):
         fields = ['unique_id','dollar_conversion_rate','overhead_percentage','non_billable_days_per_year','desired_gross_margin_percentage','overhead_percentage_usa','non_billable_days_per_year_usa','desired_gross_margin_percentage_usa','minimum_sellrate_usa','minimum_sell_rate','status']
 
 
-class AdminApprovalPendingSerializer(serializers.ModelSerializer):
-    employee_name = serializers.CharField(source='employee_id.employee_full_name', read_only=True)
-    employee_id = serializers.CharField(source='employee_id.employee_source_id', read_only=True)
-    pending_timesheets = serializers.SerializerMethodField()
-    timesheet_id = serializers.CharField(source='timesheet_id.id', read_only=True)
-
-    class Meta:
-        model = EmployeeEntryTimesheet
-        fields = ['employee_name', 'employee_id', 'pending_timesheets', 'timesheet_id']
-
-    def get_unplanned_hours(self, obj):
-        unplanned_hours_queryset = EmployeeUnplannedNonbillableHours.objects.filter(
-            week_number=obj.week_number,
-            year=obj.year,
-            employee_id=obj.employee_id
-        )
-        total_unplanned_hours = unplanned_hours_queryset.aggregate(
-            total=Sum('unplanned_hours')
-        ).get('total', 0.0)
-        return total_unplanned_hours or 0.0
-
-    def get_timeoff_hours(self, obj):
-        non_billable_hours_queryset = EmployeeUnplannedNonbillableHours.objects.filter(
-            week_number=obj.week_number,
-            year=obj.year,
-            employee_id=obj.employee_id
-        )
-        total_non_billable_hours = non_billable_hours_queryset.aggregate(
-            total=Sum('non_billable_hours')
-        ).get('total', 0.0)
-        return total_non_billable_hours or 0.0
-    
-    def get_unplanned_hours_comments(self, obj):
-        unplanned_entry = EmployeeUnplannedNonbillableHours.objects.filter(
-            week_number=obj.week_number,
-            year=obj.year,
-            employee_id=obj.employee_id
-        ).first()
-        return unplanned_entry.unplanned_hours_comments if unplanned_entry else ""
-        
-    def get_timeoff_hours_comments(self, obj):
-        timeoff_entry = EmployeeUnplannedNonbillableHours.objects.filter(
-            week_number=obj.week_number,
-            year=obj.year,
-            employee_id=obj.employee_id
-        ).first()
-        return timeoff_entry.non_billable_hours_comments if timeoff_entry else ""
-        
-
-    def get_unplanned_timesheet_id(self, obj):
-        """Retrieve the unplanned timesheet ID if available."""
-        unplanned_entry = EmployeeUnplannedNonbillableHours.objects.filter(
-            week_number=obj.week_number,
-            year=obj.year,
-            employee_id=obj.employee_id
-        ).first()
-        return unplanned_entry.id if unplanned_entry else None
-
-    def get_unplanned_status(self, obj):
-        """Retrieve the unplanned timesheet status if available."""
-        unplanned_entry = EmployeeUnplannedNonbillableHours.objects.filter(
-            week_number=obj.week_number,
-            year=obj.year,
-            employee_id=obj.employee_id
-        ).first()
-        return unplanned_entry.ts_approval_status if unplanned_entry else ""
-
-    def get_pending_timesheets(self, obj):
-        """Get pending timesheets, including employees who only have unplanned hours."""
-        year, week_number = obj.year, obj.week_number
-        date_str, week_start_date, week_end_date = get_week_date_range(year, week_number)
-
-        if hasattr(obj, 'timesheet_id') and obj.timesheet_id:
-            daily_data = obj.timesheet_id.resource_estimation_data.get("Estimation_Data", {}).get("daily", [])
-            filtered_data = [
-                day for day in daily_data
-                if week_start_date <= datetime.strptime(day["date"], "%d/%m/%Y").date() <= week_end_date
-            ]
-            allocated_hours = sum(day["hours"] for day in filtered_data)
-
-            contracts = [{
-                "timesheet_id": obj.id,
-                "client_name": obj.client.name if obj.client else "Unknown Client",
-                "contract_sow_name": obj.contract_sow.contractsow_name if obj.contract_sow else "Unknown Contract",
-                "allocated_hours": allocated_hours,
-                "timesheet_hours": format_hours(obj.billable_hours),
-                "timesheet_status": obj.ts_approval_status,
-            }]
-        else:
-            # If no planned timesheet exists, contracts should be empty.
-            contracts = []
-
-        return {
-            "week_number": date_str,
-            "week": week_number,
-            "year": year,
-            "contracts": contracts,
-            "unplanned_hours": format_hours(self.get_unplanned_hours(obj)),
-            "timeoff_hours": format_hours(self.get_timeoff_hours(obj)),
-            "unplanned_hours_comments": self.get_unplanned_hours_comments(obj),
-            "timeoff_hours_comments": self.get_timeoff_hours_comments(obj),
-            "unplanned_timesheet_id": self.get_unplanned_timesheet_id(obj),
-            "unplanned_timesheet_status": self.get_unplanned_status(obj),
-        }
-    
-
-class UnplannedHoursSerializer(serializers.ModelSerializer):
-    employee_name = serializers.CharField(source="employee_id.employee_full_name", read_only=True)
-    pending_timesheets = serializers.SerializerMethodField()
-
-    class Meta:
-        model = EmployeeUnplannedNonbillableHours
-        fields = ["employee_id", "employee_name", "pending_timesheets"]
-
-    def get_contracts(self, obj):
-        records = EmployeeEntryTimesheet.objects.filter(week_number=obj.week_number, year=obj.year, employee_id=obj.employee_id)
-        year, week_number = obj.year, obj.week_number
-        date_str, week_start_date, week_end_date = get_week_date_range(year, week_number)
-        if records:
-            contracts = []
-            for record in records:
-
-                daily_data = record.timesheet_id.resource_estimation_data.get("Estimation_Data", {}).get("daily", [])
-                filtered_data = [
-                    day for day in daily_data
-                    if week_start_date <= datetime.strptime(day["date"], "%d/%m/%Y").date() <= week_end_date
-                ]
-                allocated_hours = sum(day["hours"] for day in filtered_data)
-                contracts.append({
-                    "timesheet_id": record.id,
-                    "client_name": record.client.name if record.client else "Unknown Client",
-                    "contract_sow_name": record.contract_sow.contractsow_name if record.contract_sow else "Unknown Contract",
-                    "allocated_hours": allocated_hours,
-                    "timesheet_hours": format_hours(record.billable_hours),
-                    "timesheet_status": record.ts_approval_status,
-                })
-            return contracts
-
-    def get_pending_timesheets(self, obj):
-        """Custom representation to group timesheets by employee_id."""
-        year, week_number = obj.year, obj.week_number
-        date_str, _, _ = get_week_date_range(year, week_number)  # Format the date range
-        pending_timesheet = {
-            "week_number": date_str,
-            "week": obj.week_number,
-            "year": obj.year,
-            "contracts": self.get_contracts(obj),
-            "unplanned_hours": format_hours(obj.unplanned_hours),
-            "timeoff_hours": format_hours(obj.non_billable_hours),
-            "unplanned_comments": obj.unplanned_hours_comments,
-            "timeoff_comments": obj.non_billable_hours_comments,
-            "unplanned_timesheet_id": obj.id,
-            "unplanned_timesheet_status": obj.ts_approval_status,
-        }
-        return pending_timesheet
-    
-class ReportSowContractSerializer(serializers.ModelSerializer):
+class ReportSowContractSerializer(DateCompatModelSerializer):
     class Meta:
         model = SowContract
         fields = '__all__'
\ No newline at end of file
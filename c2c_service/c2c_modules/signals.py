@@ -0,0 +1,69 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from c2c_modules.models import (Timesheet, SowContract, PurchaseOrder, UtilizedAmount, Invoices, MainMilestone, Allocation,
+                                 EmployeeEntryTimesheet, EmployeeUnplannedNonbillableHours, GuestUser, Client)
+from c2c_modules.allocationdays import sync_allocation_days
+from c2c_modules.approvers import sync_approver_assignments, sync_guest_user_clients, link_guest_users_to_client
+from c2c_modules.dashboard import mark_dirty
+from c2c_modules.missingweeks import invalidate_missing_weeks
+from c2c_modules.pendingcounts import queue_pending_refresh
+
+
+@receiver(post_save, sender=Timesheet)
+def update_allocation_days(sender, instance, update_fields=None, **kwargs):
+    """Keep AllocationDay rows in step with the timesheet's daily estimation data."""
+    if update_fields is not None and not {'resource_estimation_data', 'resource', 'contract_sow'} & set(update_fields):
+        return
+    sync_allocation_days(instance)
+
+
+@receiver([post_save, post_delete], sender=SowContract)
+@receiver([post_save, post_delete], sender=PurchaseOrder)
+@receiver([post_save, post_delete], sender=UtilizedAmount)
+@receiver([post_save, post_delete], sender=Invoices)
+@receiver([post_save, post_delete], sender=MainMilestone)
+@receiver([post_save, post_delete], sender=Allocation)
+def refresh_dashboard_snapshot(sender, **kwargs):
+    """Refresh the dashboard sections that read the changed model once the transaction commits."""
+    mark_dirty(sender.__name__)
+
+
+@receiver([post_save, post_delete], sender=Timesheet)
+def forget_missing_weeks_of_resource(sender, instance, **kwargs):
+    """Allocation changes alter which weeks the employee owes timesheets for."""
+    invalidate_missing_weeks([instance.resource_id])
+
+
+@receiver([post_save, post_delete], sender=EmployeeEntryTimesheet)
+@receiver([post_save, post_delete], sender=EmployeeUnplannedNonbillableHours)
+def forget_missing_weeks_of_employee(sender, instance, **kwargs):
+    invalidate_missing_weeks([instance.employee_id_id])
+
+
+@receiver([post_save, post_delete], sender=EmployeeEntryTimesheet)
+@receiver([post_save, post_delete], sender=EmployeeUnplannedNonbillableHours)
+def refresh_pending_approval_week(sender, instance, **kwargs):
+    queue_pending_refresh([(instance.employee_id_id, instance.year, instance.week_number)])
+
+
+@receiver(post_save, sender=Allocation)
+@receiver(post_save, sender=Timesheet)
+@receiver(post_save, sender=EmployeeEntryTimesheet)
+def update_approver_assignments(sender, instance, update_fields=None, **kwargs):
+    """Keep ApproverAssignment rows in step with the `approver` list."""
+    if update_fields is not None and 'approver' not in update_fields:
+        return
+    sync_approver_assignments([instance])
+
+
+@receiver(post_save, sender=GuestUser)
+def update_guest_user_clients(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'client_ids' not in update_fields:
+        return
+    sync_guest_user_clients(instance)
+
+
+@receiver(post_save, sender=Client)
+def link_new_client_to_guest_users(sender, instance, created, **kwargs):
+    if created:
+        link_guest_users_to_client(instance)
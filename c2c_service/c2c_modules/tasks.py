@@ -1,28 +1,23 @@
 
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.events import EVENT_JOB_EXECUTED,EVENT_JOB_ERROR
-from config import SCHEDULER_TIMEZONE, SCHEDULER_DAY, SCHEDULER_HOUR, SCHEDULER_MINUTE
+from apscheduler.triggers.interval import IntervalTrigger
+from config import (SCHEDULER_TIMEZONE, SCHEDULER_DAY, SCHEDULER_HOUR, SCHEDULER_MINUTE, DASHBOARD_RECONCILE_MINUTES, PENDING_COUNTS_RECONCILE_MINUTES,
+                    GUEST_CLIENTS_RECONCILE_MINUTES)
 from datetime import datetime, timedelta
 from django.utils import timezone
-from c2c_modules.models import SowContract, MainMilestone, Estimation, Invoices, EmployeeEntryTimesheet
-from c2c_modules.serializer import InvoicesSerializer
-from rest_framework.exceptions import ValidationError
-from django.db.models import Sum
+from c2c_modules.models import SowContract, MainMilestone, Invoices, EmployeeEntryTimesheet, SchedulerJobRun
+from django.db import transaction
+from django.db.models import Sum, Min
+import socket
+import time
 from c2c_modules.custom_logger import info, error
-
-def get_weekdays_range(target_date):
-    """
-    Get weekdays (Monday to Friday) from the previous week.
-    """
-    previous_monday = target_date - timedelta(days=target_date.weekday() + 7)
-    previous_friday = previous_monday + timedelta(days=4)
-    weekdays = []
-    current_day = previous_monday
-    while current_day <= previous_friday:
-        weekdays.append(current_day)
-        current_day += timedelta(days=1)
-    return weekdays
+from c2c_modules.estimationengine import get_estimation_series, estimation_resources
+from c2c_modules.dashboard import refresh_sections, reconcile_dashboard
+from c2c_modules.workcalendar import previous_work_week, ensure_calendar
+from c2c_modules.pendingcounts import reconcile_pending_counts
+from c2c_modules.approvers import reconcile_guest_user_clients
 
 def identify_date_format(estimation_data):
     """Identify the date format based on the highest values in the day and month lists."""
@@ -75,7 +70,7 @@ def calculate_weekly_invoice(resource, weekdays):
 
 def calculate_invoice_for_all_resources(estimation, target_date):
     """Calculate the invoice for all resources within the estimation data."""
-    weekdays = get_weekdays_range(target_date)
+    weekdays = previous_work_week(target_date)
     total_invoice = 0
     try:
         for resource in estimation['resource']:
@@ -87,28 +82,26 @@ def calculate_invoice_for_all_resources(estimation, target_date):
         return 0
 
 def get_resource_count_and_hours(estimation, target_date):
-    """Calculate the invoice for all resources within the estimation data."""
-    weekdays = get_weekdays_range(target_date)
+    """Planned hours and resource count of an Estimation for the previous week's weekdays."""
+    weekdays = previous_work_week(target_date)
+    resources = estimation_resources(estimation)
     total_hours_count = 0
-    resource_count = len(estimation['resource'])
+    resource_count = len(resources)
     try:
-        for resource in estimation['resource']:
+        for resource, series in zip(resources, get_estimation_series(estimation)):
             if 'Estimation_Data' not in resource or 'daily' not in resource['Estimation_Data']:
                 total_hours_count = 0
             else:
-                daily_hours = filter_daily_hours(resource['Estimation_Data']['daily'], weekdays)
-                total_hours = sum(daily_hours)
                 count = int(resource['num_of_resources'])
-                total_hours = total_hours * count
-                total_hours_count +=total_hours
-                resource_count +=count
+                total_hours_count += series.total_between(weekdays[0], weekdays[-1]) * count
+                resource_count += count
         return total_hours_count, resource_count
     except Exception as e:
         error(f"Error calculating resource count and hours: {e}")
         return 0, 0
 
 def fetch_milestones_for_past_week(milestones, current_date):
-    weekdays = get_weekdays_range(current_date)
+    weekdays = previous_work_week(current_date)
     total_milestone_amount = 0
     try:
         for milestone in milestones:
@@ -124,155 +117,228 @@ def fetch_milestones_for_past_week(milestones, current_date):
         error(f"Error fetching milestones for past week: {e}")
         return 0
 
-def generate_invoice_id(contract_name, contract_id):
+def generate_invoice_id(contract_name):
     """
     Generates a unique invoice ID based on contract name and past week number.
     """
-    try:
-        past_week_date = timezone.now() - timedelta(weeks=1)
-        past_week_number = past_week_date.isocalendar()[1]
-        invoice_count = Invoices.objects.filter(c2c_contract_id=contract_id).count()
-        if invoice_count == 0:
-            invoice_count = 1
-        info(f"{contract_name}_{past_week_number}")
-        return f"{contract_name}_{past_week_number}"
-    except Exception as e:
-        error(f"Error generating invoice ID: {e}")
-        return None
+    past_week_date = timezone.now() - timedelta(weeks=1)
+    past_week_number = past_week_date.isocalendar()[1]
+    return f"{contract_name}_{past_week_number}"
 
-def create_invoice_for_time_and_material_contracts():
+def get_last_week_billable_amounts(current_date, contract_ids):
     """
-    Creates an invoice for time and material and milestone contracts.
+    Billable amount per contract for last week's timesheets: one grouped aggregate for the
+    hour sums, one query for the bill rate of each contract's first timesheet entry.
     """
-    try:
-        current_date = timezone.now().date()
-        weekdays = get_weekdays_range(current_date)
-        contracts = SowContract.objects.filter(end_date__gt=min(weekdays))
-        print("Total invoices count: ",len(contracts))
-        for contract in contracts:
-            total_invoice_amount, invoice_type, invoice_type_id, total_hours_count, resource_count = process_contract(contract, current_date)
-            if total_invoice_amount > 0:
-                invoice_id = generate_invoice_id(contract.contractsow_name, contract.uuid)
-                save_invoice(contract, invoice_id, invoice_type, invoice_type_id, total_invoice_amount, total_hours_count, resource_count)
-        formatted_weekdays = [day.strftime("%d-%m-%Y") for day in weekdays]
-        return {"message": f"Invoices generated for the past week dates: {formatted_weekdays}"}
-    except Exception as e:
-        error(f"Error creating invoice: {e}")
-        return {"message": f"Error creating invoice: {e}"}
-
-def get_last_week_billable_hours_sum(current_date, contract_id):
-    total_billable_hours = 0
     last_week_date = current_date - timedelta(weeks=1)
-    last_week_number = last_week_date.isocalendar()[1]
-    last_week_year = last_week_date.isocalendar()[0]
-    try:
-        timesheet_entries = EmployeeEntryTimesheet.objects.filter(
-            week_number=last_week_number,
-            year=last_week_year,
-            contract_sow__uuid=contract_id
-        )
-        if timesheet_entries != None:
-            total_billable_hours = timesheet_entries.aggregate(total_billable_hours=Sum('billable_hours'))['total_billable_hours'] or 0
-            if timesheet_entries.exists():
-                timesheet_object = timesheet_entries.first().timesheet_id
-                if timesheet_object:
-                    estimation_data = timesheet_object.resource_estimation_data
-                    billrate = float(estimation_data['pay_rate_info']['billrate'])
-                    total_billable_hours = billrate * total_billable_hours
-        return total_billable_hours
-    except Exception as e:
-        error(f"Error getting last week billable hours sum: {e}")
-        return 0
+    last_week_year, last_week_number = last_week_date.isocalendar()[0], last_week_date.isocalendar()[1]
+    totals = EmployeeEntryTimesheet.objects.filter(
+        week_number=last_week_number,
+        year=last_week_year,
+        contract_sow__in=contract_ids
+    ).values('contract_sow').annotate(
+        total_billable_hours=Sum('billable_hours'),
+        first_entry_id=Min('id')
+    )
+    totals = {row['contract_sow']: row for row in totals}
+    first_entries = EmployeeEntryTimesheet.objects.filter(
+        id__in=[row['first_entry_id'] for row in totals.values()]
+    ).values_list('contract_sow', 'timesheet_id__resource_estimation_data')
+    amounts = {}
+    for contract_id, row in totals.items():
+        amounts[contract_id] = row['total_billable_hours'] or 0
+    for contract_id, estimation_data in first_entries:
+        if not estimation_data:
+            continue
+        try:
+            billrate = float(estimation_data['pay_rate_info']['billrate'])
+            amounts[contract_id] = billrate * amounts[contract_id]
+        except Exception as e:
+            error(f"Error getting last week billable hours sum for {contract_id}: {e}")
+            amounts[contract_id] = 0
+    return amounts
 
-def process_contract(contract, current_date):
-    """Process the contract to calculate total invoice amount and retrieve related details."""
-    total_invoice_amount = 0
-    invoice_type = ''
-    invoice_type_id = None
-    total_hours_count, resource_count = 0, 0
-    estimation = Estimation.objects.filter(uuid=contract.estimation_id).first()
-    if estimation:
-        estimation_data = {'resource': estimation.resource}
-        total_hours_count, resource_count = get_resource_count_and_hours(estimation_data, current_date)
+def build_invoice(contract, current_date, billable_amounts, milestones):
+    """Build the (unsaved) invoice for a contract, or None when nothing is billable."""
+    total_hours_count, resource_count = get_resource_count_and_hours(contract.estimation, current_date)
     if contract.contractsow_type == 'TIME AND MATERIAL':
         invoice_type = 'Timesheets'
-        invoice_type_id = estimation.uuid
-        total_invoice_amount = get_last_week_billable_hours_sum(current_date, contract.uuid)
+        invoice_type_id = contract.estimation_id
+        total_invoice_amount = billable_amounts.get(contract.uuid, 0)
     else:
-        total_invoice_amount, invoice_type, invoice_type_id = process_milestone_contract(contract, current_date)
+        milestone = milestones.get(contract.uuid)
+        if milestone is None:
+            return None
+        invoice_type = 'Milestone'
+        invoice_type_id = milestone.uuid
+        total_invoice_amount = fetch_milestones_for_past_week(milestone.milestones, current_date)
     total_invoice_amount = round(total_invoice_amount, 2)
-    return total_invoice_amount, invoice_type, invoice_type_id, total_hours_count, resource_count
-
-def process_milestone_contract(contract, current_date):
-    """Process milestone contracts to calculate total invoice amount."""
-    try:
-        milestones = MainMilestone.objects.filter(contract_sow_uuid=contract.uuid).first()
-        if milestones != None:
-            total_invoice_amount = fetch_milestones_for_past_week(milestones.milestones, current_date)
-            return round(total_invoice_amount, 2), 'Milestone', milestones.uuid
-        else:
-            return 0, '', None
-    except Exception as e:
-        error(f"Error processing milestone contract: {e}")
-        return 0, '', None
+    if total_invoice_amount <= 0:
+        return None
+    return Invoices(
+        c2c_invoice_id=generate_invoice_id(contract.contractsow_name),
+        c2c_client_id_id=contract.client_id,
+        c2c_contract_id_id=contract.uuid,
+        c2c_invoice_type=str(invoice_type),
+        c2c_invoice_type_id=str(invoice_type_id),
+        c2c_invoice_amount=total_invoice_amount,
+        c2c_total_hours_count=total_hours_count,
+        c2c_resource_count=resource_count,
+        c2c_invoice_generated_on=timezone.now(),
+        c2c_invoice_status='Active'
+    )
 
-def save_invoice(contract, invoice_id, invoice_type, invoice_type_id, total_invoice_amount, total_hours_count, resource_count):
+def create_invoice_for_time_and_material_contracts():
     """
-    Save a new invoice to the database or update the `c2c_invoice_amount` of an existing one.
+    Creates an invoice for time and material and milestone contracts.
+    The whole week's contract set is loaded, aggregated and upserted in a fixed number of queries.
     """
     try:
-        existing_invoice = Invoices.objects.filter(
-            c2c_contract_id=contract,
-            c2c_invoice_id=invoice_id
-        ).first()
-        if existing_invoice:
-            existing_invoice.c2c_invoice_amount = total_invoice_amount
-            existing_invoice.save()
-            info(f"Invoice updated: {existing_invoice.c2c_invoice_id}, new amount: {existing_invoice.c2c_invoice_amount}")
-        else:
-            invoice_data = {
-                'c2c_invoice_id': invoice_id,
-                'c2c_client_id': contract.client.uuid,
-                'c2c_contract_id': contract.uuid,
-                'c2c_invoice_type': str(invoice_type),
-                'c2c_invoice_type_id': str(invoice_type_id),
-                'c2c_invoice_amount': total_invoice_amount,
-                'c2c_total_hours_count': total_hours_count,
-                'c2c_resource_count': resource_count,
-                'c2c_invoice_generated_on': timezone.now(),
-                'c2c_invoice_status': 'Active'
-            }
-            invoice_serializer = InvoicesSerializer(data=invoice_data)
-            if invoice_serializer.is_valid():
-                invoice_serializer.save()
-                info(f"Invoice created: {invoice_serializer.data['c2c_invoice_id']}")
-                print(f"Invoice created: {invoice_serializer.data['c2c_invoice_id']}")
-            else:
-                raise ValidationError(invoice_serializer.errors)
+        timings = {}
+        started = time.perf_counter()
+        current_date = timezone.now().date()
+        weekdays = previous_work_week(current_date)
+        contracts = list(SowContract.objects.filter(end_date__gt=min(weekdays)).select_related('estimation'))
+        contract_ids = [contract.uuid for contract in contracts]
+        milestones = {
+            milestone.contract_sow_uuid_id: milestone
+            for milestone in MainMilestone.objects.filter(contract_sow_uuid__in=contract_ids)
+        }
+        billable_amounts = get_last_week_billable_amounts(current_date, contract_ids)
+        timings['load'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        invoices = []
+        failed_contracts = []
+        for contract in contracts:
+            try:
+                invoice = build_invoice(contract, current_date, billable_amounts, milestones)
+            except Exception as e:
+                error(f"Error processing contract {contract.contractsow_name}: {e}")
+                failed_contracts.append(contract.contractsow_name)
+                continue
+            if invoice is not None:
+                invoices.append(invoice)
+        timings['compute'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            Invoices.objects.bulk_create(
+                invoices,
+                update_conflicts=True,
+                unique_fields=['c2c_invoice_id'],
+                update_fields=['c2c_invoice_amount']
+            )
+        # bulk_create sends no post_save signals, so refresh the invoice figures here.
+        refresh_sections(['active_invoices'])
+        timings['save'] = time.perf_counter() - started
+        timings = {step: round(seconds, 3) for step, seconds in timings.items()}
+        info(f"Invoice run: {len(contracts)} contracts, {len(invoices)} invoices upserted, timings {timings}")
+        formatted_weekdays = [day.strftime("%d-%m-%Y") for day in weekdays]
+        return {
+            "message": f"Invoices generated for the past week dates: {formatted_weekdays}",
+            "contracts": len(contracts),
+            "invoices": len(invoices),
+            "failed_contracts": failed_contracts,
+            "timings": timings
+        }
     except Exception as e:
         error(f"Error creating invoice: {e}")
-        return {'message': f"Error creating invoice: {e}"}
+        raise
 
 def create_invoice_logic():
     try:
         result = create_invoice_for_time_and_material_contracts()
-        return {'result': result, 'status': 'success'}
     except Exception as e:
         return {'error': str(e), 'status': 'failed'}
+    if result["failed_contracts"]:
+        return {'result': result, 'error': f"{len(result['failed_contracts'])} contract(s) failed", 'status': 'failed'}
+    return {'result': result, 'status': 'success'}
     
-def start_invoice_scheduler():
-    info("Starting the scheduler...")
-    scheduler = BackgroundScheduler()
+INVOICE_JOB_ID = "weekly_invoice"
+DASHBOARD_JOB_ID = "dashboard_reconcile"
+CALENDAR_JOB_ID = "calendar_extend"
+PENDING_COUNTS_JOB_ID = "pending_counts_reconcile"
+GUEST_CLIENTS_JOB_ID = "guest_user_clients_reconcile"
+
+def run_recorded_job(job_id, func):
+    """Run a scheduled job and record its outcome in the job run history."""
+    run = SchedulerJobRun.objects.create(job_id=job_id, hostname=socket.gethostname())
+    try:
+        result = func()
+        # Jobs report handled errors in their result rather than by raising.
+        failed = not isinstance(result, dict) or result.get('status') == 'failed'
+        run.status = 'failed' if failed else 'success'
+        run.result = result if isinstance(result, dict) else {'result': repr(result)}
+        if failed:
+            error(f"Job {job_id} failed: {run.result}")
+        return result
+    except Exception as e:
+        run.status = 'failed'
+        run.result = {'error': str(e)}
+        raise
+    finally:
+        run.finished_at = timezone.now()
+        run.save(update_fields=['status', 'result', 'finished_at'])
+
+def run_invoice_job():
+    return run_recorded_job(INVOICE_JOB_ID, create_invoice_logic)
+
+def run_dashboard_job():
+    return run_recorded_job(DASHBOARD_JOB_ID, reconcile_dashboard)
+
+def run_calendar_job():
+    return run_recorded_job(CALENDAR_JOB_ID, ensure_calendar)
+
+def run_pending_counts_job():
+    return run_recorded_job(PENDING_COUNTS_JOB_ID, reconcile_pending_counts)
+
+def run_guest_clients_job():
+    return run_recorded_job(GUEST_CLIENTS_JOB_ID, reconcile_guest_user_clients)
+
+def build_invoice_scheduler(scheduler_class=BlockingScheduler, is_leader=None):
+    """
+    Build the scheduler that runs the weekly invoice job, the dashboard, pending approval count and
+    guest user client reconciliations and the monthly extension of the calendar tables.
+    It is started only by the `run_scheduler` management command, never on import, so it runs in one process.
+    With `is_leader`, every run first checks that this process still holds the leader lock, and
+    shuts the scheduler down instead of running if it does not.
+    """
+    scheduler = scheduler_class(job_defaults={'coalesce': True, 'max_instances': 1})
+
+    def leader_only(job):
+        if is_leader is None:
+            return job
+        def run():
+            if not is_leader():
+                error(f"Scheduler leader lock lost before {job.__name__}; stepping down")
+                scheduler.shutdown(wait=False)
+                return None
+            return job()
+        run.__name__ = job.__name__
+        return run
+
     trigger = CronTrigger(day_of_week=SCHEDULER_DAY, hour=SCHEDULER_HOUR, minute=SCHEDULER_MINUTE, timezone=SCHEDULER_TIMEZONE)
-    job = scheduler.add_job(create_invoice_logic, trigger)
+    job = scheduler.add_job(leader_only(run_invoice_job), trigger, id=INVOICE_JOB_ID, replace_existing=True)
     info(f"Invoice Scheduler Job with ID: {job.id}")
+    dashboard_trigger = IntervalTrigger(minutes=int(DASHBOARD_RECONCILE_MINUTES or 15))
+    job = scheduler.add_job(leader_only(run_dashboard_job), dashboard_trigger, id=DASHBOARD_JOB_ID, replace_existing=True)
+    info(f"Dashboard Scheduler Job with ID: {job.id}")
+    calendar_trigger = CronTrigger(day=1, hour=0, timezone=SCHEDULER_TIMEZONE)
+    job = scheduler.add_job(leader_only(run_calendar_job), calendar_trigger, id=CALENDAR_JOB_ID, replace_existing=True)
+    info(f"Calendar Scheduler Job with ID: {job.id}")
+    pending_counts_trigger = IntervalTrigger(minutes=int(PENDING_COUNTS_RECONCILE_MINUTES or 60))
+    job = scheduler.add_job(leader_only(run_pending_counts_job), pending_counts_trigger, id=PENDING_COUNTS_JOB_ID, replace_existing=True)
+    info(f"Pending Counts Scheduler Job with ID: {job.id}")
+    guest_clients_trigger = IntervalTrigger(minutes=int(GUEST_CLIENTS_RECONCILE_MINUTES or 30))
+    job = scheduler.add_job(leader_only(run_guest_clients_job), guest_clients_trigger, id=GUEST_CLIENTS_JOB_ID, replace_existing=True)
+    info(f"Guest User Clients Scheduler Job with ID: {job.id}")
     def job_listener(event):
         if event.exception:
             info(f"Job {event.job_id} failed: {event.exception}")
+        elif isinstance(event.retval, dict) and event.retval.get('status') == 'failed':
+            info(f"Job {event.job_id} reported a failure at {event.scheduled_run_time}.")
         else:
             info(f"Job {event.job_id} completed successfully at {event.scheduled_run_time}.")
     scheduler.add_listener(job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
-    scheduler.start()
-    info("Scheduler is running.")  
-
-
+    return scheduler
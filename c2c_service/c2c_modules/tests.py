@@ -0,0 +1,721 @@
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+import requests
+from asgiref.sync import async_to_sync
+from django.db import connection, DatabaseError
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from c2c_modules import (allocationview, approvalview, dashboard, httpclient, reportview, contractsowview, contractview, estimationview, pricingview, purchaseorderview,
+                         resourceview)
+from c2c_modules.blobcache import BlobCache, cached_blob_response
+from c2c_modules.management.commands import run_scheduler
+from c2c_modules.datefields import parse_legacy_date, format_legacy_date
+from c2c_modules.estimationengine import InvalidEstimationDate, parse_daily_series
+from c2c_modules.approvalqueue import build_approval_queue, build_unplanned_queue
+from c2c_modules.models import (Client, Estimation, Pricing, SowContract, Allocation, Employee, Timesheet,
+                                EmployeeEntryTimesheet, EmployeeUnplannedNonbillableHours, Contract, FileModel,
+                                PurchaseOrder, UtilizedAmount, GuestUser, GuestUserClient, DashboardSnapshot)
+from c2c_modules.serializer import ContractSowSerializer, AllocationSerializer
+from c2c_modules.utils import check_role, get_date_from_utc_time
+
+APPROVER_ID = "APPROVER"
+
+
+def allowed(email, *roles):
+    """`has_permission` result for a user holding `roles`."""
+    return {"status": 200, "username": "tester", "user_roles": [check_role(role) for role in roles], "user_email": email}
+
+def daily_hours(start, days, hours=8):
+    return [
+        {"date": (start + timedelta(days=offset)).strftime("%d/%m/%Y"),
+         "hours": 0 if (start + timedelta(days=offset)).weekday() >= 5 else hours}
+        for offset in range(days)
+    ]
+
+
+class ApprovalQueueFixture:
+    """Submitted weeks for any number of employees, each with an allocation, entries and unplanned hours."""
+    first_monday = date(2025, 1, 6)
+
+    def create_contract(self):
+        self.client_ = Client.objects.create(name="Acme")
+        self.estimation = Estimation.objects.create(name="E1", client=self.client_, resource=[])
+        pricing = Pricing.objects.create(name="P1", client=self.client_, estimation=self.estimation)
+        self.sow = SowContract.objects.create(
+            client=self.client_, pricing=pricing, estimation=self.estimation, contractsow_name="SOW1",
+            start_date=self.first_monday, end_date=self.first_monday + timedelta(days=365),
+        )
+        self.approver = Employee.objects.create(employee_source_id=APPROVER_ID, employee_full_name="Approver",
+                                                employee_email="approver@example.com")
+        self.approvers = [{"approver_id": APPROVER_ID, "approver_name": "Approver"}]
+        self.allocation = Allocation.objects.create(name="A1", contract_sow=self.sow, estimation=self.estimation,
+                                                    client=self.client_, resource_data=[], approver=self.approvers)
+        self.employee_count = 0
+
+    def add_employees(self, employees, weeks):
+        for _ in range(employees):
+            self.employee_count += 1
+            employee = Employee.objects.create(
+                employee_source_id=f"E{self.employee_count}", employee_full_name=f"Employee {self.employee_count}",
+                employee_email=f"e{self.employee_count}@example.com",
+            )
+            timesheet = Timesheet.objects.create(
+                client=self.client_, estimation=self.estimation, allocation=self.allocation, resource=employee,
+                contract_sow=self.sow, approver=self.approvers,
+                resource_estimation_data={"billability": "Billable",
+                                          "Estimation_Data": {"daily": daily_hours(self.first_monday, (weeks + 1) * 7)}},
+            )
+            for week in range(weeks):
+                year, week_number, _ = (self.first_monday + timedelta(weeks=week)).isocalendar()
+                self.add_entry(timesheet, employee, week, "submitted")
+                # Every other week also has unplanned hours.
+                if week % 2 == 0:
+                    self.add_unplanned(employee, week)
+            # The week after is already approved but its unplanned hours are still pending.
+            self.add_entry(timesheet, employee, weeks, "approved")
+            self.add_unplanned(employee, weeks)
+
+    def add_entry(self, timesheet, employee, week, ts_approval_status):
+        year, week_number, _ = (self.first_monday + timedelta(weeks=week)).isocalendar()
+        EmployeeEntryTimesheet.objects.create(
+            timesheet_id=timesheet, employee_id=employee, year=year, week_number=week_number,
+            client=timesheet.client, contract_sow=timesheet.contract_sow, approver=self.approvers, ts_approval_status=ts_approval_status,
+            billable_hours=40, non_billable_hours=0, unplanned_hours=0, total_hours=40,
+        )
+
+    def add_unplanned(self, employee, week):
+        year, week_number, _ = (self.first_monday + timedelta(weeks=week)).isocalendar()
+        EmployeeUnplannedNonbillableHours.objects.create(
+            employee_id=employee, year=year, week_number=week_number, unplanned_hours=2, non_billable_hours=1,
+        )
+
+
+class ApprovalQueueQueryCountTests(ApprovalQueueFixture, TestCase):
+    """The approval queues cost the same number of queries however many employees and weeks are pending."""
+
+    def setUp(self):
+        self.create_contract()
+        self.factory = APIRequestFactory()
+
+    def post(self, view, *roles):
+        request = self.factory.post("/", {"approver_email": "approver@example.com"}, format="json")
+        with mock.patch.object(approvalview, "has_permission", return_value=allowed("approver@example.com", *roles)):
+            return view.as_view()(request)
+
+    def count_queries(self, call):
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        return len(queries)
+
+    def test_builders_use_a_fixed_number_of_queries(self):
+        entries = EmployeeEntryTimesheet.objects.filter(ts_approval_status="submitted")
+        unplanned = EmployeeUnplannedNonbillableHours.objects.all()
+        for employees, weeks in ((1, 1), (3, 4), (6, 8)):
+            self.add_employees(employees, weeks)
+            with self.assertNumQueries(3):
+                queue = build_approval_queue(entries, APPROVER_ID)
+            self.assertEqual(len(queue), self.employee_count)
+            with self.assertNumQueries(3):
+                build_approval_queue(entries, APPROVER_ID, detailed=True)
+            with self.assertNumQueries(3):
+                build_unplanned_queue(unplanned)
+
+    def test_views_do_not_grow_with_the_queue(self):
+        views = [
+            (approvalview.ApprovalPendingListView, "c2c_timesheet_manager"),
+            (approvalview.ApprovalPendingListView, "c2c_timesheet_admin"),
+            (approvalview.SubmittedTimesheetsAPIView, "c2c_timesheet_admin"),
+        ]
+        self.add_employees(1, 1)
+        baseline = {view: self.count_queries(lambda: self.post(view, role)) for view, role in views}
+        self.add_employees(8, 6)
+        for view, role in views:
+            with self.assertNumQueries(baseline[view]):
+                response = self.post(view, role)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), self.employee_count)
+
+
+class GuestUserClientTests(ApprovalQueueFixture, TestCase):
+    """Guest approvers see their clients' queues whether or not their client links have been synced."""
+
+    def setUp(self):
+        self.create_contract()
+        self.add_employees(2, 1)
+        self.factory = APIRequestFactory()
+
+    def pending_for(self, guest_user):
+        request = self.factory.post("/", {"approver_email": guest_user.guest_user_email_id}, format="json")
+        with mock.patch.object(approvalview, "has_permission",
+                               return_value=allowed(guest_user.guest_user_email_id, "c2c_guest_employee")):
+            return approvalview.ApprovalPendingListView.as_view()(request)
+
+    def approvers_for(self, client):
+        request = self.factory.post("/", {"client_id": str(client.uuid)}, format="json")
+        with mock.patch.object(approvalview, "has_permission", return_value=allowed("approver@example.com")):
+            response = approvalview.TimesheetApproverSearchView.as_view()(request)
+        return {row["approver_id"] for row in response.data if row["approver_type"] == "Guest"}
+
+    def test_saved_guest_user_is_linked(self):
+        guest_user = GuestUser.objects.create(guest_user_id="G1", guest_user_email_id="g1@example.com",
+                                              client_ids=[str(self.client_.uuid), "not-a-uuid"])
+        self.assertEqual(list(guest_user.client_links.values_list("client_id", flat=True)), [self.client_.uuid])
+        self.assertEqual(len(self.pending_for(guest_user).data), 2)
+        self.assertEqual(self.approvers_for(self.client_), {"G1"})
+
+    def test_guest_user_written_outside_the_app_is_read_live(self):
+        # bulk_create skips the save signal, like a row inserted by another system.
+        guest_user, = GuestUser.objects.bulk_create([
+            GuestUser(guest_user_id="G2", guest_user_email_id="g2@example.com", client_ids=[str(self.client_.uuid)])
+        ])
+        self.assertFalse(GuestUserClient.objects.exists())
+        self.assertEqual(len(self.pending_for(guest_user).data), 2)
+        self.assertEqual(self.approvers_for(self.client_), {"G2"})
+        self.assertEqual(self.approvers_for(Client.objects.create(name="Other")), set())
+
+    def test_client_created_after_guest_user_is_linked(self):
+        later = Client(name="Later")
+        GuestUser.objects.create(guest_user_id="G3", guest_user_email_id="g3@example.com",
+                                 client_ids=[str(self.client_.uuid), str(later.uuid)])
+        later.save()
+        self.assertEqual(set(GuestUserClient.objects.filter(guest_user_id="G3").values_list("client_id", flat=True)),
+                         {self.client_.uuid, later.uuid})
+        self.assertEqual(self.approvers_for(later), {"G3"})
+
+
+class ListQueryCountTests(ApprovalQueueFixture, TestCase):
+    """List endpoints cost the same number of queries whatever the page size and however many rows they list."""
+    views = (contractsowview, estimationview, pricingview, purchaseorderview, contractview, resourceview)
+
+    def setUp(self):
+        self.create_contract()
+        self.resource = Employee.objects.create(employee_source_id="RESOURCE", employee_full_name="Resource",
+                                                employee_email="resource@example.com")
+        self.factory = APIRequestFactory()
+        self.rows = 0
+        for module in self.views:
+            patcher = mock.patch.object(module, "has_permission", return_value=allowed("approver@example.com"))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def grow(self, rows):
+        """Add `rows` of everything the list endpoints show, each with its documents and related rows."""
+        for _ in range(rows):
+            self.rows += 1
+            estimation = Estimation.objects.create(name=f"Estimation {self.rows}", client=self.client_, resource=[])
+            pricing = Pricing.objects.create(name=f"Pricing {self.rows}", client=self.client_, estimation=estimation)
+            sow = SowContract.objects.create(
+                client=self.client_, pricing=pricing, estimation=estimation, contractsow_name=f"SOW {self.rows}",
+                start_date=self.first_monday, end_date=self.first_monday + timedelta(days=365),
+                extension_sow_contract=str(self.sow.uuid),
+            )
+            contract = Contract.objects.create(client=self.client_, name=f"Contract {self.rows}",
+                                               start_date=self.first_monday, end_date=self.first_monday + timedelta(days=365))
+            for document_owner in (estimation, sow, contract):
+                FileModel.objects.create(client=self.client_, document_id=str(document_owner.uuid),
+                                         blob_name=f"{document_owner.uuid}.pdf")
+            purchase_order = PurchaseOrder.objects.create(
+                client=self.client_, purchase_order_name=f"PO {self.rows}", po_amount=100, account_number="1",
+                start_date=self.first_monday, end_date=self.first_monday + timedelta(days=365),
+            )
+            UtilizedAmount.objects.create(purchase_order=purchase_order, sow_contract=sow, utilized_amount=10)
+            timesheet = Timesheet.objects.create(
+                client=self.client_, estimation=estimation, allocation=self.allocation, resource=self.resource,
+                contract_sow=sow, approver=self.approvers,
+                resource_estimation_data={"billability": "Billable", "start_date": str(self.first_monday),
+                                          "end_date": str(self.first_monday + timedelta(days=13)),
+                                          "Estimation_Data": {"daily": daily_hours(self.first_monday, 14)}},
+            )
+            self.add_entry(timesheet, self.resource, 0, "recalled")
+
+    def list_calls(self, page_size):
+        query = {"page_size": page_size}
+        return {
+            "contract sows": lambda: contractsowview.ContractSowGetAPIView.as_view()(
+                self.factory.get("/", query), client_uuid=self.client_.uuid),
+            "estimations": lambda: estimationview.EstimationGetAPIView.as_view()(
+                self.factory.get("/", query), client=self.client_.uuid),
+            "pricings": lambda: pricingview.PricingGetAPIView.as_view()(
+                self.factory.get("/", query), client=self.client_.uuid),
+            "purchase orders": lambda: purchaseorderview.PurchaseOrderClientWithUtilizationAPIView.as_view()(
+                self.factory.get("/", query), client_id=self.client_.uuid),
+            "contracts": lambda: contractview.ContractGetAPIView.as_view()(
+                self.factory.get("/", query), client_id=self.client_.uuid),
+            "resource timesheets": lambda: resourceview.ResourceTimesheetsView.as_view()(
+                self.factory.get("/", query), resource_id=self.resource.employee_source_id),
+        }
+
+    def count_queries(self, call):
+        with CaptureQueriesContext(connection) as queries:
+            response = call()
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.grow(2)
+        baseline = {name: self.count_queries(call) for name, call in self.list_calls(page_size=2).items()}
+        self.grow(10)
+        for page_size in (2, 5, 50):
+            for name, call in self.list_calls(page_size).items():
+                with self.subTest(endpoint=name, page_size=page_size):
+                    with self.assertNumQueries(baseline[name]):
+                        call()
+
+
+class FakeContainer:
+    """In-memory stand-in for AzureContainer that counts the storage calls."""
+    def __init__(self):
+        self.blobs = {}
+        self.etag_calls = 0
+        self.downloads = 0
+        self.download_started = threading.Event()
+        self.release_download = threading.Event()
+        self.release_download.set()
+
+    def put(self, blob_name, content):
+        self.blobs[blob_name] = content
+
+    def get_etag(self, blob_name):
+        self.etag_calls += 1
+        return hashlib.md5(self.blobs[blob_name]).hexdigest()
+
+    def download_to(self, blob_name, etag, output):
+        self.downloads += 1
+        self.download_started.set()
+        self.release_download.wait(5)
+        output.write(self.blobs[blob_name])
+
+
+async def read_streaming_content(response):
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+class BlobCacheTests(SimpleTestCase):
+    content = b"0123456789abcdef"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.container = FakeContainer()
+        self.container.put("contract.pdf", self.content)
+        self.cache = BlobCache(self.container, directory=self.directory, max_bytes=1024, etag_ttl=60)
+        self.factory = RequestFactory()
+
+    def read(self, cached):
+        with open(cached.path, "rb") as file_:
+            return file_.read()
+
+    def respond(self, headers=None):
+        return cached_blob_response(self.factory.get("/", headers=headers), "contract.pdf", "contract.pdf", cache=self.cache)
+
+    def test_etag_is_revalidated_after_ttl(self):
+        now = time.monotonic()
+        with mock.patch("c2c_modules.blobcache.time.monotonic", return_value=now):
+            self.assertEqual(self.read(self.cache.get("contract.pdf")), self.content)
+            self.cache.get("contract.pdf")
+        self.assertEqual((self.container.etag_calls, self.container.downloads), (1, 1))
+
+        self.container.put("contract.pdf", b"new version")
+        with mock.patch("c2c_modules.blobcache.time.monotonic", return_value=now + 30):
+            self.assertEqual(self.read(self.cache.get("contract.pdf")), self.content)
+        with mock.patch("c2c_modules.blobcache.time.monotonic", return_value=now + 61):
+            self.assertEqual(self.read(self.cache.get("contract.pdf")), b"new version")
+            self.cache.get("contract.pdf")
+        self.assertEqual((self.container.etag_calls, self.container.downloads), (2, 2))
+
+    def test_forget_revalidates_immediately(self):
+        self.cache.get("contract.pdf")
+        self.container.put("contract.pdf", b"uploaded")
+        self.cache.forget("contract.pdf")
+        self.assertEqual(self.read(self.cache.get("contract.pdf")), b"uploaded")
+
+    def test_concurrent_misses_download_once(self):
+        self.container.release_download.clear()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get("contract.pdf"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(self.container.download_started.wait(5))
+        time.sleep(0.1)
+        self.container.release_download.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(self.container.downloads, 1)
+        self.assertEqual(len(results), 5)
+        self.assertEqual({cached.path for cached in results}, {results[0].path})
+
+    def test_full_response(self):
+        response = self.respond()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(async_to_sync(read_streaming_content)(response), self.content)
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["ETag"], '"%s"' % hashlib.md5(self.content).hexdigest())
+
+    def test_if_none_match_returns_304_without_downloading(self):
+        etag = '"%s"' % hashlib.md5(self.content).hexdigest()
+        response = self.respond({"If-None-Match": f'"other", {etag}'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self.container.downloads, 0)
+
+    def test_range_returns_206(self):
+        for range_header, body, content_range in (("bytes=2-5", b"2345", "bytes 2-5/16"),
+                                                  ("bytes=10-", b"abcdef", "bytes 10-15/16"),
+                                                  ("bytes=-3", b"def", "bytes 13-15/16"),
+                                                  ("bytes=12-100", b"cdef", "bytes 12-15/16")):
+            with self.subTest(range_header=range_header):
+                response = self.respond({"Range": range_header})
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(async_to_sync(read_streaming_content)(response), body)
+                self.assertEqual(response["Content-Length"], str(len(body)))
+                self.assertEqual(response["Content-Range"], content_range)
+
+    def test_stale_if_range_returns_full_content(self):
+        response = self.respond({"Range": "bytes=2-5", "If-Range": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(async_to_sync(read_streaming_content)(response), self.content)
+
+    def test_unsatisfiable_range_returns_416(self):
+        for range_header in ("bytes=16-", "bytes=5-2", "bytes=-0"):
+            with self.subTest(range_header=range_header):
+                response = self.respond({"Range": range_header})
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+
+class DashboardSnapshotTests(TestCase):
+    def failing_section(self):
+        raise ValueError("figures unavailable")
+
+    def test_failed_section_keeps_previous_figures(self):
+        dashboard.refresh_sections()
+        stored = DashboardSnapshot.objects.get(section="active_sows")
+        with mock.patch.dict(dashboard.SECTIONS, {"active_sows": self.failing_section}):
+            result = dashboard.reconcile_dashboard()
+            live, errors = dashboard.compute_sections(["active_sows"])
+        self.assertEqual(result["status"], "failed")
+        self.assertEqual(result["failed_sections"], {"active_sows": "figures unavailable"})
+        self.assertEqual((live, errors), ({}, {"active_sows": "figures unavailable"}))
+        kept = DashboardSnapshot.objects.get(section="active_sows")
+        self.assertEqual((kept.data, kept.computed_at), (stored.data, stored.computed_at))
+        self.assertGreater(DashboardSnapshot.objects.get(section="sow_po_status").computed_at, stored.computed_at)
+
+    def test_missing_section_that_fails_is_not_stored(self):
+        with mock.patch.dict(dashboard.SECTIONS, {"active_sows": self.failing_section}):
+            results, _ = dashboard.get_snapshot()
+        self.assertEqual(results["active_sows"], "figures unavailable")
+        self.assertFalse(DashboardSnapshot.objects.filter(section="active_sows").exists())
+        self.assertEqual(DashboardSnapshot.objects.count(), len(dashboard.SECTIONS) - 1)
+
+
+class EstimationSeriesTests(ApprovalQueueFixture, TestCase):
+    def test_totals(self):
+        series = parse_daily_series(daily_hours(self.first_monday, 14) + [{"date": "bad"}, {"date": "1/1/2025", "hours": "x"}])
+        self.assertEqual(len(series), 14)
+        self.assertEqual(series.total_between(self.first_monday, self.first_monday + timedelta(days=6)), 40)
+        self.assertEqual(series.weekly_totals(), {self.first_monday: 40, self.first_monday + timedelta(weeks=1): 40})
+
+    def test_month_first_dates(self):
+        series = parse_daily_series([{"date": "01/31/2025", "hours": 8}, {"date": "02/03/2025", "hours": 4}])
+        self.assertEqual(series.monthly_totals(), {(2025, 1): 8, (2025, 2): 4})
+
+    def test_impossible_dates_are_rejected(self):
+        for daily in ([{"date": "31/02/2025", "hours": 8}], [{"date": "29/02/2025", "hours": 8}],
+                      [{"date": "02/30/2025", "hours": 8}, {"date": "01/13/2025", "hours": 8}]):
+            with self.subTest(daily=daily):
+                with self.assertRaises(InvalidEstimationDate) as raised:
+                    parse_daily_series(daily)
+                self.assertEqual(raised.exception.dates, [daily[0]["date"]])
+        self.assertEqual(len(parse_daily_series([{"date": "29/02/2024", "hours": 8}])), 1)
+
+    def test_burndown_returns_400_for_impossible_dates(self):
+        self.create_contract()
+        self.estimation.resource = [{"num_of_resources": 1, "pay_rate_info": {"billrate": 50},
+                                     "Estimation_Data": {"daily": [{"date": "31/02/2025", "hours": 8}]}}]
+        self.estimation.save()
+        self.allocation.resource_data = [{"resource_id": "BUDGETO123"}]
+        self.allocation.save()
+        response = reportview.ContractBurndownView.as_view()(APIRequestFactory().get("/"), contract_id=self.sow.uuid)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("31/02/2025", response.data["error"])
+
+        self.estimation.resource[0]["Estimation_Data"]["daily"] = daily_hours(self.first_monday, 7)
+        self.estimation.save()
+        response = reportview.ContractBurndownView.as_view()(APIRequestFactory().get("/"), contract_id=self.sow.uuid)
+        self.assertEqual(response.status_code, 200)
+
+    def test_allocation_slots_map_to_estimation_resources(self):
+        developer = {"role": "developer", "num_of_resources": 2}
+        tester = {"role": "tester", "num_of_resources": 0}
+        lead = {"role": "lead", "num_of_resources": 1}
+        estimation = Estimation(resource=[developer, tester, lead])
+        self.assertEqual(allocationview.get_current_estimation_data(estimation), [developer, developer, lead])
+        self.assertEqual(allocationview.get_current_estimation_data(Estimation(resource=lead)), [lead])
+        self.assertEqual(allocationview.get_current_estimation_data(Estimation(resource=[])), [])
+
+
+class LegacyDateTests(ApprovalQueueFixture, TestCase):
+    def test_ui_datetimes_are_read_as_ist_dates(self):
+        for value in ("2025-01-05T18:30:00.000Z", "2025-01-05T18:30:00Z", "2025-01-05 18:30:00.000"):
+            with self.subTest(value=value):
+                self.assertEqual(parse_legacy_date(value), get_date_from_utc_time(value))
+                self.assertEqual(parse_legacy_date(value), date(2025, 1, 6))
+        self.assertEqual(parse_legacy_date("2025-01-05T18:29:59.000Z"), date(2025, 1, 5))
+        self.assertEqual(parse_legacy_date("2025-01-06T00:00:00+05:30"), date(2025, 1, 6))
+
+    def test_plain_dates(self):
+        self.assertEqual(parse_legacy_date("2025-01-05"), date(2025, 1, 5))
+        self.assertEqual(parse_legacy_date("05/01/2025"), date(2025, 1, 5))
+        self.assertEqual(parse_legacy_date("01/31/2025"), date(2025, 1, 31))
+        for value in ("", "  ", "garbage", "2025-13-01", "2025-02-30T00:00:00Z"):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_legacy_date(value))
+
+    def test_wire_format_round_trips(self):
+        self.assertEqual(format_legacy_date(date(2025, 1, 6)), "2025-01-05T18:30:00.000Z")
+        self.assertEqual(parse_legacy_date(format_legacy_date(date(2025, 1, 6))), date(2025, 1, 6))
+        self.assertIsNone(format_legacy_date(None))
+
+    def test_serializers_keep_the_wire_format(self):
+        self.create_contract()
+        serializer = ContractSowSerializer(self.sow, data={"start_date": "2025-01-05T18:30:00.000Z"}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        sow = serializer.save()
+        sow.refresh_from_db()
+        self.assertEqual(sow.start_date, date(2025, 1, 6))
+        self.assertEqual(ContractSowSerializer(sow).data["start_date"], "2025-01-05T18:30:00.000Z")
+        self.assertEqual(AllocationSerializer(self.allocation).data["start_date"], "2025-01-05T18:30:00.000Z")
+
+
+class FakeLockConnection:
+    vendor = 'postgresql'
+
+    def __init__(self, result):
+        self.result = result
+        self.closed = False
+
+    def inc_thread_sharing(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params):
+                if isinstance(connection.result, Exception):
+                    raise connection.result
+
+            def fetchone(self):
+                return (connection.result,)
+        return Cursor()
+
+
+class LeaderLockTests(SimpleTestCase):
+    def check(self, *results):
+        fakes = [FakeLockConnection(result) for result in results]
+        connections = mock.MagicMock()
+        connections.__getitem__.return_value = FakeLockConnection(True)
+        connections.create_connection.side_effect = fakes
+        with mock.patch.object(run_scheduler, 'connections', connections):
+            lock = run_scheduler.LeaderLock(retry_delay=0)
+            return lock.held(), fakes, lock
+
+    def test_dropped_connection_is_retried_on_a_fresh_one(self):
+        held, fakes, lock = self.check(DatabaseError("server closed the connection"), True)
+        self.assertTrue(held)
+        self.assertTrue(fakes[0].closed)
+        self.assertIs(lock.connection, fakes[1])
+
+    def test_lock_taken_by_another_session_after_the_drop(self):
+        held, fakes, lock = self.check(DatabaseError("server closed the connection"), False)
+        self.assertFalse(held)
+        self.assertIsNone(lock.connection)
+
+    def test_database_still_unreachable(self):
+        held, _, _ = self.check(DatabaseError("down"), DatabaseError("still down"))
+        self.assertFalse(held)
+
+
+class DocumentFileNameTests(ApprovalQueueFixture, TestCase):
+    def setUp(self):
+        self.create_contract()
+        digest = hashlib.sha256(b"report").hexdigest()
+        self.named = FileModel.objects.create(client=self.client_, document_id=str(self.sow.uuid),
+                                              blob_name=f"{digest}/report.pdf", file_name="report.pdf")
+        self.unnamed = FileModel.objects.create(client=self.client_, document_id=str(self.sow.uuid),
+                                                blob_name=f"{digest}/scan.pdf")
+
+    def test_document_files_carry_the_original_name(self):
+        files = {row['uuid']: row for row in ContractSowSerializer(self.sow).data['document']}
+        self.assertEqual(files[self.named.uuid]['file_name'], "report.pdf")
+        self.assertEqual(files[self.unnamed.uuid]['file_name'], "scan.pdf")
+        self.assertEqual(files[self.unnamed.uuid]['blob_name'], self.unnamed.blob_name)
+
+    def test_deleted_file_reports_the_original_name(self):
+        request = APIRequestFactory().post("/")
+        with mock.patch.object(contractview, 'has_permission', return_value={"status": 200}):
+            response = contractview.AzurBlobFileDeleter.as_view()(request, file_uuid=self.named.uuid)
+        updated = json.loads(response.content)['updated_file']
+        self.assertEqual(updated['file_name'], "report.pdf")
+        self.assertEqual(updated['blob_name'], self.named.blob_name)
+
+
+class StubUpstreamHandler(BaseHTTPRequestHandler):
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up on a slow response.
+
+    def respond(self):
+        self.server.hits[self.path] += 1
+        self.server.arrived.set()
+        status, delay = self.server.replies.get(self.path, [(200, 0)])[0]
+        if len(self.server.replies.get(self.path, [])) > 1:
+            self.server.replies[self.path].pop(0)
+        time.sleep(delay)
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.respond()
+
+    def log_message(self, *args):
+        pass
+
+
+class UpstreamTests(SimpleTestCase):
+    """Upstream against a local HTTP server; `replies` maps a path to its (status, delay) replies, the last one repeating."""
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubUpstreamHandler)
+        self.server.daemon_threads = True
+        self.server.hits = Counter()
+        self.server.replies = {}
+        self.server.arrived = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        for patch in (mock.patch.object(httpclient, "RETRY_BACKOFF_SECONDS", 0), mock.patch.object(httpclient, "warning")):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def upstream(self, threshold=5, reset_seconds=30, **kwargs):
+        upstream = httpclient.Upstream("stub", f"http://127.0.0.1:{self.server.server_port}",
+                                       breaker=httpclient.CircuitBreaker(threshold, reset_seconds), **kwargs)
+        self.addCleanup(upstream.session.close)
+        return upstream
+
+    def in_background(self, call):
+        outcome = {}
+
+        def run():
+            try:
+                outcome["response"] = call()
+            except Exception as e:
+                outcome["error"] = e
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.assertTrue(self.server.arrived.wait(5))
+        return thread, outcome
+
+    def test_read_timeout(self):
+        self.server.replies["/slow"] = [(200, 0.5)]
+        upstream = self.upstream(read_timeout=0.1)
+        with self.assertRaises(requests.ReadTimeout):
+            upstream.post("/slow")
+        self.assertEqual(self.server.hits["/slow"], 1)
+        with self.assertRaises(requests.ReadTimeout):
+            upstream.get("/slow")
+        self.assertEqual(self.server.hits["/slow"], 1 + 3)
+        self.assertEqual(upstream.stats.snapshot()["failures"], 4)
+
+    def test_only_idempotent_calls_are_retried_on_gateway_errors(self):
+        upstream = self.upstream()
+        self.server.replies["/gateway"] = [(503, 0), (502, 0), (200, 0)]
+        self.assertEqual(upstream.get("/gateway").status_code, 200)
+        self.assertEqual(self.server.hits["/gateway"], 3)
+
+        self.server.replies["/create"] = [(503, 0), (200, 0)]
+        self.assertEqual(upstream.post("/create").status_code, 503)
+        self.assertEqual(self.server.hits["/create"], 1)
+        self.assertEqual(upstream.post("/create", idempotent=True).status_code, 200)
+
+        self.server.replies["/error"] = [(500, 0)]
+        self.assertEqual(upstream.get("/error").status_code, 500)
+        self.assertEqual(self.server.hits["/error"], 1)
+
+        self.server.replies["/down"] = [(504, 0)]
+        self.assertEqual(upstream.get("/down").status_code, 504)
+        self.assertEqual(self.server.hits["/down"], 1 + httpclient.MAX_RETRIES)
+
+    def test_breaker_opens_lets_one_trial_through_and_closes(self):
+        upstream = self.upstream(threshold=2, reset_seconds=0.2)
+        self.server.replies["/flaky"] = [(500, 0), (500, 0), (200, 0.3), (200, 0)]
+        upstream.post("/flaky")
+        upstream.post("/flaky")
+        self.assertEqual(upstream.breaker.state, httpclient.CircuitBreaker.OPEN)
+        with self.assertRaises(httpclient.UpstreamUnavailable):
+            upstream.post("/flaky")
+        self.assertEqual(self.server.hits["/flaky"], 2)
+
+        time.sleep(0.25)
+        self.server.arrived.clear()
+        trial, outcome = self.in_background(lambda: upstream.post("/flaky"))
+        self.assertEqual(upstream.breaker.state, httpclient.CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(httpclient.UpstreamUnavailable):
+            upstream.post("/flaky")
+        trial.join()
+        self.assertEqual(outcome["response"].status_code, 200)
+        self.assertEqual(upstream.breaker.state, httpclient.CircuitBreaker.CLOSED)
+        self.assertEqual(upstream.post("/flaky").status_code, 200)
+        self.assertEqual(self.server.hits["/flaky"], 4)
+
+    def test_concurrency_cap_rejects_when_no_slot_frees_up(self):
+        self.server.replies["/slow"] = [(200, 0.5)]
+        upstream = self.upstream(max_concurrency=1, connect_timeout=0.1)
+        busy, outcome = self.in_background(lambda: upstream.get("/slow"))
+        with self.assertRaises(httpclient.UpstreamUnavailable):
+            upstream.get("/slow")
+        busy.join()
+        self.assertEqual(outcome["response"].status_code, 200)
+        self.assertEqual(self.server.hits["/slow"], 1)
+        self.assertEqual(upstream.breaker.state, httpclient.CircuitBreaker.CLOSED)
+
+    def test_outbound_metrics(self):
+        upstream = self.upstream(threshold=2)
+        self.server.replies["/down"] = [(503, 0), (200, 0)]
+        with mock.patch.object(httpclient, "upstreams", [upstream]):
+            self.assertEqual(upstream.get("/down").status_code, 200)
+            upstream.breaker.record_failure()
+            upstream.breaker.record_failure()
+            with self.assertRaises(httpclient.UpstreamUnavailable):
+                upstream.get("/down")
+            metrics = httpclient.outbound_metrics()["stub"]
+        self.assertEqual({key: metrics[key] for key in ("calls", "failures", "rejected", "retries", "circuit")},
+                         {"calls": 2, "failures": 1, "rejected": 1, "retries": 1, "circuit": "open"})
+        self.assertGreater(metrics["max_ms"], 0)
@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.utils import timezone
+from c2c_modules.models import Client, SowContract, Timesheet, EmployeeEntryTimesheet
+from c2c_modules.approvers import sync_approver_assignments
+from c2c_modules.missingweeks import invalidate_missing_weeks
+from c2c_modules.pendingcounts import queue_pending_refresh
+
+ENTRY_KEY_FIELDS = ['employee_id', 'year', 'week_number', 'client', 'contract_sow']
+HOUR_FIELDS = ['billable_hours', 'non_billable_hours', 'unplanned_hours', 'total_hours']
+
+
+def entry_hours(value):
+    """Hours as stored by `EmployeeEntryTimesheet.save`: numbers as floats, 'HH:MM' strings converted."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            hours, minutes = map(int, value.split(':'))
+            return hours + minutes / 60.0
+        except ValueError:
+            raise ValueError(f"Invalid time format: '{value}'")
+    raise ValueError("Invalid time input; expected int or str.")
+
+def resolve_clients(names):
+    """{name: Client} for the given names, in one query."""
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    return {client.name: client for client in Client.objects.filter(name__in=names)}
+
+def resolve_contracts(names):
+    """{contract name: [SowContract, ...]} for the given names, in one query."""
+    names = {name for name in names if name}
+    contracts = {}
+    if names:
+        for contract in SowContract.objects.filter(contractsow_name__in=names).order_by('date_created', 'pk'):
+            contracts.setdefault(contract.contractsow_name, []).append(contract)
+    return contracts
+
+def pick_contract(contracts, contract_name, client):
+    """The contract with that name, preferring the client's own when the name is not unique."""
+    candidates = contracts.get(contract_name, [])
+    for contract in candidates:
+        if client is not None and contract.client_id == client.pk:
+            return contract
+    return candidates[0] if candidates else None
+
+def resolve_timesheets(employee, pairs):
+    """
+    {(client id, contract id): Timesheet} of the employee for the given pairs, in one query,
+    creating the missing ones in one INSERT (what `Timesheet.objects.get_or_create` did per entry).
+    """
+    pairs = set(pairs)
+    timesheets = {}
+    if not pairs:
+        return timesheets
+    client_ids = {client_id for client_id, _ in pairs}
+    existing = Timesheet.objects.filter(resource=employee).order_by('id')
+    if None not in client_ids:
+        existing = existing.filter(client_id__in=client_ids)
+    for timesheet in existing:
+        timesheets.setdefault((timesheet.client_id, timesheet.contract_sow_id), timesheet)
+    missing = [
+        Timesheet(resource=employee, client_id=client_id, contract_sow_id=contract_id)
+        for client_id, contract_id in pairs - timesheets.keys()
+    ]
+    for timesheet in Timesheet.objects.bulk_create(missing):
+        timesheets[(timesheet.client_id, timesheet.contract_sow_id)] = timesheet
+    return {pair: timesheets[pair] for pair in pairs}
+
+def upsert_week_entries(employee, year, week_number, entries, update_fields):
+    """
+    Write one employee's entries for a week in a single transaction. Entries for a client and
+    contract go out as one `INSERT ... ON CONFLICT (employee, year, week, client, contract) DO
+    UPDATE`; the entry without client and contract, which the constraint cannot match, is updated
+    in place or inserted. Later entries for the same client and contract win. Hours must already be
+    normalised (see `entry_hours`), as `save()` is not called; approver assignments are synced here
+    when `approver` is written.
+    """
+    keyed = {}
+    unkeyed = None
+    for entry in entries:
+        entry.employee_id = employee
+        entry.year = year
+        entry.week_number = week_number
+        if entry.client_id is None and entry.contract_sow_id is None:
+            unkeyed = entry
+        else:
+            keyed[(entry.client_id, entry.contract_sow_id)] = entry
+    fields = list(update_fields) + ['date_updated']
+    with transaction.atomic():
+        if keyed:
+            EmployeeEntryTimesheet.objects.bulk_create(
+                keyed.values(), update_conflicts=True, unique_fields=ENTRY_KEY_FIELDS, update_fields=fields,
+            )
+        if unkeyed is not None:
+            existing_id = EmployeeEntryTimesheet.objects.filter(
+                employee_id=employee, year=year, week_number=week_number,
+                client__isnull=True, contract_sow__isnull=True,
+            ).values_list('id', flat=True).first()
+            if existing_id is None:
+                EmployeeEntryTimesheet.objects.bulk_create([unkeyed])
+            else:
+                unkeyed.pk = existing_id
+                unkeyed.date_updated = timezone.now()
+                EmployeeEntryTimesheet.objects.bulk_update([unkeyed], fields)
+        if 'approver' in update_fields:
+            sync_approver_assignments(list(keyed.values()) + ([unkeyed] if unkeyed is not None else []))
+        invalidate_missing_weeks([employee.pk])
+        queue_pending_refresh([(employee.pk, year, week_number)])
@@ -12,9 +12,10 @@ from c2c_modules.resourceview import TimesheetOverviewView, ResourceTimesheetsVi
 from c2c_modules.employeeview import RoleCountsView, SkillCountsView, EmployeeSearchAPIView, EmpTypeCountryCountsView, RoleEmployeeListView, SkillEmployeeListView, EmpTypeCountryEmployeeListView,EmployeeTimesheetView, AddTimesheetView, EmployeeTimesheetStatusAPIView, ClientTimesheetView,UnplannedHoursView, TimeOffHoursView, EmployeeHoursView, EmployeeHoursDownloadView, RecallTimesheetView
 from c2c_modules.reportview import ContractsEndingReportAPIView, SowContractAPIView, MissingTimesheetView, EmployeeUtilizationView, FinancialDataView, ResourceCountsView, ContractBurndownView
 from c2c_modules.invoiceview import create_invoice_view, InvoicesByClientView, UpdateInvoiceView, SendInvoiceView, InvoiceRegenerateAPIView
-from c2c_modules.utils import RedirectWithAuthTokenView, RedirectWithRefreshTokenView, RedirectOpenAIView, RedirectChatbotOpenAIView, CheckNameView
+from c2c_modules.asyncproxy import RedirectOpenAIView, RedirectChatbotOpenAIView
+from c2c_modules.utils import RedirectWithAuthTokenView, RedirectWithRefreshTokenView, CheckNameView, OutboundMetricsView, ClassifyDocumentsView
 from c2c_modules.dashboardview import DashboardAPIView
-from c2c_modules.approvalview import ApproveOrRecallTimesheetsView, PendingTimesheetsView,BulkApproveTimesheetsAPIView, TimesheetApproverSearchView, ApprovalPendingListView, ManagerApprovalPendingCountsView, UpdateTimesheetsByManagerView, EmployeeMissingTimesheetAPIView, SubmittedTimesheetsAPIView
+from c2c_modules.approvalview import ApproveOrRecallTimesheetsView, PendingTimesheetsView,BulkApproveTimesheetsAPIView, TimesheetApproverSearchView, ApprovalPendingListView, ManagerApprovalPendingCountsView, ManagerApprovalPendingCountStreamView, UpdateTimesheetsByManagerView, EmployeeMissingTimesheetAPIView, SubmittedTimesheetsAPIView
 
 urlpatterns = [
     # API routes for Client
@@ -117,6 +118,8 @@ urlpatterns = [
     path('token/refresh/', RedirectWithRefreshTokenView.as_view(), name='redirect_with_auth'),
     path('extract-information/', RedirectOpenAIView.as_view(), name='redirect_with_openai'),
     path('openai-chatbot/<uuid:file_uuid>/', RedirectChatbotOpenAIView.as_view(), name='openai-chatbot'),
+    path('outbound-metrics/', OutboundMetricsView.as_view(), name='outbound-metrics'),
+    path('classify-documents/', ClassifyDocumentsView.as_view(), name='classify-documents'),
 
     #API routes for Invoice Module
     path('generate-invoice/', create_invoice_view, name='create_invoice_view'),
@@ -129,6 +132,7 @@ urlpatterns = [
     path('timesheet-approver-search/',TimesheetApproverSearchView.as_view(), name='timesheet-approver-search'),
     path('timesheet-approval-pending/',ApprovalPendingListView.as_view(), name='timesheet-approval-pending'),
     path('ts-manager-notification-count/',ManagerApprovalPendingCountsView.as_view(), name='manager-pending'),
+    path('ts-manager-notification-stream/',ManagerApprovalPendingCountStreamView.as_view(), name='manager-pending-stream'),
     path('timesheets/missing-submissions/previous-week/',MissingTimesheetView.as_view(), name='missing-timesheet'),
     path('update-timesheets-by-manager/',UpdateTimesheetsByManagerView.as_view(), name='update-timesheets-by-manager'),
     path('timesheet-approval-pending-hr-manager/',PendingTimesheetsView.as_view(), name='update-unplanned-timeoff-timesheets-by-manager'),
@@ -1,9 +1,12 @@
-import os
 import json
-from datetime import datetime, timedelta
+import os
+import tempfile
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import requests
 import jwt
-from tika import parser
 import re
 from django.http import JsonResponse
 from django.views import View
@@ -14,79 +17,38 @@ from rest_framework import status
 from c2c_modules.models import Client, Contract, Allocation, Estimation, SowContract, PurchaseOrder, MainMilestone, FileModel, Pricing
 from c2c_modules.serializer import FileSerializer
 from django.core.cache import cache
-from azure.storage.blob import BlobServiceClient
+from c2c_modules.blobcache import get_blob_service
 from rest_framework.generics import GenericAPIView
-from config import AZURE_CONNECTION_STRING, AZURE_CONTAINER_NAME, AUTH_API, OPENAI_API, MPS_DOCUMENT_PARSER_API, PROFILE
+from rest_framework.parsers import MultiPartParser, FormParser
+from config import AZURE_CONTAINER_NAME, PROFILE, BLOB_UPLOAD_CONCURRENCY, BLOB_BLOCK_CONCURRENCY
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
-from c2c_modules.tasks import start_invoice_scheduler
 from datetime import datetime
 from c2c_modules.custom_logger import info, error, warning
+from c2c_modules.rolecache import role_cache, role_lookups, token_cache_key
+from c2c_modules.jwtverify import local_verification_enabled, verify_token, roles_from_claims, KeySetUnavailable
+from c2c_modules.httpclient import auth_api, outbound_metrics
+from c2c_modules.textextraction import classify_documents
 import pytz
-import portalocker
-start_invoice_scheduler()
 
 
-CACHE_FILE = 'user_roles_cache.json'
-CACHE_EXPIRY = timedelta(minutes=10)
 REGISTER_CALL = "register/"
+DEFAULT_BLOB_UPLOAD_CONCURRENCY = 4
+DEFAULT_BLOB_BLOCK_CONCURRENCY = 4
 
 def compare_timestamp(unix_timestamp):
     current_timestamp = int(datetime.now().timestamp())
     return current_timestamp - unix_timestamp < 900
 
 def get_user_roles(access_token):
+    """The token's roles from the auth API, or None if the lookup failed."""
     payload = {"auth_token": access_token}
     try:
-        response = requests.post(AUTH_API + REGISTER_CALL, data=payload)
-        return response.json().get('user_roles')
+        response = auth_api.post(REGISTER_CALL, data=payload, idempotent=True)
+        response.raise_for_status()
+        return response.json().get('user_roles') or []
     except Exception as e:
         info(f"Error fetching user roles: {e}")
-        return []
-
-def load_user_roles_from_cache():
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r') as file:
-                portalocker.lock(file, portalocker.LOCK_SH)
-                content = file.read().strip()
-                portalocker.unlock(file)
-                if not content:
-                    return []
-                return json.loads(content)
-        except json.JSONDecodeError:
-            print("Warning: Cache file contains invalid JSON. Resetting cache.")
-            return reset_cache()
-    else:
-        return reset_cache()
-
-def reset_cache():
-    """ Resets the cache by writing an empty list to the file. """
-    
-    with open(CACHE_FILE, 'w') as file:
-        portalocker.lock(file, portalocker.LOCK_EX)
-        json.dump([], file)
-        portalocker.unlock(file)
-    return []
-
-def save_user_roles_to_cache(cache):
-    """Save a new entry to the user roles cache."""
-    with open(CACHE_FILE, 'w') as file:
-        portalocker.lock(file, portalocker.LOCK_EX)
-        json.dump(cache, file, indent=4)
-        portalocker.unlock(file)
-
-def clean_expired_entries():
-    """
-    Remove expired entries from the cache file based on the 'exp' timestamp.
-    """
-    cache = load_user_roles_from_cache()
-    current_timestamp = int(datetime.now().timestamp())
-    filtered_cache = [
-        entry for entry in cache
-        if isinstance(entry, dict) and 'exp' in entry and entry['exp'] > current_timestamp
-    ]
-    save_user_roles_to_cache(filtered_cache)
-
+        return None
 
 def decode_token(access_token):
     """Decode the JWT token without verifying the signature and handle expiration errors."""
@@ -101,32 +63,35 @@ def get_token_from_header(request):
     """Extract the Bearer token from the Authorization header."""
     return request.headers.get('Authorization', '').split('Bearer ')[-1].strip()
 
-def get_user_roles_with_cache(access_token, username):
+def get_user_roles_with_cache(access_token, username, decoded_token=None):
     """
-    Retrieve user roles from the cache or fetch them from the API if not cached or expired.
+    Retrieve user roles from the role cache or fetch them from the API if not cached or expired.
+    Concurrent lookups for the same token share a single API call. A failed lookup yields no roles
+    and is not cached, so the next request asks the API again.
     """
-    clean_expired_entries()
-    cache = load_user_roles_from_cache()
-    for entry in cache:
-        if isinstance(entry, dict) and entry.get('username') == username:
-            exp = entry.get('exp')
-            current_timestamp = int(datetime.now().timestamp())
-            if exp and exp > current_timestamp:
-                return entry['user_roles'], entry['username'], entry.get('user_email')
-    decoded_token = decode_token(access_token)
-    exp = decoded_token.get('exp')
-    user_email = decoded_token.get("unique_name")
-    user_roles = [role.lower() for role in get_user_roles(access_token)]
-    new_entry = {
-        'access_token': access_token,
-        'user_roles': user_roles,
-        'username': username,
-        'exp': exp,
-        'user_email': user_email
-    }
-    cache.append(new_entry)
-    save_user_roles_to_cache(cache)
-    return user_roles, username, user_email
+    key = token_cache_key(access_token)
+    entry = role_cache.get(key)
+    if entry:
+        return entry['user_roles'], entry['username'], entry.get('user_email')
+
+    def fetch():
+        cached = role_cache.get(key)
+        if cached:
+            return cached
+        token_data = decoded_token or decode_token(access_token)
+        user_roles = get_user_roles(access_token)
+        new_entry = {
+            'user_roles': [role.lower() for role in user_roles or []],
+            'username': username,
+            'exp': token_data.get('exp') or int(datetime.now().timestamp()) + 600,
+            'user_email': token_data.get("unique_name")
+        }
+        if user_roles is not None:
+            role_cache.set(key, new_entry)
+        return new_entry
+
+    entry = role_lookups.do(key, fetch)
+    return entry['user_roles'], entry['username'], entry.get('user_email')
 
 def has_permission(request, required_roles):
     """Check if the user has the required roles based on their JWT token."""
@@ -146,7 +111,20 @@ def has_permission(request, required_roles):
         except Exception as e:
             return {'error': 'Unexpected error', "status": 500, 'message': str(e)}
         username = decoded_token.get('name')
-        user_roles, username, user_email = get_user_roles_with_cache(access_token, username)
+        user_roles = None
+        if local_verification_enabled():
+            try:
+                claims = verify_token(access_token)
+                user_roles = roles_from_claims(claims)
+                user_email = claims.get("unique_name")
+            except ExpiredSignatureError:
+                return {'error': 'Expired access token', "status": 401, "user_roles": [], "username": None}
+            except InvalidTokenError as e:
+                return {'error': 'Invalid access token', "status": 403, "user_roles": [], "username": None, 'message': str(e)}
+            except KeySetUnavailable as e:
+                warning(f"Falling back to auth API for roles: {e}")
+        if user_roles is None:
+            user_roles, username, user_email = get_user_roles_with_cache(access_token, username, decoded_token)
         if any(role in user_roles for role in required_roles):
             return {
                 'success': 'Valid access token',
@@ -194,38 +172,6 @@ def safe_json_loads(json_string):
         matches = re.findall(pattern, cleaned_string)
         return dict(matches)
 
-def count_occurrences(text, terms, case_sensitive_terms):
-    count = 0
-    for term in terms:
-        if term in case_sensitive_terms:
-            count += text.count(term)
-        else:
-            count += text.lower().count(term.lower())
-    return count
-
-def extract_text_from_file(file_path):
-    raw = parser.from_file(file_path)
-    return raw['content']
-
-
-def extract_document_type(file_path):
-    sow_keywords = ["Statement of Work", "SOW"]
-    po_keywords = ["Purchase Order", "PO", "P.O"]
-    case_sensitive_terms = ["PO", "P.O", "SOW"]
-
-    text = extract_text_from_file(file_path)
-
-    sow_count = count_occurrences(text, sow_keywords, case_sensitive_terms)
-    po_count = count_occurrences(text, po_keywords, case_sensitive_terms)
-
-    if sow_count > po_count:
-        result = "SOW"
-    elif po_count > sow_count:
-        result = "PO"
-    else:
-        result = "Unknown"
-    return result
-
 @method_decorator(csrf_exempt, name='dispatch')
 class RedirectWithAuthTokenView(View):
     def post(self, request):
@@ -238,7 +184,7 @@ class RedirectWithAuthTokenView(View):
             return JsonResponse({'error': 'Authorization token not provided'}, status=400)
         payload = {'auth_token': auth_token}
         try:
-            response = requests.post(AUTH_API + REGISTER_CALL, json=payload)
+            response = auth_api.post(REGISTER_CALL, json=payload, idempotent=True)
             return JsonResponse(response.json(), status=response.status_code)
         except requests.RequestException as e:
             return JsonResponse({'error': str(e)}, status=500)
@@ -255,40 +201,39 @@ class RedirectWithRefreshTokenView(View):
             return JsonResponse({'error': 'Refresh token not provided'}, status=400)
         payload = {'refresh_token': refresh_token}
         try:
-            response = requests.post(AUTH_API + "token/refresh/", json=payload)
+            response = auth_api.post("token/refresh/", json=payload)
             return JsonResponse(response.json(), status=response.status_code)
         except requests.RequestException as e:
             return JsonResponse({'error': str(e)}, status=500)
 
-@method_decorator(csrf_exempt, name='dispatch')
-class RedirectOpenAIView(View):
-    def post(self, request):
-        if 'file' not in request.FILES:
-            return JsonResponse({'error': 'No file part in the request'}, status=400)
-
-        file_ = request.FILES['file']
-        files = {'file': (file_.name, file_.read())}
-        try:
-            if PROFILE == "PROD":
-                response = requests.post(f"{OPENAI_API}upload", files=files)
-            else:
-                upload_dir = os.path.join('uploaded_files')
-                os.makedirs(upload_dir, exist_ok=True)
-                file_path = os.path.join(upload_dir, file_.name)
-                with open(file_path, 'wb+') as destination:
-                    for chunk in file_.chunks():
-                        destination.write(chunk)
-                document_type = extract_document_type(file_path)
-                endpoint_url = f"{MPS_DOCUMENT_PARSER_API}extract-information/?document_type={document_type}"
-                response = requests.post(endpoint_url, files=files)
-            return JsonResponse(response.json(), status=200)
-        except requests.RequestException as e:
-            return JsonResponse({'error': str(e)}, status=200)
-
+def file_sha256(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+def upload_blob_with_metrics(blob_name, file):
+    """Upload one file in parallel blocks and return its timing: {bytes, ms, mb_per_s}."""
+    started = time.perf_counter()
+    blob_client = get_blob_service().get_blob_client(container=AZURE_CONTAINER_NAME, blob=blob_name)
+    blob_client.upload_blob(file, overwrite=True, max_concurrency=int(BLOB_BLOCK_CONCURRENCY or DEFAULT_BLOB_BLOCK_CONCURRENCY))
+    elapsed = time.perf_counter() - started
+    metrics = {
+        "bytes": file.size,
+        "ms": round(elapsed * 1000, 1),
+        "mb_per_s": round(file.size / (1024 * 1024) / elapsed, 2) if elapsed else None,
+    }
+    info(f"Uploaded blob {blob_name}: {metrics['bytes']} bytes in {metrics['ms']} ms ({metrics['mb_per_s']} MB/s)")
+    return metrics
 
 def upload_file_to_blob(client_id, document_type, document_id, uploaded_files, username):
+    """
+    Store the uploaded files under content-addressed blob names ('<sha256>/<file name>') and record
+    them as the active files of the document. A file whose content is already stored is linked to
+    the existing blob instead of being uploaded again; the others are uploaded concurrently.
+    """
     uploaded_files_info = list()
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
     # Check for existing files with the same client_id, document_id, and document_type
     existing_files = FileModel.objects.filter(
         client_id=client_id,
@@ -300,16 +245,37 @@ def upload_file_to_blob(client_id, document_type, document_id, uploaded_files, u
     if existing_files.exists():
         existing_files.update(status='inactive')
 
-    for file in uploaded_files:
-        blob_name = f"{file.name}"
-        blob_client = blob_service_client.get_blob_client(container=AZURE_CONTAINER_NAME, blob=blob_name)
-        try:
-            blob_client.upload_blob(file, overwrite=True)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    digests = [file_sha256(file) for file in uploaded_files]
+    stored_blobs = dict(
+        FileModel.objects.filter(content_sha256__in=set(digests), blob_name__isnull=False)
+        .values_list('content_sha256', 'blob_name')
+    )
+    pending = {}
+    for file, digest in zip(uploaded_files, digests):
+        if digest not in stored_blobs and digest not in pending:
+            pending[digest] = (f"{digest}/{file.name}", file)
+    metrics = {}
+    if pending:
+        workers = min(len(pending), int(BLOB_UPLOAD_CONCURRENCY or DEFAULT_BLOB_UPLOAD_CONCURRENCY))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                digest: executor.submit(upload_blob_with_metrics, blob_name, file)
+                for digest, (blob_name, file) in pending.items()
+            }
+            try:
+                for digest, future in futures.items():
+                    metrics[digest] = future.result()
+            except Exception as e:
+                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        stored_blobs.update({digest: blob_name for digest, (blob_name, _) in pending.items()})
+
+    for file, digest in zip(uploaded_files, digests):
         filedata = {
             "client": client_id,
-            "blob_name": blob_name,
+            "blob_name": stored_blobs[digest],
+            "file_name": file.name,
+            "content_sha256": digest,
+            "size": file.size,
             "document_id": document_id,
             "document_type": document_type,
             "username_created": username,
@@ -319,36 +285,52 @@ def upload_file_to_blob(client_id, document_type, document_id, uploaded_files, u
         serializer = FileSerializer(data=filedata)
         if serializer.is_valid():
             serializer.save()
-            uploaded_files_info.append(serializer.data)
+            file_info = dict(serializer.data)
+            # Only the first file with a given content is uploaded; the rest are linked to it.
+            file_info["upload"] = metrics.pop(digest, {"deduplicated": True, "bytes": file.size})
+            uploaded_files_info.append(file_info)
     return uploaded_files_info
 
 
 
-@method_decorator(csrf_exempt, name='dispatch')
-class RedirectChatbotOpenAIView(View):
-    def post(self, request, file_uuid):
-        try:
-            query = request.POST.get('query', '')
-
-            blob_service_client = BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
-            query_set = FileModel.objects.get(uuid=file_uuid)
-            serializer = FileSerializer(query_set)
-            data = serializer.data
-            blob_name = data["blob_name"]
-            file_name = blob_name.split("/")[-1]
-            blob_client = blob_service_client.get_blob_client(container=AZURE_CONTAINER_NAME, blob=blob_name)
-            download_stream = blob_client.download_blob()
-            file_data = download_stream.readall()
-            files = {'file': (file_name, file_data, 'application/octet-stream')}
-            data = {'query': query}
+class OutboundMetricsView(GenericAPIView):
+
+    def get(self, request, *args, **kwargs):
+        required_roles = ["c2c_super_admin"]
+        result = has_permission(request, required_roles)
+        if result["status"] != 200:
+            return Response({"result": result}, status=status.HTTP_403_FORBIDDEN)
+        return Response({"upstreams": outbound_metrics()}, status=status.HTTP_200_OK)
+
+class ClassifyDocumentsView(GenericAPIView):
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        """Classify each uploaded 'file' as SOW, PO or Unknown."""
+        required_roles = ["mps_c2c_admin", "mps_c2c_contract_admin", "c2c_super_admin"]
+        result = has_permission(request, required_roles)
+        if result["status"] != 200:
+            return Response({"result": result}, status=status.HTTP_403_FORBIDDEN)
+        uploaded_files = request.FILES.getlist('file')
+        if not uploaded_files:
+            return Response({"error": "No file part in the request"}, status=status.HTTP_400_BAD_REQUEST)
+        with tempfile.TemporaryDirectory() as upload_dir:
+            file_paths = []
+            for index, file_ in enumerate(uploaded_files):
+                file_path = os.path.join(upload_dir, str(index))
+                with open(file_path, 'wb') as destination:
+                    for chunk in file_.chunks():
+                        destination.write(chunk)
+                file_paths.append(file_path)
             try:
-                response = requests.post(OPENAI_API + "query_document", files=files, data=data)
-                return JsonResponse(response.json(), status=response.status_code)
+                document_types = classify_documents(file_paths)
             except requests.RequestException as e:
-                return JsonResponse({'error': str(e)}, status=500)
-
-        except Exception as e:
-            return JsonResponse({'error': f"An error occurred: {str(e)}"}, status=500)
+                return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        documents = [
+            {"file_name": file_.name, "document_type": document_types[file_path]}
+            for file_, file_path in zip(uploaded_files, file_paths)
+        ]
+        return Response({"documents": documents, "result": result}, status=status.HTTP_200_OK)
 
 class CheckNameView(GenericAPIView):
 
@@ -413,3 +395,11 @@ def time_to_hours(time_str):
         hours, minutes = int(match.group(1)), int(match.group(2))
         return round(hours + minutes / 60.0, 2)
     return 0.0
+
+def format_hours(hours):
+    """Convert decimal hours to HH:MM format."""
+    if hours is None:
+        hours = 0
+    total_minutes = int(hours * 60)
+    hours, minutes = divmod(total_minutes, 60)
+    return f"{hours:02}:{minutes:02}"
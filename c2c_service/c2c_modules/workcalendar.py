@@ -0,0 +1,137 @@
+from datetime import date, timedelta
+from django.db import transaction
+from django.db.models import Min, Max
+from django.utils import timezone
+from config import CALENDAR_FIRST_YEAR, CALENDAR_YEARS_AHEAD
+from c2c_modules.models import CalendarWeek, CalendarDay, CalendarHoliday
+from c2c_modules.custom_logger import info
+
+WORKDAY_HOURS = 8
+WORKDAYS_PER_WEEK = 5
+DEFAULT_CALENDAR_FIRST_YEAR = 2020
+DEFAULT_CALENDAR_YEARS_AHEAD = 2
+DISPLAY_DATE_FORMAT = '%d/%m/%Y'
+
+# (first Monday, last Sunday) present in CalendarWeek, as last seen by this process.
+_calendar_span = None
+
+
+def week_bounds(year, week_number):
+    """(Monday, Sunday) of an ISO week."""
+    monday = date.fromisocalendar(year, week_number, 1)
+    return monday, monday + timedelta(days=6)
+
+def work_week_bounds(year, week_number):
+    """(Monday, Friday) of an ISO week."""
+    monday = date.fromisocalendar(year, week_number, 1)
+    return monday, monday + timedelta(days=WORKDAYS_PER_WEEK - 1)
+
+def format_date_range(start_date, end_date):
+    return f"{start_date.strftime(DISPLAY_DATE_FORMAT)} - {end_date.strftime(DISPLAY_DATE_FORMAT)}"
+
+def weeks_between(start_date, end_date):
+    """
+    [(week_number, year)] of the ISO weeks from `start_date` to `end_date`, in order. A start on a
+    weekend counts from the following Monday. One step per week rather than per day.
+    """
+    if start_date.weekday() >= WORKDAYS_PER_WEEK:
+        start_date += timedelta(days=7 - start_date.weekday())
+    if start_date > end_date:
+        return []
+    monday = start_date - timedelta(days=start_date.weekday())
+    weeks = []
+    while monday <= end_date:
+        year, week_number, _ = monday.isocalendar()
+        weeks.append((week_number, year))
+        monday += timedelta(weeks=1)
+    return weeks
+
+def weekdays_between(start_date, end_date):
+    """Number of Mondays to Fridays from `start_date` to `end_date` inclusive, without iterating over the days."""
+    if end_date < start_date:
+        return 0
+    full_weeks, extra_days = divmod((end_date - start_date).days + 1, 7)
+    first_weekday = start_date.weekday()
+    extra_weekdays = sum(1 for offset in range(extra_days) if (first_weekday + offset) % 7 < WORKDAYS_PER_WEEK)
+    return full_weeks * WORKDAYS_PER_WEEK + extra_weekdays
+
+def holidays_between(start_date, end_date, region):
+    """Weekday holidays of a region between two dates (inclusive)."""
+    return CalendarHoliday.objects.filter(
+        region=region, date__range=(start_date, end_date), date__iso_week_day__lte=WORKDAYS_PER_WEEK
+    )
+
+def working_days_between(start_date, end_date, region=None):
+    days = weekdays_between(start_date, end_date)
+    if region and days:
+        days -= holidays_between(start_date, end_date, region).count()
+    return days
+
+def working_hours_between(start_date, end_date, region=None, hours_per_day=WORKDAY_HOURS):
+    """Working hours between two dates (inclusive): weekdays, less the region's holidays when a region is given."""
+    return working_days_between(start_date, end_date, region) * hours_per_day
+
+def previous_work_week(target_date):
+    """Monday to Friday of the week before `target_date`'s week."""
+    previous_monday = target_date - timedelta(days=target_date.weekday() + 7)
+    return [previous_monday + timedelta(days=offset) for offset in range(WORKDAYS_PER_WEEK)]
+
+def working_days(region=None):
+    """CalendarDay queryset of working days, for joining against dated rows in SQL."""
+    days = CalendarDay.objects.filter(is_weekend=False)
+    if region:
+        days = days.exclude(date__in=CalendarHoliday.objects.filter(region=region).values('date'))
+    return days
+
+
+def calendar_weeks(first_year, last_year):
+    """Unsaved CalendarWeek rows for every ISO week of `first_year` to `last_year`."""
+    weeks = []
+    monday = date.fromisocalendar(first_year, 1, 1)
+    while monday.isocalendar()[0] <= last_year:
+        year, week_number, _ = monday.isocalendar()
+        weeks.append(CalendarWeek(year=year, week_number=week_number, start_date=monday,
+                                  end_date=monday + timedelta(days=6)))
+        monday += timedelta(weeks=1)
+    return weeks
+
+def calendar_days(week_id, monday):
+    return [
+        CalendarDay(date=monday + timedelta(days=offset), week_id=week_id,
+                    iso_week_day=offset + 1, is_weekend=offset >= WORKDAYS_PER_WEEK)
+        for offset in range(7)
+    ]
+
+def ensure_calendar(first_year=None, last_year=None):
+    """
+    Insert the calendar weeks and days missing between `first_year` and `last_year`, by default
+    CALENDAR_FIRST_YEAR to CALENDAR_YEARS_AHEAD years past the current one. Existing rows are kept.
+    """
+    first_year = first_year or int(CALENDAR_FIRST_YEAR or DEFAULT_CALENDAR_FIRST_YEAR)
+    last_year = last_year or timezone.now().year + int(CALENDAR_YEARS_AHEAD or DEFAULT_CALENDAR_YEARS_AHEAD)
+    weeks = calendar_weeks(first_year, last_year)
+    with transaction.atomic():
+        CalendarWeek.objects.bulk_create(weeks, ignore_conflicts=True)
+        # ignore_conflicts leaves ids unset; read them back for the day rows.
+        week_ids = CalendarWeek.objects.filter(
+            start_date__range=(weeks[0].start_date, weeks[-1].start_date)
+        ).values_list('id', 'start_date')
+        days = [day for week_id, monday in week_ids for day in calendar_days(week_id, monday)]
+        CalendarDay.objects.bulk_create(days, ignore_conflicts=True)
+    info(f"Calendar covers ISO years {first_year} to {last_year}")
+    return {'first_year': first_year, 'last_year': last_year, 'status': 'success'}
+
+def ensure_calendar_covers(start_date, end_date):
+    """Extend the calendar tables when they do not cover `start_date` to `end_date`; usually no query at all."""
+    global _calendar_span
+    if _calendar_span is None or _calendar_span[0] is None:
+        span = CalendarWeek.objects.aggregate(first=Min('start_date'), last=Max('end_date'))
+        _calendar_span = (span['first'], span['last'])
+    first, last = _calendar_span
+    if first is not None and first <= start_date and end_date <= last:
+        return
+    first_year = start_date.isocalendar()[0]
+    last_year = max(end_date.isocalendar()[0], timezone.now().year + int(CALENDAR_YEARS_AHEAD or DEFAULT_CALENDAR_YEARS_AHEAD))
+    ensure_calendar(first_year, last_year)
+    span = CalendarWeek.objects.aggregate(first=Min('start_date'), last=Max('end_date'))
+    _calendar_span = (span['first'], span['last'])
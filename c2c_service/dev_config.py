@@ -38,3 +38,36 @@ SCHEDULER_DAY = os.getenv("SCHEDULER_DAY")
 SCHEDULER_HOUR = os.getenv("SCHEDULER_HOUR")
 SCHEDULER_MINUTE = os.getenv("SCHEDULER_MINUTE")
 SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE")
+ROLE_CACHE_BACKEND = os.getenv("ROLE_CACHE_BACKEND", "local")
+ROLE_CACHE_MAX_ENTRIES = os.getenv("ROLE_CACHE_MAX_ENTRIES", "10000")
+JWT_VERIFY_MODE = os.getenv("JWT_VERIFY_MODE", "remote")
+JWKS_URL = os.getenv("JWKS_URL")
+JWKS_REFRESH_SECONDS = os.getenv("JWKS_REFRESH_SECONDS", "3600")
+JWKS_MIN_REFETCH_SECONDS = os.getenv("JWKS_MIN_REFETCH_SECONDS", "60")
+JWT_AUDIENCE = os.getenv("JWT_AUDIENCE")
+JWT_ISSUER = os.getenv("JWT_ISSUER")
+JWT_ROLES_CLAIM = os.getenv("JWT_ROLES_CLAIM", "roles")
+DASHBOARD_RECONCILE_MINUTES = os.getenv("DASHBOARD_RECONCILE_MINUTES", "15")
+OUTBOUND_CONNECT_TIMEOUT = os.getenv("OUTBOUND_CONNECT_TIMEOUT", "3.05")
+OUTBOUND_READ_TIMEOUT = os.getenv("OUTBOUND_READ_TIMEOUT", "30")
+OPENAI_READ_TIMEOUT = os.getenv("OPENAI_READ_TIMEOUT", "120")
+OUTBOUND_MAX_CONCURRENCY = os.getenv("OUTBOUND_MAX_CONCURRENCY", "10")
+OUTBOUND_BREAKER_THRESHOLD = os.getenv("OUTBOUND_BREAKER_THRESHOLD", "5")
+OUTBOUND_BREAKER_RESET_SECONDS = os.getenv("OUTBOUND_BREAKER_RESET_SECONDS", "30")
+ASYNC_PROXY_MAX_CONNECTIONS = os.getenv("ASYNC_PROXY_MAX_CONNECTIONS", "200")
+BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", "")
+BLOB_CACHE_MAX_MB = os.getenv("BLOB_CACHE_MAX_MB", "512")
+BLOB_CACHE_ETAG_TTL_SECONDS = os.getenv("BLOB_CACHE_ETAG_TTL_SECONDS", "60")
+BLOB_UPLOAD_CONCURRENCY = os.getenv("BLOB_UPLOAD_CONCURRENCY", "4")
+BLOB_BLOCK_CONCURRENCY = os.getenv("BLOB_BLOCK_CONCURRENCY", "4")
+TIKA_SERVER_ENDPOINT = os.getenv("TIKA_SERVER_ENDPOINT", "http://localhost:9998/")
+TIKA_READ_TIMEOUT = os.getenv("TIKA_READ_TIMEOUT", "120")
+TEXT_CACHE_SECONDS = os.getenv("TEXT_CACHE_SECONDS", "86400")
+EXTRACTION_CONCURRENCY = os.getenv("EXTRACTION_CONCURRENCY", "4")
+CALENDAR_FIRST_YEAR = os.getenv("CALENDAR_FIRST_YEAR", "2020")
+CALENDAR_YEARS_AHEAD = os.getenv("CALENDAR_YEARS_AHEAD", "2")
+MISSING_WEEKS_CACHE_SECONDS = os.getenv("MISSING_WEEKS_CACHE_SECONDS", "3600")
+PENDING_COUNTS_POLL_SECONDS = os.getenv("PENDING_COUNTS_POLL_SECONDS", "2")
+PENDING_COUNTS_STREAM_SECONDS = os.getenv("PENDING_COUNTS_STREAM_SECONDS", "300")
+PENDING_COUNTS_RECONCILE_MINUTES = os.getenv("PENDING_COUNTS_RECONCILE_MINUTES", "60")
+GUEST_CLIENTS_RECONCILE_MINUTES = os.getenv("GUEST_CLIENTS_RECONCILE_MINUTES", "30")
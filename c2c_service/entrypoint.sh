@@ -1,4 +1,8 @@
 #!/bin/bash
 
 python manage.py migrate
-java -jar /tmp/tika-server.jar & python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+python manage.py run_scheduler &
+# Sync views run one at a time per ASGI worker (on its thread-sensitive executor), so size the
+# worker count for the sync API, not for the async proxies.
+java -jar /tmp/tika-server.jar & gunicorn c2c_service.asgi:application -k uvicorn.workers.UvicornWorker \
+    --bind 0.0.0.0:8000 --workers "${WEB_CONCURRENCY:-$((2 * $(nproc) + 1))}"
@@ -48,4 +48,37 @@ MPS_DOCUMENT_PARSER_API = read_env_var("MPS-DOCUMENT-PARSER-API")
 SCHEDULER_DAY = read_env_var("SCHEDULER-DAY")
 SCHEDULER_HOUR = read_env_var("SCHEDULER-HOUR")
 SCHEDULER_MINUTE = read_env_var("SCHEDULER-MINUTE")
-SCHEDULER_TIMEZONE = read_env_var("SCHEDULER-TIMEZONE")
\ No newline at end of file
+SCHEDULER_TIMEZONE = read_env_var("SCHEDULER-TIMEZONE")
+ROLE_CACHE_BACKEND = read_env_var("ROLE-CACHE-BACKEND") or "local"
+ROLE_CACHE_MAX_ENTRIES = read_env_var("ROLE-CACHE-MAX-ENTRIES") or "10000"
+JWT_VERIFY_MODE = read_env_var("JWT-VERIFY-MODE") or "remote"
+JWKS_URL = read_env_var("JWKS-URL")
+JWKS_REFRESH_SECONDS = read_env_var("JWKS-REFRESH-SECONDS") or "3600"
+JWKS_MIN_REFETCH_SECONDS = read_env_var("JWKS-MIN-REFETCH-SECONDS") or "60"
+JWT_AUDIENCE = read_env_var("JWT-AUDIENCE")
+JWT_ISSUER = read_env_var("JWT-ISSUER")
+JWT_ROLES_CLAIM = read_env_var("JWT-ROLES-CLAIM") or "roles"
+DASHBOARD_RECONCILE_MINUTES = read_env_var("DASHBOARD-RECONCILE-MINUTES") or "15"
+OUTBOUND_CONNECT_TIMEOUT = read_env_var("OUTBOUND-CONNECT-TIMEOUT") or "3.05"
+OUTBOUND_READ_TIMEOUT = read_env_var("OUTBOUND-READ-TIMEOUT") or "30"
+OPENAI_READ_TIMEOUT = read_env_var("OPENAI-READ-TIMEOUT") or "120"
+OUTBOUND_MAX_CONCURRENCY = read_env_var("OUTBOUND-MAX-CONCURRENCY") or "10"
+OUTBOUND_BREAKER_THRESHOLD = read_env_var("OUTBOUND-BREAKER-THRESHOLD") or "5"
+OUTBOUND_BREAKER_RESET_SECONDS = read_env_var("OUTBOUND-BREAKER-RESET-SECONDS") or "30"
+ASYNC_PROXY_MAX_CONNECTIONS = read_env_var("ASYNC-PROXY-MAX-CONNECTIONS") or "200"
+BLOB_CACHE_DIR = read_env_var("BLOB-CACHE-DIR") or ""
+BLOB_CACHE_MAX_MB = read_env_var("BLOB-CACHE-MAX-MB") or "512"
+BLOB_CACHE_ETAG_TTL_SECONDS = read_env_var("BLOB-CACHE-ETAG-TTL-SECONDS") or "60"
+BLOB_UPLOAD_CONCURRENCY = read_env_var("BLOB-UPLOAD-CONCURRENCY") or "4"
+BLOB_BLOCK_CONCURRENCY = read_env_var("BLOB-BLOCK-CONCURRENCY") or "4"
+TIKA_SERVER_ENDPOINT = read_env_var("TIKA-SERVER-ENDPOINT") or "http://localhost:9998/"
+TIKA_READ_TIMEOUT = read_env_var("TIKA-READ-TIMEOUT") or "120"
+TEXT_CACHE_SECONDS = read_env_var("TEXT-CACHE-SECONDS") or "86400"
+EXTRACTION_CONCURRENCY = read_env_var("EXTRACTION-CONCURRENCY") or "4"
+CALENDAR_FIRST_YEAR = read_env_var("CALENDAR-FIRST-YEAR") or "2020"
+CALENDAR_YEARS_AHEAD = read_env_var("CALENDAR-YEARS-AHEAD") or "2"
+MISSING_WEEKS_CACHE_SECONDS = read_env_var("MISSING-WEEKS-CACHE-SECONDS") or "3600"
+PENDING_COUNTS_POLL_SECONDS = read_env_var("PENDING-COUNTS-POLL-SECONDS") or "2"
+PENDING_COUNTS_STREAM_SECONDS = read_env_var("PENDING-COUNTS-STREAM-SECONDS") or "300"
+PENDING_COUNTS_RECONCILE_MINUTES = read_env_var("PENDING-COUNTS-RECONCILE-MINUTES") or "60"
+GUEST_CLIENTS_RECONCILE_MINUTES = read_env_var("GUEST-CLIENTS-RECONCILE-MINUTES") or "30"